@@ -1,9 +1,17 @@
 from django.contrib import admin
-from .models import User, ListCommodity, SupplierCommodity,Order
+from .models import User, ListCommodity, SupplierCommodity,Order, ForecastResult, SupplierRatingSummary, Tombstone
+from .models import StockMovement, StockSnapshot, SupplierScore, ReplenishmentPlan
 
 
 
 admin.site.register(User)
 admin.site.register(ListCommodity)
 admin.site.register(SupplierCommodity)
-admin.site.register(Order) 
\ No newline at end of file
+admin.site.register(Order)
+admin.site.register(ForecastResult)
+admin.site.register(SupplierRatingSummary)
+admin.site.register(Tombstone)
+admin.site.register(StockMovement)
+admin.site.register(StockSnapshot)
+admin.site.register(SupplierScore)
+admin.site.register(ReplenishmentPlan)
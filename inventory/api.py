@@ -0,0 +1,304 @@
+"""Versioned JSON API for integrations (mounted under ``/api/v1/``).
+
+Clients authenticate with a JWT from ``/api/v1/token/`` (or a browser
+session). Lists use cursor pagination, any endpoint accepts
+``?fields=a,b`` to trim its payload, and GETs carry an ``ETag`` derived from
+the cache versions in ``inventory.cache``. A repeat request with
+``If-None-Match`` gets ``304 Not Modified`` without loading any data, as
+long as nothing it covers has changed. Listings and orders also have a
+``changes/`` feed (see ``inventory.changes``) for incremental sync.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import fulfilment, ledger, ranking
+from .changes import changes_since
+from .cache import COMMODITIES, FORECASTS, MARKETPLACE, SUPPLIER, VENDOR, get_version
+from .models import ListCommodity, SupplierCommodity, Order, Rating, ForecastResult, Tombstone
+from .serializers import (
+    ListCommoditySerializer, SupplierCommoditySerializer, OrderSerializer, RatingSerializer,
+    ForecastResultSerializer, StockLevelSerializer, StockTurnoverSerializer, SupplierScoreSerializer,
+)
+
+
+class IsSupplier(permissions.BasePermission):
+    message = "Only suppliers can do this."
+
+    def has_permission(self, request, view):
+        return request.user.role == "supplier"
+
+
+class IsVendor(permissions.BasePermission):
+    message = "Only vendors can do this."
+
+    def has_permission(self, request, view):
+        return request.user.role == "vendor"
+
+
+class ConditionalGetMixin:
+    """Answer GETs with an ``ETag`` built from cache versions, and with 304 when it still matches."""
+
+    def get_etag_scopes(self):
+        """``[(scope, owner_id), ...]`` whose versions change whenever this endpoint's data does."""
+        raise NotImplementedError
+
+    def get_etag(self, request):
+        versions = [get_version(scope, owner_id) for scope, owner_id in self.get_etag_scopes()]
+        key = f"{request.user.pk}|{request.get_full_path()}|{request.accepted_renderer.format}|{versions}"
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class ChangeFeedMixin:
+    """A ``changes/`` list route: rows changed and ids deleted since ``?since=<cursor>``."""
+
+    def get_tombstones(self):
+        """The ``Tombstone`` rows this user may see for this endpoint."""
+        raise NotImplementedError
+
+    @action(detail=False)
+    def changes(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        try:
+            page = changes_since(
+                self.get_queryset(), self.get_tombstones(), request.query_params.get('since'),
+                int(limit) if limit else None,
+            )
+        except ValueError:
+            return Response({'detail': "Invalid cursor or limit."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': self.get_serializer(page.items, many=True).data,
+            'deleted': page.deleted,
+            'cursor': page.cursor,
+            'has_more': page.has_more,
+        })
+
+
+class ListCommodityViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """The commodity catalogue."""
+    queryset = ListCommodity.objects.all()
+    serializer_class = ListCommoditySerializer
+    ordering = 'name'
+
+    def get_etag_scopes(self):
+        return [(COMMODITIES, None)]
+
+    @action(detail=True, url_path='top-suppliers')
+    def top_suppliers(self, request, *args, **kwargs):
+        """The ``?k=`` best ranked in-stock listings of this commodity (see ``inventory.ranking``)."""
+        try:
+            k = int(request.query_params.get('k', ranking.DEFAULT_TOP_K))
+        except ValueError:
+            k = 0
+        if not 1 <= k <= ranking.MAX_TOP_K:
+            return Response({'detail': f"k must be between 1 and {ranking.MAX_TOP_K}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        commodity = self.get_object()
+        scores = ranking.top_suppliers(commodity.pk, k)
+        return Response({'commodity': commodity.pk, 'results': SupplierScoreSerializer(scores, many=True).data})
+
+
+class SupplierCommodityViewSet(ConditionalGetMixin, ChangeFeedMixin, viewsets.ModelViewSet):
+    """Vendors browse the in-stock marketplace; suppliers manage their own listings."""
+    serializer_class = SupplierCommoditySerializer
+    ordering = 'id'
+
+    def get_permissions(self):
+        if self.action in ('list', 'retrieve', 'changes'):
+            return [permissions.IsAuthenticated()]
+        return [permissions.IsAuthenticated(), IsSupplier()]
+
+    def get_queryset(self):
+        listings = SupplierCommodity.objects.select_related('commodity', 'supplier').annotate(
+            supplier_avg_rating=F('supplier__rating_summary__average_rating'),
+            supplier_rating_count=Coalesce('supplier__rating_summary__rating_count', 0),
+        )
+        if self.request.user.role == "supplier":
+            listings = listings.filter(supplier=self.request.user)
+        elif self.action != 'changes':
+            # The feed keeps sold-out listings so vendors see them drop to zero
+            listings = listings.filter(available_units__gt=0)
+        for param in ('commodity', 'supplier'):
+            value = self.request.query_params.get(param)
+            if value and value.isdigit():
+                listings = listings.filter(**{f'{param}_id': value})
+        # Comparable prices (see inventory.units); sorting by price needs a single base unit to be meaningful
+        base_unit = self.request.query_params.get('base_unit')
+        if base_unit:
+            listings = listings.filter(base_unit=base_unit)
+            if self.request.query_params.get('sort') == 'price':
+                self.ordering = ('normalized_price', 'id')
+        try:
+            max_price = Decimal(self.request.query_params.get('max_price', ''))
+        except InvalidOperation:
+            max_price = None
+        if max_price is not None and max_price.is_finite() and max_price >= 0:
+            listings = listings.filter(normalized_price__lte=max_price)
+        return listings
+
+    def get_etag_scopes(self):
+        owner = (SUPPLIER, self.request.user.id) if self.request.user.role == "supplier" else (MARKETPLACE, None)
+        return [owner, (COMMODITIES, None)]
+
+    def get_tombstones(self):
+        tombstones = Tombstone.objects.filter(model='supplier_commodity')
+        if self.request.user.role == "supplier":
+            return tombstones.filter(supplier=self.request.user)
+        return tombstones
+
+    def perform_create(self, serializer):
+        serializer.save(supplier=self.request.user)
+
+    @action(detail=True)
+    def stock(self, request, *args, **kwargs):
+        """Stock of the listing at ``?at=<ISO datetime>`` (default: now), from the stock ledger."""
+        listing = self.get_object()
+        try:
+            at = parse_moment(request.query_params.get('at'), timezone.now())
+        except ValueError:
+            return Response({'detail': "Invalid datetime."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(StockLevelSerializer({'id': listing.id, 'at': at, 'units': ledger.stock_at(listing.id, at)}).data)
+
+    @action(detail=False)
+    def turnover(self, request, *args, **kwargs):
+        """Opening and closing stock, units sold and stock turns of each listing between ``?start=`` and ``?end=``."""
+        try:
+            end = parse_moment(request.query_params.get('end'), timezone.now())
+            start = parse_moment(request.query_params.get('start'), None)
+        except ValueError:
+            start = None
+        if start is None or start >= end:
+            return Response({'detail': "Pass ?start= (and optionally ?end=) as ISO datetimes, start before end."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(ledger.with_turnover(self.get_queryset(), start, end))
+        return self.get_paginated_response(
+            StockTurnoverSerializer(page, many=True, context=self.get_serializer_context()).data
+        )
+
+
+def parse_moment(value, default):
+    """An ISO datetime query parameter (naive ones are in the current time zone); raises ``ValueError``."""
+    if not value:
+        return default
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(value)
+    if settings.USE_TZ and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class OrderViewSet(ConditionalGetMixin, ChangeFeedMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Vendors place and track orders; suppliers see orders for their listings and accept or reject them."""
+    serializer_class = OrderSerializer
+    ordering = ('-ordered_at', '-id')
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [permissions.IsAuthenticated(), IsVendor()]
+        if self.action in ('accept', 'reject'):
+            return [permissions.IsAuthenticated(), IsSupplier()]
+        return [permissions.IsAuthenticated()]
+
+    def get_queryset(self):
+        orders = Order.objects.select_related('vendor', 'supplier_commodity__commodity', 'supplier_commodity__supplier')
+        if self.request.user.role == "supplier":
+            orders = orders.filter(supplier_commodity__supplier=self.request.user)
+        else:
+            orders = orders.filter(vendor=self.request.user)
+        order_status = self.request.query_params.get('status')
+        if order_status:
+            orders = orders.filter(status=order_status)
+        return orders
+
+    def get_etag_scopes(self):
+        role = SUPPLIER if self.request.user.role == "supplier" else VENDOR
+        return [(role, self.request.user.id), (COMMODITIES, None)]
+
+    def get_tombstones(self):
+        tombstones = Tombstone.objects.filter(model='order')
+        if self.request.user.role == "supplier":
+            return tombstones.filter(supplier=self.request.user)
+        return tombstones.filter(vendor=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(vendor=self.request.user, status='pending')
+
+    def _process(self, outcome, order):
+        if outcome in (fulfilment.ACCEPTED, fulfilment.REJECTED):
+            return Response({'id': order.id, 'status': order.status})
+        return Response({'id': order.id, 'error': outcome}, status=status.HTTP_409_CONFLICT)
+
+    @action(detail=True, methods=['post'])
+    def accept(self, request, *args, **kwargs):
+        order = self.get_object()
+        return self._process(fulfilment.accept_order(order), order)
+
+    @action(detail=True, methods=['post'])
+    def reject(self, request, *args, **kwargs):
+        order = self.get_object()
+        return self._process(fulfilment.reject_order(order), order)
+
+
+class RatingViewSet(ConditionalGetMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Vendors rate their accepted orders; suppliers read the ratings they received."""
+    serializer_class = RatingSerializer
+    ordering = ('-created_at', '-id')
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [permissions.IsAuthenticated(), IsVendor()]
+        return [permissions.IsAuthenticated()]
+
+    def get_queryset(self):
+        ratings = Rating.objects.select_related('vendor', 'order__supplier_commodity__commodity')
+        if self.request.user.role == "supplier":
+            return ratings.filter(supplier=self.request.user)
+        return ratings.filter(vendor=self.request.user)
+
+    def get_etag_scopes(self):
+        role = SUPPLIER if self.request.user.role == "supplier" else VENDOR
+        return [(role, self.request.user.id), (COMMODITIES, None)]
+
+    def perform_create(self, serializer):
+        serializer.save(vendor=self.request.user)
+
+
+class ForecastViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Precomputed demand forecasts for the supplier's listings, keyed by listing id."""
+    serializer_class = ForecastResultSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSupplier]
+    lookup_field = 'supplier_commodity'
+    ordering = 'supplier_commodity_id'
+
+    def get_queryset(self):
+        return ForecastResult.objects.select_related('supplier_commodity__commodity').filter(
+            supplier_commodity__supplier=self.request.user
+        )
+
+    def get_etag_scopes(self):
+        return [(FORECASTS, self.request.user.id), (COMMODITIES, None)]
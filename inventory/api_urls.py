@@ -0,0 +1,17 @@
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .api import ListCommodityViewSet, SupplierCommodityViewSet, OrderViewSet, RatingViewSet, ForecastViewSet
+
+router = DefaultRouter()
+router.register("commodities", ListCommodityViewSet, basename="api-commodity")
+router.register("listings", SupplierCommodityViewSet, basename="api-listing")
+router.register("orders", OrderViewSet, basename="api-order")
+router.register("ratings", RatingViewSet, basename="api-rating")
+router.register("forecasts", ForecastViewSet, basename="api-forecast")
+
+urlpatterns = [
+    path("token/", TokenObtainPairView.as_view(), name="api-token"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="api-token-refresh"),
+] + router.urls
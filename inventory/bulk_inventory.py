@@ -0,0 +1,238 @@
+"""Bulk inventory import and export.
+
+Uploads are CSV or JSON Lines with the columns ``commodity`` (name),
+``unit``, ``price_per_unit``, ``manufactured_company``, ``available_units``
+and an optional ``id``. Rows with an ``id`` update that listing of the
+supplier, and rows without one create a new listing. The upload is read one row
+at a time. Commodity names are resolved against one load of every name,
+exactly or, when that matches a single commodity, ignoring case. Rows are
+written with ``bulk_create``/``bulk_update`` one batch (and one transaction)
+at a time, with their stock changes written to the stock ledger in the same
+transaction. Invalid rows are skipped and reported with their line number;
+they don't stop the rest of the import.
+
+Exports stream the same columns straight from a database cursor, so an
+export written back unchanged is a no-op update.
+"""
+import csv
+import io
+import json
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger, units
+from .cache import MARKETPLACE, SUPPLIER, bump
+from .models import ListCommodity, SupplierCommodity
+from .search import build_search_document, fallback_index
+
+COLUMNS = ['id', 'commodity', 'unit', 'price_per_unit', 'manufactured_company', 'available_units']
+FORMATS = ('csv', 'jsonl')
+UPDATE_FIELDS = [
+    'commodity', 'unit', 'price_per_unit', 'manufactured_company', 'available_units', 'search_document',
+    'base_unit', 'normalized_price', 'updated_at',
+]
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'error_count', 'errors'])
+
+
+class RowError(ValueError):
+    pass
+
+
+def get_batch_size(batch_size=None):
+    return batch_size or getattr(settings, 'INVENTORY_IMPORT_BATCH_SIZE', 500)
+
+
+def detect_format(filename, requested=None):
+    """Pick the upload format from an explicit choice or the file extension."""
+    if requested in FORMATS:
+        return requested
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` from a binary ``stream``, one row at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Malformed lines surface as row errors like any other invalid row
+        yield line_number, row if isinstance(row, dict) else {'__invalid__': line}
+
+
+def _decimal(row, field):
+    try:
+        value = Decimal(str(row.get(field, '')).strip())
+    except InvalidOperation:
+        raise RowError(f"{field} must be a number")
+    if not value.is_finite() or value < 0:
+        raise RowError(f"{field} must be zero or more")
+    if value.as_tuple().exponent < -2 or value >= 10 ** 8:
+        raise RowError(f"{field} must have at most 8 digits and 2 decimal places")
+    return value
+
+
+def load_commodity_ids():
+    """Commodity ids by exact name, and the ids sharing each lower-cased name."""
+    exact, folded = {}, defaultdict(list)
+    for pk, name in ListCommodity.objects.values_list('id', 'name'):
+        exact[name] = pk
+        folded[name.lower()].append(pk)
+    return exact, folded
+
+
+def resolve_commodity(name, commodity_ids):
+    """The id of commodity ``name``; the case only matters when names differ by nothing else."""
+    exact, folded = commodity_ids
+    if name in exact:
+        return exact[name]
+    matches = folded.get(name.lower(), [])
+    if not matches:
+        raise RowError(f"unknown commodity {name!r}")
+    if len(matches) > 1:
+        raise RowError(f"commodity {name!r} matches {len(matches)} commodities that differ only in case")
+    return matches[0]
+
+
+def parse_row(row, commodity_ids):
+    """Validate one row. Returns ``(listing_id or None, field values)``."""
+    if '__invalid__' in row:
+        raise RowError("not a JSON object")
+    name = str(row.get('commodity') or '').strip()
+    commodity_id = resolve_commodity(name, commodity_ids)
+    unit = str(row.get('unit') or 'unit').strip()
+    if unit not in units.UNITS:
+        raise RowError(f"unknown unit {unit!r}")
+    company = str(row.get('manufactured_company') or '').strip()
+    if not company or len(company) > 100:
+        raise RowError("manufactured_company must be 1-100 characters")
+
+    listing_id = str(row.get('id') or '').strip()
+    if listing_id and not listing_id.isdigit():
+        raise RowError("id must be a listing id")
+    return int(listing_id) if listing_id else None, {
+        'commodity_id': commodity_id,
+        'commodity_name': name,
+        'unit': unit,
+        'price_per_unit': _decimal(row, 'price_per_unit'),
+        'manufactured_company': company,
+        'available_units': _decimal(row, 'available_units'),
+    }
+
+
+def import_inventory(supplier, rows, batch_size=None):
+    """Create and update ``supplier``'s listings from ``(line_number, row)`` pairs."""
+    batch_size = get_batch_size(batch_size)
+    # One query resolves every commodity name in the upload
+    commodity_ids = load_commodity_ids()
+    created = updated = error_count = 0
+    errors = []
+
+    def report(line_number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append((line_number, message))
+
+    def flush(batch):
+        nonlocal created, updated
+        with transaction.atomic():
+            existing = SupplierCommodity.objects.select_for_update().filter(supplier=supplier).in_bulk(
+                [listing_id for _, listing_id, _ in batch if listing_id]
+            )
+            to_create, to_update, movements = [], [], []
+            for line_number, listing_id, values in batch:
+                name = values.pop('commodity_name')
+                document = build_search_document(name, supplier.username, supplier.address)
+                if listing_id is None:
+                    listing = SupplierCommodity(supplier=supplier, search_document=document, **values)
+                    units.normalize(listing)
+                    to_create.append(listing)
+                    continue
+                listing = existing.get(listing_id)
+                if listing is None:
+                    report(line_number, f"no listing {listing_id} in your inventory")
+                    continue
+                # The row is locked, so holds can't grow before this batch commits
+                if values['available_units'] < listing.reserved_units:
+                    report(line_number, f"available_units can't be below the {listing.reserved_units} "
+                                        f"held by pending orders")
+                    continue
+                values['search_document'] = document
+                change = values['available_units'] - listing.available_units
+                movements.append((listing.id, ledger.ADJUSTMENT, change, None))
+                # Unchanged rows keep their updated_at so re-imports don't flood the change feed
+                if any(getattr(listing, field) != value for field, value in values.items()):
+                    listing.updated_at = timezone.now()
+                for field, value in values.items():
+                    setattr(listing, field, value)
+                units.normalize(listing)
+                to_update.append(listing)
+            SupplierCommodity.objects.bulk_create(to_create)
+            SupplierCommodity.objects.bulk_update(to_update, UPDATE_FIELDS)
+            movements += [(listing.id, ledger.RECEIPT, listing.available_units, None) for listing in to_create]
+            ledger.record_many(movements)
+        created += len(to_create)
+        updated += len(to_update)
+
+    batch = []
+    for line_number, row in rows:
+        try:
+            listing_id, values = parse_row(row, commodity_ids)
+        except RowError as exc:
+            report(line_number, str(exc))
+            continue
+        batch.append((line_number, listing_id, values))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    # bulk writes send no signals
+    if created or updated:
+        fallback_index.invalidate()
+        bump(SUPPLIER, supplier.id)
+        bump(MARKETPLACE)
+    return ImportResult(created, updated, error_count, errors)
+
+
+class _Echo:
+    """A file-like object whose ``write`` hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(supplier, fmt='csv'):
+    """Yield ``supplier``'s inventory as CSV or JSON Lines, one line at a time."""
+    listings = SupplierCommodity.objects.filter(supplier=supplier).order_by('id').values_list(
+        'id', 'commodity__name', 'unit', 'price_per_unit', 'manufactured_company', 'available_units'
+    ).iterator(chunk_size=2000)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(COLUMNS)
+        for listing in listings:
+            yield writer.writerow(listing)
+        return
+    for listing in listings:
+        row = dict(zip(COLUMNS, listing))
+        row['price_per_unit'] = str(row['price_per_unit'])
+        row['available_units'] = str(row['available_units'])
+        yield json.dumps(row) + '\n'
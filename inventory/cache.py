@@ -0,0 +1,108 @@
+"""Versioned caching for dashboard data.
+
+Cached entries are keyed by a *scope* (``supplier``, ``vendor``,
+``marketplace``, ``commodities`` or ``forecasts``), the owning user's id
+where there is one, and that scope's current version. Invalidating a scope
+just bumps its version, and entries under older versions are never read
+again and expire on their own. The receivers in ``inventory.signals`` bump
+versions when listings, orders or ratings change. Code that writes with
+``update()`` or ``bulk_*`` (which send no signals) bumps them itself. The
+versions double as the API's ETags.
+
+Versions start from a nanosecond timestamp rather than 1. If a version key
+is evicted, the new one is always higher than any version already in use,
+so evicting it can never bring stale entries back.
+
+Bumps only reach processes that share the cache. The background workers
+(holds, forecasts, rankings, replenishment) bump from their own processes,
+so with the per-process local memory cache the web processes would keep
+serving stale pages; they warn at startup when that is the case.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+
+SUPPLIER = 'supplier'
+VENDOR = 'vendor'
+MARKETPLACE = 'marketplace'
+COMMODITIES = 'commodities'
+FORECASTS = 'forecasts'
+
+
+def unshared_cache_warning():
+    """A warning for background workers when their bumps can't reach other processes, else ``None``."""
+    if not isinstance(caches['default'], LocMemCache):
+        return None
+    return ("The cache is local to this process, so its invalidations won't reach the web processes, which "
+            "will serve stale pages for up to DASHBOARD_CACHE_TIMEOUT seconds. Set REDIS_URL to share one cache.")
+
+
+def _version_key(scope, owner_id=None):
+    return f"inventory:version:{scope}:{owner_id or ''}"
+
+
+def get_version(scope, owner_id=None):
+    key = _version_key(scope, owner_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def _bump_now(scope, owner_id):
+    key = _version_key(scope, owner_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def bump(scope, owner_id=None):
+    """Invalidate everything cached under ``scope`` (for ``owner_id``).
+
+    Bumps now, and again once the surrounding transaction commits, so a page
+    cached from not-yet-committed data in between is dropped as well.
+    """
+    _bump_now(scope, owner_id)
+    transaction.on_commit(lambda: _bump_now(scope, owner_id))
+
+
+def cache_key(scope, owner_id, name, *parts):
+    """The key for ``name`` under the current version of ``scope``.
+
+    ``parts`` (page numbers, search text, cursors) are hashed so any user
+    input makes a valid key on every backend.
+    """
+    suffix = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f"inventory:{scope}:{owner_id or ''}:{get_version(scope, owner_id)}:{name}:{suffix}"
+
+
+def get_or_build(key, build):
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return value
+
+
+def cached_page(key, object_list, number, per_page):
+    """A ``Paginator`` page of ``object_list``, loaded from the cache when possible.
+
+    Only the page's rows and the total count are stored. A cache hit runs no
+    queries.
+    """
+    paginator = Paginator(object_list, per_page)
+
+    def build():
+        page = paginator.get_page(number)
+        return page.number, list(page.object_list), paginator.count
+
+    number, items, count = get_or_build(key, build)
+    paginator.count = count
+    return Page(items, number, paginator)
@@ -0,0 +1,113 @@
+"""Placing several orders at once.
+
+A cart is a list of ``(supplier_commodity_id, quantity)`` lines. All lines
+are checked against stock nobody holds with one locking query, the valid
+ones are inserted with a single ``bulk_create`` and their holds (see
+``inventory.reservations``) are taken with a single ``bulk_update``. Each line gets its own result, so one bad
+line doesn't stop the rest of the cart.
+"""
+import json
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import MARKETPLACE, SUPPLIER, VENDOR, bump
+from .models import Order, SupplierCommodity
+from .reservations import get_hold_duration
+
+PLACED = 'placed'
+INVALID_QUANTITY = 'invalid_quantity'
+UNKNOWN_ITEM = 'unknown_item'
+INSUFFICIENT_STOCK = 'insufficient_stock'
+
+MAX_LINES = 500
+FORM_PREFIX = 'cart_'
+
+CartLine = namedtuple('CartLine', ['commodity_id', 'quantity', 'status', 'order_id'])
+
+
+def _int_or_none(value):
+    """A JSON integer or a string of digits as an ``int``; anything else is ``None``.
+
+    ``int()`` alone would truncate 2.5 to 2 and take ``true`` as 1.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def lines_from_form(data):
+    """Cart lines from ``cart_<supplier_commodity_id>=<quantity>`` form fields; blank fields are skipped."""
+    return [
+        (_int_or_none(key[len(FORM_PREFIX):]), _int_or_none(value))
+        for key, value in data.items()
+        if key.startswith(FORM_PREFIX) and value.strip()
+    ]
+
+
+def lines_from_json(body):
+    """Cart lines from ``{"lines": [{"commodity_id": 1, "quantity": 5}, ...]}``.
+
+    Raises ``ValueError`` if the body isn't shaped like that.
+    """
+    data = json.loads(body)
+    lines = data.get('lines') if isinstance(data, dict) else None
+    if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+        raise ValueError("expected a list of lines")
+    return [(_int_or_none(line.get('commodity_id')), _int_or_none(line.get('quantity'))) for line in lines]
+
+
+def place_cart(vendor, lines):
+    """Order every valid line for ``vendor``. Returns one ``CartLine`` per input line.
+
+    Lines for the same commodity draw on the same stock, in cart order.
+    """
+    lines = list(lines)
+    if len(lines) > MAX_LINES:
+        raise ValueError(f"A cart can hold at most {MAX_LINES} lines.")
+
+    statuses, orders = [], []
+    with transaction.atomic():
+        # Locked in id order so concurrent carts can't deadlock or hold the same stock twice
+        stock = SupplierCommodity.objects.select_for_update().filter(available_units__gt=0).order_by('id').in_bulk(
+            {commodity_id for commodity_id, _ in lines if commodity_id is not None}
+        )
+        now = timezone.now()
+        hold_expires_at = now + get_hold_duration()
+        for commodity_id, quantity in lines:
+            if quantity is None or quantity <= 0:
+                statuses.append(INVALID_QUANTITY)
+            elif commodity_id not in stock:
+                statuses.append(UNKNOWN_ITEM)
+            elif quantity > stock[commodity_id].available_to_promise:
+                statuses.append(INSUFFICIENT_STOCK)
+            else:
+                stock[commodity_id].reserved_units += quantity
+                stock[commodity_id].updated_at = now
+                statuses.append(PLACED)
+                orders.append(Order(
+                    vendor=vendor, supplier_commodity=stock[commodity_id],
+                    quantity_requested=quantity, status='pending', hold_expires_at=hold_expires_at,
+                ))
+
+        if orders:
+            Order.objects.bulk_create(orders)
+            SupplierCommodity.objects.bulk_update(
+                {order.supplier_commodity for order in orders}, ['reserved_units', 'updated_at']
+            )
+
+    if orders:
+        # bulk_create sends no signals
+        bump(VENDOR, vendor.id)
+        bump(MARKETPLACE)
+        for supplier_id in {order.supplier_commodity.supplier_id for order in orders}:
+            bump(SUPPLIER, supplier_id)
+
+    placed = iter(orders)
+    return [
+        CartLine(commodity_id, quantity, status, next(placed).id if status == PLACED else None)
+        for (commodity_id, quantity), status in zip(lines, statuses)
+    ]
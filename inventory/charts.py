@@ -0,0 +1,126 @@
+"""Forecast chart rendering.
+
+Charts are drawn with matplotlib's object-oriented ``Figure`` API (no global
+``pyplot`` state, so rendering is safe under threaded workers) and kept in an
+in-process LRU cache keyed by commodity and forecast version. In ``json``
+mode the server skips rasterizing altogether and the page draws the chart
+from the series data in the browser.
+
+matplotlib and NumPy are imported on first render, so importing this module
+(and the views that use it) stays cheap for processes that never draw.
+"""
+import base64
+import io
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+CHART_MODES = ('png', 'svg', 'json')
+
+
+class ChartCache:
+    """A small thread-safe LRU cache of rendered charts."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+chart_cache = ChartCache(getattr(settings, 'FORECAST_CHART_CACHE_SIZE', 256))
+
+
+def get_chart_mode(requested=None):
+    """Pick the chart mode from a request parameter, falling back to ``FORECAST_CHART_MODE``."""
+    if requested in CHART_MODES:
+        return requested
+    return getattr(settings, 'FORECAST_CHART_MODE', 'png')
+
+
+def chart_data(forecast):
+    """The series the browser needs to draw the chart itself."""
+    return {
+        'history': [[point['ds'], point['y']] for point in forecast.history],
+        'series': [
+            [point['ds'], point['yhat'], point['yhat_lower'], point['yhat_upper']]
+            for point in forecast.series
+        ],
+    }
+
+
+def draw_forecast(forecast):
+    """Draw a stored forecast onto a new ``Figure``."""
+    import matplotlib.dates as mdates
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    history_ds = np.array([point['ds'] for point in forecast.history], dtype='datetime64[s]')
+    history_y = [point['y'] for point in forecast.history]
+    series_ds = np.array([point['ds'] for point in forecast.series], dtype='datetime64[s]')
+
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(history_ds, history_y, 'k.', label='Historical Data')
+    ax.plot(series_ds, [point['yhat'] for point in forecast.series], ls='-', color='#0072B2', label='Forecast')
+    ax.fill_between(series_ds,
+                    [point['yhat_lower'] for point in forecast.series],
+                    [point['yhat_upper'] for point in forecast.series],
+                    color='#0072B2', alpha=0.2, label='Uncertainty Interval')
+
+    forecast_start = series_ds.max() - np.timedelta64(6, 'D')
+    ax.axvline(x=forecast_start, color='gray', linestyle='--', alpha=0.5)
+    ax.text(forecast_start, ax.get_ylim()[1]*0.9, ' Forecast', color='gray')
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
+    ax.xaxis.set_major_locator(mdates.DayLocator(interval=max(1, len(history_ds)//5)))
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def _render(forecast, mode):
+    fig = draw_forecast(forecast)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=mode, dpi=100, bbox_inches='tight')
+    if mode == 'png':
+        return base64.b64encode(buf.getvalue()).decode('utf-8')
+    # Inline SVG: drop the XML prolog so the markup can sit inside the page
+    svg = buf.getvalue().decode('utf-8')
+    return svg[svg.index('<svg'):]
+
+
+def render_forecast_chart(forecast, mode='png'):
+    """Return the chart for ``forecast``: base64 PNG, inline SVG markup or JSON-ready data."""
+    if mode == 'json':
+        return chart_data(forecast)
+
+    key = (forecast.supplier_commodity_id, forecast.fitted_at.timestamp(), mode)
+    chart = chart_cache.get(key)
+    if chart is None:
+        chart = _render(forecast, mode)
+        chart_cache.set(key, chart)
+    return chart
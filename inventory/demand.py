@@ -0,0 +1,69 @@
+"""Accepted-order demand history, loaded in bulk.
+
+``load_daily_demand`` fetches every accepted order of interest with one query,
+already summed into daily buckets by the database, and splits the result into
+per-commodity NumPy series in memory.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from .models import Order
+
+
+class DemandSeries(namedtuple('DemandSeries', ['ds', 'y', 'order_count'])):
+    """Daily accepted demand of one supplier commodity.
+
+    ``ds`` holds ``datetime64[D]`` days in ascending order, ``y`` the quantity
+    ordered on each day and ``order_count`` the number of accepted orders.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_days(cls, days, quantities, order_count=None):
+        ds = np.asarray(days, dtype='datetime64[D]')
+        y = np.asarray(quantities, dtype=float)
+        return cls(ds, y, len(ds) if order_count is None else order_count)
+
+
+EMPTY_SERIES = DemandSeries.from_days([], [], 0)
+
+
+def load_daily_demand(supplier_id=None, supplier_commodity_ids=None, since=None):
+    """Return ``{supplier_commodity_id: DemandSeries}`` for accepted orders.
+
+    ``since`` limits the history to orders placed from then on. Commodities
+    without accepted orders are left out; use ``EMPTY_SERIES`` for them.
+    """
+    orders = Order.objects.filter(status='accepted')
+    if supplier_id is not None:
+        orders = orders.filter(supplier_commodity__supplier_id=supplier_id)
+    if supplier_commodity_ids is not None:
+        orders = orders.filter(supplier_commodity_id__in=supplier_commodity_ids)
+    if since is not None:
+        orders = orders.filter(ordered_at__gte=since)
+
+    rows = list(
+        orders.annotate(day=TruncDate('ordered_at'))
+        .values('supplier_commodity_id', 'day')
+        .annotate(quantity=Sum('quantity_requested'), orders=Count('id'))
+        .order_by('supplier_commodity_id', 'day')
+        .values_list('supplier_commodity_id', 'day', 'quantity', 'orders')
+    )
+    if not rows:
+        return {}
+
+    ids, days, quantities, counts = zip(*rows)
+    ids = np.array(ids)
+    days = np.array(days, dtype='datetime64[D]')
+    quantities = np.array(quantities, dtype=float)
+    counts = np.array(counts)
+
+    # Rows are sorted by commodity, so each commodity is one contiguous slice
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1, [len(ids)]])
+    return {
+        int(ids[lo]): DemandSeries(days[lo:hi], quantities[lo:hi], int(counts[lo:hi].sum()))
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    }
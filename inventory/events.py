@@ -0,0 +1,208 @@
+"""Pushing newly placed orders to the suppliers that own them.
+
+Open event streams and long polls subscribe to an ``OrderEventHub``.
+There is one hub per event loop, so under ASGI there is one per worker
+process. While anyone is subscribed, a single background task polls the
+database for new orders once every ``ORDER_EVENTS_POLL_SECONDS``. It hands
+each order to the queues of that order's supplier. An idle connection
+costs one coroutine and one empty queue, and the database sees one
+indexed query per poll however many connections are open.
+
+Each poll looks back ``ORDER_EVENTS_LOOKBACK_SECONDS`` and skips orders
+it has already sent, so an order whose transaction commits a little after
+its timestamp is still picked up.
+"""
+import asyncio
+import json
+import weakref
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Order
+
+EVENT_FIELDS = (
+    'id', 'status', 'quantity_requested', 'ordered_at', 'vendor__username',
+    'supplier_commodity_id', 'supplier_commodity__commodity__name', 'supplier_commodity__supplier_id',
+)
+# Events a slow client may fall behind by before new ones are dropped for it
+QUEUE_SIZE = 100
+BACKFILL_LIMIT = 100
+
+
+def get_poll_interval():
+    return getattr(settings, 'ORDER_EVENTS_POLL_SECONDS', 1)
+
+
+def get_heartbeat_interval():
+    return getattr(settings, 'ORDER_EVENTS_HEARTBEAT_SECONDS', 15)
+
+
+def get_long_poll_timeout():
+    return getattr(settings, 'ORDER_EVENTS_LONG_POLL_SECONDS', 25)
+
+
+def get_lookback():
+    return timedelta(seconds=getattr(settings, 'ORDER_EVENTS_LOOKBACK_SECONDS', 10))
+
+
+def to_event(row):
+    """The JSON-ready payload for one ``Order.values(*EVENT_FIELDS)`` row."""
+    return {
+        'id': row['id'],
+        'status': row['status'],
+        'quantity_requested': row['quantity_requested'],
+        'ordered_at': row['ordered_at'],
+        'vendor': row['vendor__username'],
+        'supplier_commodity': row['supplier_commodity_id'],
+        'commodity': row['supplier_commodity__commodity__name'],
+    }
+
+
+def format_sse(event):
+    """One ``order`` message in the ``text/event-stream`` format; the id lets clients resume."""
+    return f"id: {event['id']}\nevent: order\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def request_user(request):
+    """The authenticated user of an async request, or ``None``.
+
+    The session is loaded in a worker thread, so this works with any session backend.
+    """
+    def load():
+        return request.user if request.user.is_authenticated else None
+    return await sync_to_async(load)()
+
+
+async def orders_after(supplier_id, last_id, limit=BACKFILL_LIMIT):
+    """Events for ``supplier_id``'s orders with an id above ``last_id``, oldest first.
+
+    Used to catch up a client that reconnects with ``Last-Event-ID``.
+    """
+    rows = Order.objects.filter(
+        supplier_commodity__supplier_id=supplier_id, id__gt=last_id
+    ).order_by('id').values(*EVENT_FIELDS)[:limit]
+    return [to_event(row) async for row in rows]
+
+
+class OrderEventHub:
+    """Fans new orders out to per-supplier subscriber queues from a single poller."""
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.polls = 0
+        self._task = None
+        # Order id -> ordered_at of orders already sent, forgotten once older than the lookback
+        self._sent = {}
+        self._started = None
+
+    @property
+    def connection_count(self):
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    def subscribe(self, supplier_id):
+        """Return a new queue that receives the events for ``supplier_id``'s new orders."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[supplier_id].add(queue)
+        if self._task is None or self._task.done():
+            self._started = timezone.now()
+            self._sent = {}
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, supplier_id, queue):
+        queues = self.subscribers.get(supplier_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[supplier_id]
+
+    def publish(self, supplier_id, event):
+        for queue in self.subscribers.get(supplier_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects with Last-Event-ID to catch up
+                pass
+
+    async def poll(self):
+        """Fetch orders placed since the hub started and not yet sent, and publish them."""
+        cutoff = max(timezone.now() - get_lookback(), self._started)
+        # updated_at is never before ordered_at; filtering on it too lets the change-feed index serve the scan
+        rows = Order.objects.filter(updated_at__gte=cutoff, ordered_at__gte=cutoff).order_by('id').values(
+            *EVENT_FIELDS
+        )
+        async for row in rows:
+            if row['id'] not in self._sent:
+                self._sent[row['id']] = row['ordered_at']
+                self.publish(row['supplier_commodity__supplier_id'], to_event(row))
+        self._sent = {order_id: moment for order_id, moment in self._sent.items() if moment >= cutoff}
+        self.polls += 1
+
+    async def _run(self):
+        while self.subscribers:
+            await self.poll()
+            await asyncio.sleep(get_poll_interval())
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    """The hub for the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = OrderEventHub()
+    return _hubs[loop]
+
+
+async def stream_orders(supplier_id, last_id=None):
+    """Yield ``text/event-stream`` chunks for ``supplier_id``'s new orders, forever.
+
+    Orders after ``last_id`` (a client's ``Last-Event-ID``) are sent first. A
+    comment goes out when nothing else has for a while, so proxies keep the
+    connection open.
+    """
+    hub = get_hub()
+    # Subscribe before catching up so nothing placed in between is missed
+    queue = hub.subscribe(supplier_id)
+    try:
+        yield "retry: 5000\n\n"
+        sent = last_id or 0
+        for event in await orders_after(supplier_id, sent) if last_id is not None else []:
+            sent = event['id']
+            yield format_sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), get_heartbeat_interval())
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event['id'] > sent:
+                sent = event['id']
+                yield format_sse(event)
+    finally:
+        hub.unsubscribe(supplier_id, queue)
+
+
+async def wait_for_orders(supplier_id, after, timeout=None):
+    """Events for ``supplier_id``'s orders after id ``after``; waits up to ``timeout`` seconds for one."""
+    hub = get_hub()
+    queue = hub.subscribe(supplier_id)
+    try:
+        found = await orders_after(supplier_id, after)
+        if not found:
+            try:
+                found.append(await asyncio.wait_for(queue.get(), timeout or get_long_poll_timeout()))
+            except asyncio.TimeoutError:
+                return []
+        while not queue.empty():
+            found.append(queue.get_nowait())
+    finally:
+        hub.unsubscribe(supplier_id, queue)
+    unique = {event['id']: event for event in found if event['id'] > after}
+    return [unique[order_id] for order_id in sorted(unique)]
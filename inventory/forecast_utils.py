@@ -1,74 +1,29 @@
-# from prophet import Prophet
-# from django.http import JsonResponse
-# from inventory.models import Order, SupplierCommodity
-# import pandas as pd
-# import logging
-# logger = logging.getLogger(__name__)
-
-# def forecast_demand(request, supplier_id):
-#     supplier_commodities = SupplierCommodity.objects.filter(supplier_id=supplier_id)
-    
-#     response = {}
-
-#     for sc in supplier_commodities:
-#         orders = Order.objects.filter(
-#             supplier_commodity_id=sc.id, status='accepted'
-#         ).order_by('ordered_at')
-
-#         if orders.count() < 2:
-#             response[sc.commodity.name] = "Not enough data"
-#             continue
-
-#         df = pd.DataFrame(list(orders.values('ordered_at', 'quantity_requested')))
-#         df['ds'] = pd.to_datetime(df['ordered_at']).dt.tz_localize(None)
-#         df = df.groupby('ds')['quantity_requested'].sum().reset_index()
-#         df.rename(columns={'quantity_requested': 'y'}, inplace=True)
-    
-#         logger.info(f"DataFrame for commodity {sc.commodity.name}:\n{df}")
-
-#         model = Prophet()
-#         model.fit(df)
-
-#         future = model.make_future_dataframe(periods=7)
-#         forecast = model.predict(future)
-
-#         result = forecast[['ds', 'yhat']].tail(7)
-#         response[sc.commodity.name] = result.to_dict(orient='records')
-
-#     return JsonResponse(response, safe=False)
-
-
-from prophet import Prophet
 from django.http import JsonResponse
-from inventory.models import Order, SupplierCommodity
-import pandas as pd
+from inventory.demand import EMPTY_SERIES, load_daily_demand
+from inventory.forecasting import fit_many
+from inventory.models import SupplierCommodity
 
 def forecast_demand(request, supplier_id):
-    supplier_commodities = SupplierCommodity.objects.filter(supplier_id=supplier_id)
-    
-    response = {}
-
-    for sc in supplier_commodities:
-        orders = Order.objects.filter(
-            supplier_commodity_id=sc.id, status='accepted'
-        ).order_by('ordered_at')
+    supplier_commodities = SupplierCommodity.objects.filter(supplier_id=supplier_id).select_related('commodity')
 
-        if orders.count() < 2:
-            response[sc.commodity.name] = "Not enough data"
-            continue
+    # All accepted-order history for the supplier in one query
+    demand = load_daily_demand(supplier_id=supplier_id)
+    jobs = {
+        sc.id: (sc.commodity.name, demand.get(sc.id, EMPTY_SERIES), sc.forecast_backend or None)
+        for sc in supplier_commodities
+    }
 
-        df = pd.DataFrame(list(orders.values('ordered_at', 'quantity_requested')))
-        df['ds'] = pd.to_datetime(df['ordered_at']).dt.tz_localize(None)
-        df = df.groupby('ds')['quantity_requested'].sum().reset_index()
-        df.rename(columns={'quantity_requested': 'y'}, inplace=True)
+    # Fit every commodity at once across the forecast process pool
+    results = fit_many(jobs, min_orders=2)
 
-        model = Prophet()
-        model.fit(df)
-
-        future = model.make_future_dataframe(periods=7)
-        forecast = model.predict(future)
-
-        result = forecast[['ds', 'yhat']].tail(7)
-        response[sc.commodity.name] = result.to_dict(orient='records')
+    response = {}
+    for sc_id, (name, series, backend) in jobs.items():
+        fields, error = results[sc_id]
+        if error:
+            response[name] = "Forecast failed"
+        elif fields['status'] != 'ok':
+            response[name] = "Not enough data"
+        else:
+            response[name] = [{'ds': p['ds'], 'yhat': p['yhat']} for p in fields['points']]
 
     return JsonResponse(response, safe=False)
@@ -0,0 +1,145 @@
+"""Forecasting backends.
+
+A backend takes demand histories as ``(ds, y)`` NumPy array pairs and returns,
+per history, a dict of arrays ``ds``, ``yhat``, ``yhat_lower`` and
+``yhat_upper`` covering the history plus ``horizon`` future days.
+``FORECAST_BACKEND`` picks the deployment default and
+``SupplierCommodity.forecast_backend`` can override it per commodity.
+"""
+import numpy as np
+from django.conf import settings
+
+# z-score of an 80% interval, matching Prophet's default interval_width
+INTERVAL_Z = 1.2816
+
+
+class ProphetForecaster:
+    """Fits one Prophet model per series. Accurate but slow; best run in the process pool."""
+    name = 'prophet'
+    batched = False
+
+    def predict(self, histories, horizon):
+        # Imported here so processes that never fit with Prophet don't pay for it
+        import pandas as pd
+        from prophet import Prophet
+
+        forecasts = []
+        for ds, y in histories:
+            model = Prophet()
+            model.fit(pd.DataFrame({'ds': ds, 'y': y}))
+            future = model.make_future_dataframe(periods=horizon)
+            forecast = model.predict(future)
+            forecasts.append({
+                'ds': forecast['ds'].to_numpy(dtype='datetime64[s]'),
+                **{column: forecast[column].to_numpy() for column in ('yhat', 'yhat_lower', 'yhat_upper')},
+            })
+        return forecasts
+
+
+class HoltWintersForecaster:
+    """Additive Holt-Winters with weekly seasonality, vectorized over series with NumPy.
+
+    All series are resampled to daily totals and stacked right-aligned into one
+    matrix, so a single pass over the time axis fits every series at once.
+    Series shorter than two weeks are fitted without the seasonal term.
+    """
+    name = 'holt_winters'
+    batched = True
+
+    alpha = 0.3   # level smoothing
+    beta = 0.05   # trend smoothing
+    gamma = 0.2   # seasonal smoothing
+    season = 7
+
+    def predict(self, histories, horizon):
+        if not histories:
+            return []
+
+        # Daily totals from each series' first day, with missing days as zero
+        first_days = []
+        daily = []
+        for ds, y in histories:
+            days = ds.astype('datetime64[D]')
+            first_days.append(days[0])
+            daily.append(np.bincount((days - days[0]).astype(int), weights=y))
+        lengths = np.array([len(d) for d in daily])
+        n_series, n_steps = len(daily), lengths.max()
+        m = self.season
+
+        # Right-align every series; start[i] is the column of its first day
+        values = np.zeros((n_series, n_steps))
+        start = n_steps - lengths
+        for i, d in enumerate(daily):
+            values[i, start[i]:] = d
+
+        seasonal_mask = (lengths >= 2 * m).astype(float)
+        rows = np.arange(n_series)
+
+        # Initial state from the first one or two seasons of each series
+        level = np.empty(n_series)
+        trend = np.zeros(n_series)
+        season = np.zeros((n_series, m))
+        for i in range(n_series):
+            x = values[i, start[i]:]
+            first = x[:m]
+            level[i] = first.mean()
+            if seasonal_mask[i]:
+                trend[i] = (x[m:2 * m].mean() - first.mean()) / m
+                season[i] = first - level[i]
+
+        fitted = np.zeros((n_series, n_steps))
+        for t in range(n_steps):
+            active = t >= start
+            phase = (t - start) % m
+            s = season[rows, phase] * seasonal_mask
+            x = values[:, t]
+
+            fitted[:, t] = level + trend + s
+            new_level = self.alpha * (x - s) + (1 - self.alpha) * (level + trend)
+            new_trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+            new_season = self.gamma * (x - new_level) + (1 - self.gamma) * s
+
+            level = np.where(active, new_level, level)
+            trend = np.where(active, new_trend, trend)
+            season[rows, phase] = np.where(active, new_season, season[rows, phase])
+
+        # Residual spread over each series' own history drives the interval width
+        observed = np.arange(n_steps)[None, :] >= start[:, None]
+        residuals = np.where(observed, values - fitted, np.nan)
+        sigma = np.nan_to_num(np.nanstd(residuals, axis=1))
+
+        steps = np.arange(1, horizon + 1)
+        future_phase = (n_steps - start[:, None] + steps[None, :] - 1) % m
+        future = (level[:, None] + trend[:, None] * steps[None, :]
+                  + season[rows[:, None], future_phase] * seasonal_mask[:, None])
+        future_width = INTERVAL_Z * sigma[:, None] * np.sqrt(steps)[None, :]
+
+        forecasts = []
+        for i in range(n_series):
+            yhat = np.concatenate([fitted[i, start[i]:], future[i]])
+            width = np.concatenate([np.full(lengths[i], INTERVAL_Z * sigma[i]), future_width[i]])
+            forecasts.append({
+                'ds': first_days[i] + np.arange(lengths[i] + horizon),
+                'yhat': yhat,
+                'yhat_lower': yhat - width,
+                'yhat_upper': yhat + width,
+            })
+        return forecasts
+
+
+FORECASTERS = {
+    ProphetForecaster.name: ProphetForecaster,
+    HoltWintersForecaster.name: HoltWintersForecaster,
+}
+
+
+def resolve_backend(name=None):
+    """Return the backend name to use, falling back to ``FORECAST_BACKEND``."""
+    name = name or getattr(settings, 'FORECAST_BACKEND', ProphetForecaster.name)
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecast backend: {name!r}")
+    return name
+
+
+def get_forecaster(name=None):
+    return FORECASTERS[resolve_backend(name)]()
@@ -0,0 +1,316 @@
+"""Demand forecasting for supplier commodities.
+
+Forecasts are fitted out of band (see the ``refresh_forecasts`` management
+command) and stored as ``ForecastResult`` rows, so the forecast page only
+has to read them back. Fits for many commodities are spread over a process
+pool by ``fit_many``.
+"""
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .cache import FORECASTS, bump
+from .demand import EMPTY_SERIES, load_daily_demand
+from .forecasters import FORECASTERS, get_forecaster, resolve_backend
+from .models import ForecastResult, SupplierCommodity
+
+logger = logging.getLogger(__name__)
+
+MIN_ORDERS = 5
+HORIZON_DAYS = 7
+STALE_ID_FILTER_LIMIT = 500
+
+FORECAST_FIELDS = [
+    'status', 'points', 'series', 'history', 'insight',
+    'backend', 'order_count', 'last_order_id', 'fitted_at',
+]
+
+
+def generate_trend_insight(commodity_name, weekly_demand):
+    """Describe the latest week-over-week change in an array of weekly totals."""
+    if len(weekly_demand) < 2:
+        return f"Not enough data to identify a demand trend for {commodity_name}."
+
+    current_week = weekly_demand[-1]
+    previous_week = weekly_demand[-2]
+
+    if previous_week == 0:
+        return f"No prior demand history for {commodity_name} to compare trends."
+
+    change_pct = ((current_week - previous_week) / previous_week) * 100
+    abs_change = abs(change_pct)
+
+    std_dev = weekly_demand.std(ddof=1)
+    volatility_flag = std_dev > 0.3 * weekly_demand.mean() if weekly_demand.mean() != 0 else False
+
+    if abs_change < 5:
+        trend_desc = "remained stable"
+    elif abs_change < 15:
+        trend_desc = "changed slightly"
+    elif abs_change < 30:
+        trend_desc = "changed moderately"
+    else:
+        trend_desc = "changed significantly"
+
+    direction = "increased" if change_pct > 0 else "decreased"
+    base_insight = (
+        f"Demand for {commodity_name} {direction} by {abs_change:.1f}% this week "
+        f"compared to the previous week. This is considered a {trend_desc} trend."
+    )
+
+    if volatility_flag:
+        base_insight += " Note: demand has shown high volatility recently."
+
+    return base_insight
+
+
+def _insufficient(commodity_name):
+    return {
+        'status': 'insufficient',
+        'points': [],
+        'series': [],
+        'history': [],
+        'insight': f"Not enough data to forecast or analyze trends for {commodity_name}.",
+    }
+
+
+def prepare_history(commodity_name, series):
+    """Split a ``DemandSeries`` into ``(ds, y)`` arrays plus the trend insight."""
+    # Weekly demand for trend insight, bucketed by the Monday of each ISO week
+    mondays = series.ds - (series.ds.astype(int) + 3) % 7
+    _, week_index = np.unique(mondays, return_inverse=True)
+    weekly_demand = np.bincount(week_index, weights=series.y)
+    insight = generate_trend_insight(commodity_name, weekly_demand)
+
+    return (series.ds, series.y), insight
+
+
+def _result_fields(history, forecast, insight):
+    points = {
+        key: (values[-HORIZON_DAYS:] if key == 'ds' else np.clip(values[-HORIZON_DAYS:], 0, None))
+        for key, values in forecast.items()
+    }
+    ds, y = history
+
+    return {
+        'status': 'ok',
+        'points': _to_records(points),
+        'series': _to_records(forecast),
+        'history': _to_records({'ds': ds, 'y': y}),
+        'insight': insight,
+    }
+
+
+def build_forecast(commodity_name, series, min_orders=MIN_ORDERS, backend=None):
+    """Fit a forecast for one commodity from its ``DemandSeries``.
+
+    Returns the field values for a ``ForecastResult``.
+    """
+    if series.order_count < min_orders:
+        return _insufficient(commodity_name)
+
+    history, insight = prepare_history(commodity_name, series)
+    forecast = get_forecaster(backend).predict([history], HORIZON_DAYS)[0]
+    return _result_fields(history, forecast, insight)
+
+
+def build_forecast_batch(jobs, min_orders=MIN_ORDERS, backend=None):
+    """Fit ``{key: (commodity_name, series)}`` with one call into a batched backend.
+
+    Returns ``{key: (fields, error)}`` like ``fit_many``.
+    """
+    results = {}
+    prepared = {}
+    for key, (name, series) in jobs.items():
+        if series.order_count < min_orders:
+            results[key] = (_insufficient(name), None)
+            continue
+        try:
+            prepared[key] = prepare_history(name, series)
+        except Exception as exc:
+            results[key] = (None, f"{type(exc).__name__}: {exc}")
+
+    try:
+        forecasts = get_forecaster(backend).predict(
+            [history for history, _ in prepared.values()], HORIZON_DAYS
+        )
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        results.update({key: (None, error) for key in prepared})
+        return results
+
+    for (key, (history, insight)), forecast in zip(prepared.items(), forecasts):
+        results[key] = (_result_fields(history, forecast, insight), None)
+    return results
+
+
+def _to_records(columns):
+    """Convert a dict of equal-length arrays with a ``ds`` column to JSON-friendly records."""
+    columns = {
+        key: (np.datetime_as_string(values.astype('datetime64[s]')) if key == 'ds'
+              else np.asarray(values, dtype=float)).tolist()
+        for key, values in columns.items()
+    }
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+class FitTimeout(Exception):
+    pass
+
+
+def _raise_fit_timeout(signum, frame):
+    raise FitTimeout()
+
+
+def _fit_job(commodity_name, series, min_orders, timeout, backend=None):
+    """Run ``build_forecast`` in a pool worker, never letting an error escape.
+
+    Returns ``(fields, None)`` on success and ``(None, error)`` otherwise. The
+    timeout is enforced inside the worker with ``SIGALRM`` where available, so
+    a slow fit fails on its own instead of stalling the whole batch.
+    """
+    use_alarm = (bool(timeout) and hasattr(signal, 'SIGALRM')
+                 and threading.current_thread() is threading.main_thread())
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_fit_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return build_forecast(commodity_name, series, min_orders, backend), None
+    except FitTimeout:
+        return None, f"timed out after {timeout}s"
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def get_worker_count():
+    return getattr(settings, 'FORECAST_WORKERS', None) or os.cpu_count() or 1
+
+
+def fit_many(jobs, workers=None, timeout=None, min_orders=MIN_ORDERS):
+    """Fit forecasts for ``{key: (commodity_name, series, backend)}``.
+
+    ``backend`` may be ``None`` for the deployment default. Series for batched
+    backends are fitted together in this process; the rest are spread over a
+    process pool. Returns ``{key: (fields, error)}``; a failed or timed-out fit
+    only affects its own key. With a single worker the fits run in this process.
+    """
+    workers = workers or get_worker_count()
+    if timeout is None:
+        timeout = getattr(settings, 'FORECAST_FIT_TIMEOUT', 120)
+
+    results = {}
+    batched = {}
+    pooled = {}
+    for key, (name, series, backend) in jobs.items():
+        backend = resolve_backend(backend)
+        if FORECASTERS[backend].batched:
+            batched.setdefault(backend, {})[key] = (name, series)
+        else:
+            pooled[key] = (name, series, backend)
+
+    for backend, backend_jobs in batched.items():
+        results.update(build_forecast_batch(backend_jobs, min_orders, backend))
+
+    if workers <= 1 or len(pooled) <= 1:
+        for key, (name, series, backend) in pooled.items():
+            results[key] = _fit_job(name, series, min_orders, timeout, backend)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(pooled)), initializer=django.setup) as pool:
+        futures = {
+            key: pool.submit(_fit_job, name, series, min_orders, timeout, backend)
+            for key, (name, series, backend) in pooled.items()
+        }
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except BrokenProcessPool as exc:
+                # A worker died (e.g. killed for memory); only unfinished fits are lost
+                results[key] = (None, f"worker crashed: {exc}")
+    return results
+
+
+def with_order_watermark(queryset):
+    """Annotate supplier commodities with their accepted-order watermark."""
+    accepted = Q(order__status='accepted')
+    return queryset.annotate(
+        accepted_count=Count('order', filter=accepted),
+        last_accepted_id=Max('order__id', filter=accepted),
+    )
+
+
+def is_stale(sc, forecast):
+    """True when accepted orders or the backend changed since ``forecast`` was fitted."""
+    if forecast is None:
+        return True
+    return (forecast.order_count != sc.accepted_count
+            or forecast.last_order_id != sc.last_accepted_id
+            or forecast.backend != resolve_backend(sc.forecast_backend))
+
+
+def refresh_forecasts(supplier_id=None, force=False, workers=None):
+    """Refit forecasts whose accepted orders changed. Returns the number refitted.
+
+    Reads take a fixed number of queries however many commodities are stale.
+    """
+    supplier_commodities = SupplierCommodity.objects.select_related('commodity')
+    forecasts = ForecastResult.objects.all()
+    if supplier_id is not None:
+        supplier_commodities = supplier_commodities.filter(supplier_id=supplier_id)
+        forecasts = forecasts.filter(supplier_commodity__supplier_id=supplier_id)
+    supplier_commodities = with_order_watermark(supplier_commodities)
+    existing = {f.supplier_commodity_id: f for f in forecasts}
+
+    stale = {
+        sc.id: sc for sc in supplier_commodities
+        if force or is_stale(sc, existing.get(sc.id))
+    }
+    if not stale:
+        return 0
+
+    # Narrow the history query to the stale commodities unless that list is huge
+    if len(stale) <= STALE_ID_FILTER_LIMIT:
+        demand = load_daily_demand(supplier_commodity_ids=list(stale))
+    else:
+        demand = load_daily_demand(supplier_id=supplier_id)
+
+    jobs = {
+        sc_id: (sc.commodity.name, demand.get(sc_id, EMPTY_SERIES), sc.forecast_backend or None)
+        for sc_id, sc in stale.items()
+    }
+
+    created = []
+    updated = []
+    for sc_id, (fields, error) in fit_many(jobs, workers=workers).items():
+        sc = stale[sc_id]
+        if error:
+            logger.error("Forecast fit failed for supplier commodity %s: %s", sc_id, error)
+            continue
+
+        forecast = existing.get(sc_id) or ForecastResult(supplier_commodity=sc)
+        for name, value in fields.items():
+            setattr(forecast, name, value)
+        forecast.backend = resolve_backend(sc.forecast_backend)
+        forecast.order_count = sc.accepted_count
+        forecast.last_order_id = sc.last_accepted_id
+        forecast.fitted_at = timezone.now()
+        (updated if forecast.pk else created).append(forecast)
+
+    ForecastResult.objects.bulk_create(created, batch_size=500)
+    ForecastResult.objects.bulk_update(updated, FORECAST_FIELDS, batch_size=500)
+    for owner_id in {stale[forecast.supplier_commodity_id].supplier_id for forecast in created + updated}:
+        bump(FORECASTS, owner_id)
+    return len(created) + len(updated)
@@ -0,0 +1,173 @@
+"""Order fulfilment: accepting and rejecting pending orders.
+
+Stock is only ever decremented by a conditional ``UPDATE`` (or under row
+locks for bulk work) inside a transaction, so concurrent accepts can neither
+lose an update nor oversell a supplier commodity.
+
+Every decrement is written to the stock ledger (``inventory.ledger``) in
+the same transaction.
+
+Pending orders normally hold their stock (see ``inventory.reservations``):
+accepting one consumes its hold and rejecting one releases it.
+
+These paths write with ``update()``, which sends no signals and skips
+``auto_now``, so they bump the dashboard cache versions and set
+``updated_at`` themselves.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ledger
+from .cache import MARKETPLACE, SUPPLIER, VENDOR, bump
+from .models import Order, SupplierCommodity
+from .reservations import release
+
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+INSUFFICIENT_STOCK = 'insufficient_stock'
+NOT_PENDING = 'not_pending'
+
+
+def _invalidate_caches(supplier_id, vendor_ids, stock_changed):
+    for vendor_id in set(vendor_ids):
+        bump(VENDOR, vendor_id)
+    bump(SUPPLIER, supplier_id)
+    if stock_changed:
+        bump(MARKETPLACE)
+
+
+def accept_order(order):
+    """Accept a pending order and take its quantity out of stock.
+
+    An order still holding its stock (see ``inventory.reservations``) turns
+    the hold into the decrement; any other order needs stock nobody holds.
+    Returns ``ACCEPTED``, ``INSUFFICIENT_STOCK`` or ``NOT_PENDING``.
+    """
+    quantity = order.quantity_requested
+    with transaction.atomic():
+        # Claim the order first so two accepts of the same order can't both succeed
+        now = timezone.now()
+        held = Order.objects.filter(id=order.id, status='pending', hold_expires_at__isnull=False).update(
+            status='accepted', hold_expires_at=None, updated_at=now
+        )
+        if held:
+            decremented = SupplierCommodity.objects.filter(
+                id=order.supplier_commodity_id, available_units__gte=quantity,
+            ).update(
+                available_units=F('available_units') - quantity, reserved_units=F('reserved_units') - quantity,
+                updated_at=now,
+            )
+        else:
+            claimed = Order.objects.filter(id=order.id, status='pending').update(status='accepted', updated_at=now)
+            if not claimed:
+                return NOT_PENDING
+            decremented = SupplierCommodity.objects.filter(
+                id=order.supplier_commodity_id, available_units__gte=F('reserved_units') + quantity,
+            ).update(available_units=F('available_units') - quantity, updated_at=now)
+        if not decremented:
+            transaction.set_rollback(True)
+            return INSUFFICIENT_STOCK
+        ledger.record(order.supplier_commodity_id, ledger.SALE, -quantity, order_id=order.id, at=now)
+
+        _invalidate_caches(order.supplier_commodity.supplier_id, [order.vendor_id], stock_changed=True)
+
+    order.status = 'accepted'
+    order.hold_expires_at = None
+    return ACCEPTED
+
+
+def reject_order(order):
+    """Reject a pending order and release its hold. Returns ``REJECTED`` or ``NOT_PENDING``."""
+    with transaction.atomic():
+        now = timezone.now()
+        held = Order.objects.filter(id=order.id, status='pending', hold_expires_at__isnull=False).update(
+            status='rejected', hold_expires_at=None, updated_at=now
+        )
+        if held:
+            release({order.supplier_commodity_id: order.quantity_requested}, now)
+        elif not Order.objects.filter(id=order.id, status='pending').update(status='rejected', updated_at=now):
+            return NOT_PENDING
+    _invalidate_caches(order.supplier_commodity.supplier_id, [order.vendor_id], stock_changed=bool(held))
+    order.status = 'rejected'
+    order.hold_expires_at = None
+    return REJECTED
+
+
+def bulk_accept_orders(supplier, order_ids):
+    """Accept many of ``supplier``'s pending orders in a constant number of queries.
+
+    Orders are locked, then their supplier commodities; stock is allocated
+    oldest order first, held orders from their hold and the rest from stock
+    nobody holds. Orders that no longer fit stay pending. Returns
+    ``{order_id: outcome}`` for every requested id.
+    """
+    results = {order_id: NOT_PENDING for order_id in order_ids}
+
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update(of=('self',))
+            .filter(id__in=order_ids, supplier_commodity__supplier=supplier, status='pending')
+            .order_by('ordered_at', 'id')
+        )
+        stock = {
+            sc.id: sc
+            for sc in SupplierCommodity.objects.select_for_update()
+            .filter(id__in={order.supplier_commodity_id for order in orders})
+            .order_by('id')
+        }
+
+        accepted = []
+        now = timezone.now()
+        for order in orders:
+            sc = stock[order.supplier_commodity_id]
+            if order.hold_expires_at is not None and order.quantity_requested <= sc.available_units:
+                sc.available_units -= order.quantity_requested
+                sc.reserved_units -= order.quantity_requested
+                sc.updated_at = now
+                accepted.append(order.id)
+                results[order.id] = ACCEPTED
+            elif order.hold_expires_at is None and order.quantity_requested <= sc.available_to_promise:
+                sc.available_units -= order.quantity_requested
+                sc.updated_at = now
+                accepted.append(order.id)
+                results[order.id] = ACCEPTED
+            else:
+                results[order.id] = INSUFFICIENT_STOCK
+
+        if accepted:
+            SupplierCommodity.objects.bulk_update(stock.values(), ['available_units', 'reserved_units', 'updated_at'])
+            Order.objects.filter(id__in=accepted).update(status='accepted', hold_expires_at=None, updated_at=now)
+            ledger.record_many(
+                (order.supplier_commodity_id, ledger.SALE, -order.quantity_requested, order.id)
+                for order in orders if results[order.id] == ACCEPTED
+            )
+            _invalidate_caches(
+                supplier.id, [order.vendor_id for order in orders if results[order.id] == ACCEPTED],
+                stock_changed=True,
+            )
+
+    return results
+
+
+def bulk_reject_orders(supplier, order_ids):
+    """Reject many of ``supplier``'s pending orders with a single update, releasing their holds."""
+    results = {order_id: NOT_PENDING for order_id in order_ids}
+    with transaction.atomic():
+        pending = list(
+            Order.objects.select_for_update(of=('self',))
+            .filter(id__in=order_ids, supplier_commodity__supplier=supplier, status='pending')
+            .values_list('id', 'vendor_id', 'supplier_commodity_id', 'quantity_requested', 'hold_expires_at')
+        )
+        rejected = {order_id: vendor_id for order_id, vendor_id, _, _, _ in pending}
+        held = {}
+        for _, _, sc_id, quantity, hold_expires_at in pending:
+            if hold_expires_at is not None:
+                held[sc_id] = held.get(sc_id, 0) + quantity
+        now = timezone.now()
+        Order.objects.filter(id__in=rejected).update(status='rejected', hold_expires_at=None, updated_at=now)
+        release(held, now)
+        if rejected:
+            _invalidate_caches(supplier.id, rejected.values(), stock_changed=bool(held))
+    results.update({order_id: REJECTED for order_id in rejected})
+    return results
@@ -0,0 +1,171 @@
+"""Append-only stock ledger with snapshots.
+
+Every change to a listing's ``available_units`` is also written, in the
+same transaction, as a ``StockMovement``:
+
+* receipts: the stock a new listing starts with
+* sales: accepted orders
+* adjustments: edits by the supplier, imports and opening balances
+
+So the movements of a listing always add up to its current stock.
+
+``compact`` writes a ``StockSnapshot`` (stock as of a moment) for every
+listing that moved since the last one. Stock at any time T is then the
+newest snapshot at or before T plus the short tail of movements between the
+two. That is two indexed reads, however long the history is. Run
+``compact_stock_ledger`` every ``STOCK_SNAPSHOT_INTERVAL_SECONDS`` to keep
+the tails short. Snapshots are taken ``STOCK_SNAPSHOT_SETTLE_SECONDS`` in
+the past, so movements still being committed are never left out of one.
+Compaction only adds snapshots; movements are never deleted or rewritten.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockMovement, StockSnapshot, SupplierCommodity
+
+RECEIPT = StockMovement.RECEIPT
+SALE = StockMovement.SALE
+ADJUSTMENT = StockMovement.ADJUSTMENT
+
+ZERO = Decimal('0')
+# Lower bound for tails of listings without a snapshot
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+UNITS = DecimalField(max_digits=12, decimal_places=2)
+
+
+def get_settle_delay():
+    return timedelta(seconds=getattr(settings, 'STOCK_SNAPSHOT_SETTLE_SECONDS', 60))
+
+
+def _epoch():
+    return EPOCH if settings.USE_TZ else EPOCH.replace(tzinfo=None)
+
+
+def record(supplier_commodity_id, kind, quantity, order_id=None, at=None):
+    """Write one movement; ``quantity`` is the signed change in stock."""
+    return StockMovement.objects.create(
+        supplier_commodity_id=supplier_commodity_id, kind=kind, quantity=quantity, order_id=order_id,
+        created_at=at or timezone.now(),
+    )
+
+
+def record_many(movements):
+    """Write ``(supplier_commodity_id, kind, quantity, order_id)`` tuples with one insert; zero changes are skipped."""
+    now = timezone.now()
+    return StockMovement.objects.bulk_create(
+        StockMovement(
+            supplier_commodity_id=sc_id, kind=kind, quantity=quantity, order_id=order_id, created_at=now,
+        )
+        for sc_id, kind, quantity, order_id in movements
+        if quantity
+    )
+
+
+def stock_before_save(listing, update_fields=None):
+    """The stored stock of a listing about to be saved, locked until the save commits.
+
+    ``None`` when the save won't write ``available_units``.
+    """
+    if update_fields is not None and 'available_units' not in update_fields:
+        return None
+    if listing.pk is None:
+        return ZERO
+    stored = SupplierCommodity.objects.select_for_update().filter(pk=listing.pk).values_list(
+        'available_units', flat=True
+    ).first()
+    return ZERO if stored is None else stored
+
+
+def record_saved_stock(listing, created, before):
+    """Record the movement for a ``SupplierCommodity.save()`` (see ``stock_before_save``)."""
+    if before is None and not created:
+        return
+    units = Decimal(str(listing.available_units))
+    if created:
+        if units:
+            record(listing.pk, RECEIPT, units)
+    elif units != before:
+        record(listing.pk, ADJUSTMENT, units - before)
+
+
+def stock_at(supplier_commodity_id, at):
+    """``available_units`` of a listing as it was at ``at`` (zero before its first movement)."""
+    snapshot = (
+        StockSnapshot.objects.filter(supplier_commodity_id=supplier_commodity_id, taken_at__lte=at)
+        .order_by('-taken_at').values_list('taken_at', 'units').first()
+    )
+    since, units = snapshot or (_epoch(), ZERO)
+    tail = StockMovement.objects.filter(
+        supplier_commodity_id=supplier_commodity_id, created_at__gt=since, created_at__lte=at,
+    ).aggregate(total=Sum('quantity'))['total']
+    return units + (tail or ZERO)
+
+
+def with_stock_at(listings, at, name='stock_at'):
+    """Annotate a listing queryset with its stock at ``at`` as ``name``, in the same query."""
+    snapshots = StockSnapshot.objects.filter(supplier_commodity=OuterRef('pk'), taken_at__lte=at).order_by('-taken_at')
+    since, units = f'_{name}_since', f'_{name}_units'
+    listings = listings.alias(**{
+        since: Coalesce(Subquery(snapshots.values('taken_at')[:1]), Value(_epoch())),
+        units: Coalesce(Subquery(snapshots.values('units')[:1]), Value(ZERO), output_field=UNITS),
+    })
+    tail = _total(StockMovement.objects.filter(
+        supplier_commodity=OuterRef('pk'), created_at__gt=OuterRef(since), created_at__lte=at,
+    ))
+    return listings.annotate(**{name: F(units) + tail})
+
+
+def _total(movements):
+    """A subquery summing ``movements`` of the outer listing (zero when there are none)."""
+    total = movements.order_by().values('supplier_commodity').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total), Value(ZERO), output_field=UNITS)
+
+
+def with_turnover(listings, start, end):
+    """Annotate listings with ``opening`` and ``closing`` stock and units ``sold`` between ``start`` and ``end``."""
+    return with_stock_at(with_stock_at(listings, start, 'opening'), end, 'closing').annotate(
+        sold=-_total(StockMovement.objects.filter(
+            supplier_commodity=OuterRef('pk'), kind=SALE, created_at__gt=start, created_at__lte=end,
+        )),
+    )
+
+
+def stock_turns(listing):
+    """Units sold over average stock for a ``with_turnover`` listing; ``None`` if it held no stock."""
+    average = (listing.opening + listing.closing) / 2
+    return round(listing.sold / average, 2) if average > 0 else None
+
+
+def compact(until=None):
+    """Snapshot every listing that moved since the last compaction, as of ``until``.
+
+    ``until`` defaults to ``STOCK_SNAPSHOT_SETTLE_SECONDS`` ago. Returns the
+    number of snapshots written.
+    """
+    until = until or timezone.now() - get_settle_delay()
+    with transaction.atomic():
+        # Each run snapshots everything that moved after the previous one, so a
+        # listing's newest snapshot is always current as of this watermark
+        watermark = StockSnapshot.objects.aggregate(latest=Max('taken_at'))['latest']
+        if watermark is not None and watermark >= until:
+            return 0
+        latest = StockSnapshot.objects.filter(supplier_commodity=OuterRef('supplier_commodity')).order_by('-taken_at')
+        changes = (
+            StockMovement.objects.filter(created_at__gt=watermark or _epoch(), created_at__lte=until)
+            .order_by().values('supplier_commodity')
+            .annotate(change=Sum('quantity'), previous=Subquery(latest.values('units')[:1]))
+        )
+        snapshots = StockSnapshot.objects.bulk_create(
+            StockSnapshot(
+                supplier_commodity_id=row['supplier_commodity'], taken_at=until,
+                units=(row['previous'] or ZERO) + row['change'],
+            )
+            for row in changes.iterator()
+        )
+    return len(snapshots)
@@ -0,0 +1,59 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventory.demand import DemandSeries
+from inventory.forecasting import fit_many, get_worker_count
+
+
+def synthetic_history(rng, days):
+    """Daily accepted demand with a weekly pattern, a trend and noise."""
+    start = date(2024, 1, 1)
+    base = rng.uniform(5, 50)
+    trend = rng.uniform(-0.05, 0.2)
+    quantities = []
+    for day in range(days):
+        weekly = 1.0 + 0.3 * (day % 7 in (5, 6))
+        quantities.append(max(1, int(rng.gauss((base + trend * day) * weekly, base * 0.2))))
+    return DemandSeries.from_days([start + timedelta(days=day) for day in range(days)], quantities)
+
+
+class Command(BaseCommand):
+    help = "Compare serial and parallel forecast fitting on synthetic order histories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                            help="Numbers of commodities to fit.")
+        parser.add_argument("--days", type=int, default=90, help="Days of order history per commodity.")
+        parser.add_argument("--workers", type=int, help="Parallel worker processes (default: FORECAST_WORKERS).")
+        parser.add_argument("--backend", help="Forecast backend to benchmark (default: FORECAST_BACKEND).")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        workers = options["workers"] or get_worker_count()
+
+        self.stdout.write(f"{'commodities':>12} {'serial (s)':>12} {'parallel (s)':>13} {'speedup':>8}")
+        for size in options["sizes"]:
+            jobs = {
+                i: (f"Commodity {i}", synthetic_history(rng, options["days"]), options["backend"])
+                for i in range(size)
+            }
+
+            started = time.perf_counter()
+            fit_many(jobs, workers=1)
+            serial = time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = fit_many(jobs, workers=workers)
+            parallel = time.perf_counter() - started
+
+            failed = sum(1 for _, error in results.values() if error)
+            line = f"{size:>12} {serial:>12.2f} {parallel:>13.2f} {serial / parallel:>7.1f}x"
+            if failed:
+                line += f"  ({failed} failed)"
+            self.stdout.write(line)
+
+        self.stdout.write(f"Parallel runs used {workers} worker process(es).")
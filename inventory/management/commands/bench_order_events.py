@@ -0,0 +1,159 @@
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from inventory.events import get_hub
+from inventory.models import User, ListCommodity, SupplierCommodity, Order
+
+PREFIX = "bench-events"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SimulatedClient:
+    """An EventSource connection driven straight through the ASGI application."""
+
+    def __init__(self, cookie, path):
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        self.connected = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.status = None
+        self.received = {}
+        self._requested = False
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            return
+        arrived = time.perf_counter()
+        for chunk in message.get('body', b'').decode().split('\n\n'):
+            if chunk.startswith('retry:'):
+                self.connected.set()
+            elif chunk.startswith('id: '):
+                self.received[int(chunk.split('\n', 1)[0][4:])] = arrived
+        if not message.get('more_body'):
+            # The response ended early (e.g. access denied)
+            self.connected.set()
+
+
+class Command(BaseCommand):
+    help = ("Load-test the supplier order event stream in process: open many idle SSE connections, "
+            "place orders, and measure delivery latency and memory per connection.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=1000, help="Open event-stream connections.")
+        parser.add_argument("--suppliers", type=int, default=20, help="Suppliers the connections are spread over.")
+        parser.add_argument("--orders", type=int, default=50, help="Orders to place while the clients listen.")
+        parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for every delivery.")
+
+    def handle(self, *args, **options):
+        cookies, listings, vendor = self.setup(options["suppliers"])
+        try:
+            asyncio.run(self.run(cookies, listings, vendor, options))
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+            ListCommodity.objects.filter(name__startswith=PREFIX).delete()
+
+    def setup(self, supplier_count):
+        vendor = User.objects.create(username=f"{PREFIX}-vendor", role="vendor")
+        commodity = ListCommodity.objects.create(name=f"{PREFIX} commodity")
+        cookies, listings = {}, {}
+        for i in range(supplier_count):
+            supplier = User.objects.create(username=f"{PREFIX}-supplier-{i}", role="supplier")
+            listings[supplier.id] = SupplierCommodity.objects.create(
+                supplier=supplier, commodity=commodity, unit="kg", price_per_unit=1,
+                manufactured_company="Bench", available_units=10 ** 6,
+            )
+            client = Client()
+            client.force_login(supplier)
+            cookies[supplier.id] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        return cookies, listings, vendor
+
+    async def run(self, cookies, listings, vendor, options):
+        application = get_asgi_application()
+        supplier_ids = list(cookies)
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+
+        started = time.perf_counter()
+        clients, tasks = [], []
+        for i in range(options["clients"]):
+            supplier_id = supplier_ids[i % len(supplier_ids)]
+            client = SimulatedClient(cookies[supplier_id], "/supplier/orders/events/")
+            clients.append((supplier_id, client))
+            tasks.append(asyncio.create_task(application(client.scope, client.receive, client.send)))
+        await asyncio.gather(*(client.connected.wait() for _, client in clients))
+        connect_seconds = time.perf_counter() - started
+        refused = sum(client.status != 200 for _, client in clients)
+
+        # Let the connections go idle before measuring what they hold
+        await asyncio.sleep(0.5)
+        memory = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+        tracemalloc.stop()
+
+        hub = get_hub()
+        polls_before = hub.polls
+        placed = {}
+        create_order = sync_to_async(Order.objects.create)
+        for i in range(options["orders"]):
+            supplier_id = supplier_ids[i % len(supplier_ids)]
+            order = await create_order(
+                vendor=vendor, supplier_commodity=listings[supplier_id], quantity_requested=1, status="pending"
+            )
+            placed[order.id] = (supplier_id, time.perf_counter())
+            await asyncio.sleep(0.01)
+
+        expected = sum(
+            1 for supplier_id, client in clients for order_id, (owner, _) in placed.items() if owner == supplier_id
+        )
+        deadline = time.perf_counter() + options["timeout"]
+        while time.perf_counter() < deadline:
+            delivered = sum(
+                1 for supplier_id, client in clients for order_id in client.received if order_id in placed
+            )
+            if delivered >= expected:
+                break
+            await asyncio.sleep(0.1)
+        latencies = [
+            arrived - placed[order_id][1]
+            for _, client in clients for order_id, arrived in client.received.items() if order_id in placed
+        ]
+        polls = hub.polls - polls_before
+
+        for _, client in clients:
+            client.closed.set()
+        done, pending = await asyncio.wait(tasks, timeout=5)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        self.stdout.write(f"connections      {len(clients)} ({refused} refused), opened in {connect_seconds:.2f}s")
+        self.stdout.write(f"memory           {memory / 1024:.0f} KiB total, "
+                          f"{memory / max(len(clients), 1) / 1024:.1f} KiB per idle connection")
+        self.stdout.write(f"deliveries       {len(latencies)}/{expected}")
+        if latencies:
+            self.stdout.write(f"latency (ms)     p50 {percentile(latencies, 50) * 1000:.0f}  "
+                              f"p95 {percentile(latencies, 95) * 1000:.0f}  max {max(latencies) * 1000:.0f}")
+        self.stdout.write(f"database polls   {polls} for all connections "
+                          f"(every {settings.ORDER_EVENTS_POLL_SECONDS}s)")
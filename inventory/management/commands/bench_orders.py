@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from inventory.models import User, ListCommodity, SupplierCommodity, Order
+
+
+class Command(BaseCommand):
+    help = "Compare placing N orders one POST at a time with one cart POST (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[10, 50, 200],
+                            help="Numbers of order lines to place.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vendor = User.objects.create(username="bench-cart-vendor", role="vendor")
+            supplier = User.objects.create(username="bench-cart-supplier", role="supplier")
+            listings = [
+                SupplierCommodity.objects.create(
+                    supplier=supplier, commodity=ListCommodity.objects.create(name=f"Bench cart item {i}"),
+                    unit="kg", price_per_unit=10, manufactured_company="Bench", available_units=10 ** 6,
+                )
+                for i in range(max(options["lines"]))
+            ]
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(vendor)
+
+            self.stdout.write(f"{'lines':>6} {'single (s)':>11} {'cart (s)':>9} {'orders/s single':>16} "
+                              f"{'orders/s cart':>14} {'speedup':>8}")
+            for count in options["lines"]:
+                batch = listings[:count]
+
+                # Each single order is a POST plus the redirect back to the dashboard, as in the browser
+                started = time.perf_counter()
+                for listing in batch:
+                    client.post(reverse("place_order", args=[listing.id]), {"quantity": 1}, follow=True)
+                single = time.perf_counter() - started
+
+                started = time.perf_counter()
+                client.post(reverse("place_cart_order"), {f"cart_{listing.id}": 1 for listing in batch}, follow=True)
+                cart = time.perf_counter() - started
+
+                placed = Order.objects.filter(vendor=vendor).count()
+                if placed != 2 * count:
+                    self.stderr.write(f"Expected {2 * count} orders, found {placed}.")
+                Order.objects.filter(vendor=vendor).delete()
+                self.stdout.write(f"{count:>6} {single:>11.3f} {cart:>9.3f} {count / single:>16.0f} "
+                                  f"{count / cart:>14.0f} {single / cart:>7.1f}x")
+            transaction.set_rollback(True)
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Q
+
+from inventory.models import User, ListCommodity, SupplierCommodity
+from inventory.search import build_search_document, ensure_search_index, fallback_index, search_listings
+
+GOODS = ["rice", "wheat", "sugar", "salt", "cotton", "steel", "copper", "cement", "timber", "paper",
+         "maize", "barley", "lentils", "turmeric", "pepper", "cardamom", "tea", "coffee", "jute", "rubber",
+         "glass", "plastic", "wire", "paint", "bricks", "tiles", "pipes", "bolts", "fabric", "yarn"]
+GRADES = ["premium", "basmati", "organic", "refined", "raw", "grade", "export", "fine", "coarse", "industrial"]
+CITIES = ["mumbai", "delhi", "bengaluru", "chennai", "kolkata", "pune", "hyderabad", "jaipur", "lucknow",
+          "indore", "nagpur", "surat", "kochi", "mysuru", "patna", "bhopal", "ranchi", "guwahati", "vadodara"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "Measure marketplace search latency over synthetic listings (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100000, help="Number of listings to generate.")
+        parser.add_argument("--queries", type=int, default=200, help="Number of searches to time.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self.stdout.write(f"Generating {options['listings']} listings...")
+            self.seed_listings(rng, options["listings"])
+            queries = [self.random_query(rng) for _ in range(options["queries"])]
+            listings = SupplierCommodity.objects.select_related('commodity', 'supplier').filter(available_units__gt=0)
+
+            if connection.vendor == 'postgresql':
+                ensure_search_index()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {SupplierCommodity._meta.db_table}")
+                self.stdout.write("Backend: PostgreSQL full-text search (GIN)")
+            else:
+                fallback_index.invalidate()
+                started = time.perf_counter()
+                fallback_index.get()
+                self.stdout.write(f"Backend: in-process inverted index "
+                                  f"(built in {time.perf_counter() - started:.2f}s)")
+
+            self.report("search", queries, lambda q: search_listings(listings, q))
+            self.report("icontains", queries, lambda q: listings.filter(
+                Q(commodity__name__icontains=q) | Q(supplier__username__icontains=q) | Q(supplier__address__icontains=q)
+            ).order_by('commodity__name', 'id'))
+            transaction.set_rollback(True)
+
+    def seed_listings(self, rng, count):
+        suppliers = User.objects.bulk_create(
+            (User(username=f"bench-supplier-{i}", role="supplier",
+                  address=f"{rng.randint(1, 999)} market road {rng.choice(CITIES)}")
+             for i in range(max(1, count // 200))),
+            batch_size=1000,
+        )
+        commodities = ListCommodity.objects.bulk_create(
+            (ListCommodity(name=f"{rng.choice(GRADES)} {rng.choice(GOODS)} {i}") for i in range(max(1, count // 50))),
+            batch_size=1000,
+        )
+        SupplierCommodity.objects.bulk_create(
+            (self.listing(rng, rng.choice(suppliers), rng.choice(commodities)) for _ in range(count)),
+            batch_size=1000,
+        )
+
+    def listing(self, rng, supplier, commodity):
+        return SupplierCommodity(
+            supplier=supplier, commodity=commodity, unit="kg",
+            price_per_unit=rng.randint(10, 500), manufactured_company="Bench",
+            available_units=rng.choice([0] + [rng.randint(1, 1000)] * 9),
+            search_document=build_search_document(commodity.name, supplier.username, supplier.address),
+        )
+
+    def random_query(self, rng):
+        word = rng.choice(GOODS)
+        kind = rng.random()
+        if kind < 0.4:
+            return word[:rng.randint(2, len(word))]      # typing a prefix
+        if kind < 0.8:
+            return f"{rng.choice(GRADES)} {word}"
+        return f"{word} {rng.choice(CITIES)}"
+
+    def report(self, label, queries, search):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            page = Paginator(search(query), 20).get_page(1)
+            list(page)
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"{label:>10}: p50 {statistics.median(timings):7.1f} ms  "
+            f"p95 {percentile(timings, 95):7.1f} ms  max {max(timings):7.1f} ms"
+        )
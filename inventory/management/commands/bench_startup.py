@@ -0,0 +1,52 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Run in a fresh interpreter so nothing is already imported
+PROBE = """
+import os, resource, sys, time
+started = time.perf_counter()
+import vsm.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss * (1 if sys.platform == 'darwin' else 1024))
+"""
+
+# The analytics libraries views.py used to import eagerly
+ANALYTICS_STACK = ['pandas', 'matplotlib', 'matplotlib.pyplot', 'prophet']
+
+
+class Command(BaseCommand):
+    help = "Measure web worker boot time and peak RSS for `import vsm.wsgi` plus the URLconf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per scenario.")
+
+    def probe(self, modules):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "vsm.settings")}
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, *modules],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        return float(output[-2]), int(output[-1])
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ("web worker (lazy analytics)", []),
+            ("with analytics stack loaded", ANALYTICS_STACK),
+        ]
+
+        self.stdout.write(f"{'scenario':<30} {'import (ms)':>12} {'peak RSS (MB)':>14}")
+        for label, modules in scenarios:
+            runs = [self.probe(modules) for _ in range(options["repeat"])]
+            elapsed = statistics.median(run[0] for run in runs)
+            rss = statistics.median(run[1] for run in runs)
+            self.stdout.write(f"{label:<30} {elapsed * 1000:>12.0f} {rss / 2**20:>14.1f}")
@@ -0,0 +1,109 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory import ledger
+from inventory.models import User, ListCommodity, SupplierCommodity, StockMovement, StockSnapshot
+
+PREFIX = "bench-ledger"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Fill the stock ledger with millions of movements, compacting once per simulated interval, and "
+            "time stock-at-T reads as it grows against replaying every movement.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movements", type=int, default=1000000, help="Movements to write in total.")
+        parser.add_argument("--listings", type=int, default=200, help="Listings the movements are spread over.")
+        parser.add_argument("--days", type=int, default=365, help="Days of history the movements cover.")
+        parser.add_argument("--snapshots-per-day", type=int, default=24, help="Compactions per simulated day.")
+        parser.add_argument("--checkpoints", type=int, default=4, help="How many times to measure along the way.")
+        parser.add_argument("--queries", type=int, default=200, help="Timed reads per checkpoint.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        # Compaction works from the newest snapshot, so simulated history can't start behind real ones
+        if StockSnapshot.objects.exists():
+            raise CommandError("The stock ledger already has snapshots; run this against a scratch database.")
+        rng = random.Random(options["seed"])
+        listing_ids = self.setup(options["listings"])
+        try:
+            self.run(rng, listing_ids, options)
+        finally:
+            StockMovement.objects.filter(supplier_commodity_id__in=listing_ids).delete()
+            StockSnapshot.objects.filter(supplier_commodity_id__in=listing_ids).delete()
+            User.objects.filter(username__startswith=PREFIX).delete()
+            ListCommodity.objects.filter(name__startswith=PREFIX).delete()
+
+    def setup(self, count):
+        supplier = User.objects.create(username=f"{PREFIX}-supplier", role="supplier")
+        commodity = ListCommodity.objects.create(name=f"{PREFIX} commodity")
+        listings = SupplierCommodity.objects.bulk_create(
+            SupplierCommodity(supplier=supplier, commodity=commodity, unit="kg", price_per_unit=1,
+                              manufactured_company="Bench", available_units=0)
+            for _ in range(count)
+        )
+        return [listing.id for listing in listings]
+
+    def run(self, rng, listing_ids, options):
+        slots = options["days"] * options["snapshots_per_day"]
+        slot_length = timedelta(days=1) / options["snapshots_per_day"]
+        per_slot = max(1, options["movements"] // slots)
+        start = timezone.now() - timedelta(days=options["days"]) - ledger.get_settle_delay()
+        checkpoints = {slots * (i + 1) // options["checkpoints"] for i in range(options["checkpoints"])}
+
+        self.stdout.write(f"{per_slot} movements per {slot_length}, {len(listing_ids)} listings")
+        self.stdout.write(f"{'movements':>10} {'snapshots':>10} {'stock_at p50':>13} {'p95 (ms)':>9} "
+                          f"{'replay p50':>11} {'p95 (ms)':>9} {'compact (ms)':>13}")
+        written, compact_times = 0, []
+        for slot in range(slots):
+            slot_start = start + slot * slot_length
+            with transaction.atomic():
+                StockMovement.objects.bulk_create(
+                    StockMovement(
+                        supplier_commodity_id=rng.choice(listing_ids),
+                        kind=ledger.RECEIPT if rng.random() < 0.2 else ledger.SALE,
+                        quantity=rng.randint(50, 200) if rng.random() < 0.2 else -rng.randint(1, 10),
+                        created_at=slot_start + slot_length * rng.random(),
+                    )
+                    for _ in range(per_slot)
+                )
+            written += per_slot
+            started = time.perf_counter()
+            ledger.compact(until=slot_start + slot_length)
+            compact_times.append(time.perf_counter() - started)
+            if slot + 1 in checkpoints:
+                self.measure(rng, listing_ids, start, slot_start + slot_length, written, compact_times, options)
+                compact_times = []
+
+    def measure(self, rng, listing_ids, start, end, written, compact_times, options):
+        span = (end - start).total_seconds()
+        reads, replays = [], []
+        for _ in range(options["queries"]):
+            listing_id = rng.choice(listing_ids)
+            at = start + timedelta(seconds=span * rng.random())
+            started = time.perf_counter()
+            units = ledger.stock_at(listing_id, at)
+            reads.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            replayed = StockMovement.objects.filter(
+                supplier_commodity_id=listing_id, created_at__lte=at
+            ).aggregate(total=Sum("quantity"))["total"] or 0
+            replays.append(time.perf_counter() - started)
+            if units != replayed:
+                self.stderr.write(f"Mismatch for listing {listing_id} at {at}: {units} != {replayed}")
+        self.stdout.write(
+            f"{written:>10} {StockSnapshot.objects.count():>10} {percentile(reads, 50) * 1000:>13.2f} "
+            f"{percentile(reads, 95) * 1000:>9.2f} {percentile(replays, 50) * 1000:>11.2f} "
+            f"{percentile(replays, 95) * 1000:>9.2f} {percentile(compact_times, 50) * 1000:>13.2f}"
+        )
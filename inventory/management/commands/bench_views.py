@@ -0,0 +1,228 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory import urls
+from inventory.models import User, SupplierCommodity, Order
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ("Drive every URL in inventory/urls.py through the test client against the current database "
+            "(see generate_dataset) and report throughput, latency percentiles and query counts. "
+            "Every request is rolled back, so the data is left as it was.")
+
+    SKIPPED = {
+        "supplier_order_events": "long-lived connection, see bench_order_events",
+        "supplier_order_poll": "long-lived connection, see bench_order_events",
+        "metrics": "operational endpoint",
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per scenario.")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per scenario first.")
+        parser.add_argument("--only", nargs="+", help="Run only these URL names.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="A previous --output file to compare against.")
+
+    def handle(self, *args, **options):
+        supplier = (User.objects.filter(role="supplier").annotate(listings=Count("suppliercommodity"))
+                    .order_by("-listings").first())
+        vendor = User.objects.filter(role="vendor").annotate(orders=Count("order")).order_by("-orders").first()
+        if supplier is None or vendor is None or not supplier.listings:
+            raise CommandError("No suppliers with listings or no vendors; run generate_dataset first.")
+
+        scenarios = self.scenarios(supplier, vendor)
+        results, skipped = [], []
+        for pattern in urls.urlpatterns:
+            if options["only"] and pattern.name not in options["only"]:
+                continue
+            if pattern.name in self.SKIPPED:
+                skipped.append((pattern.name, self.SKIPPED[pattern.name]))
+                continue
+            if pattern.name not in scenarios:
+                skipped.append((pattern.name, "no scenario"))
+                continue
+            for scenario in scenarios[pattern.name]:
+                if scenario is None:
+                    skipped.append((pattern.name, "no suitable row in the dataset"))
+                    continue
+                results.append(self.run(pattern.name, *scenario, options["requests"], options["warmup"]))
+                self.report(results[-1])
+
+        for name, reason in skipped:
+            self.stdout.write(f"skipped {name}: {reason}")
+        report = {"meta": self.meta(supplier, vendor, options), "results": results}
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options["compare"]:
+            self.compare(results, options["compare"])
+
+    def scenarios(self, supplier, vendor):
+        """``{url name: [(label, user, method, path, data), ...]}``; ``None`` when the data has no fit."""
+        listing = SupplierCommodity.objects.filter(supplier=supplier).order_by("id").first()
+        in_stock = SupplierCommodity.objects.filter(available_units__gte=10).order_by("id")[:10]
+        pending = list(Order.objects.filter(supplier_commodity__supplier=supplier, status="pending")
+                       .order_by("id").values_list("id", flat=True)[:20])
+        rateable = Order.objects.filter(vendor=vendor, status="accepted", rating__isnull=True).order_by("-id").first()
+        upload = "commodity,unit,price_per_unit,manufactured_company,available_units\n" + "".join(
+            f"{listing.commodity.name},kg,{10 + i},Bench,{i}\n" for i in range(50)
+        )
+
+        def scenario(label, user, method, path, data=None):
+            return label, user, method, path, data
+
+        def order_scenario(label, name):
+            if not pending:
+                return None
+            return scenario(label, supplier, "get", reverse(name, args=[pending[0]]))
+
+        return {
+            "home": [scenario("home", None, "get", reverse("home"))],
+            "signup": [scenario("signup", None, "get", reverse("signup"))],
+            "login": [scenario("login", None, "get", reverse("login"))],
+            "logout": [scenario("logout", supplier, "get", reverse("logout"))],
+            "supplier_dashboard": [scenario("supplier_dashboard", supplier, "get", reverse("supplier_dashboard"))],
+            "add_commodity": [scenario("add_commodity", supplier, "post", reverse("add_commodity"), {
+                "commodity": listing.commodity_id, "price_per_unit": "12.50", "manufactured_company": "Bench",
+                "available_units": "10", "unit": "kg",
+            })],
+            "update_commodity": [scenario("update_commodity", supplier, "post",
+                                          reverse("update_commodity", args=[listing.id]),
+                                          {"price_per_unit": "11.00", "available_units": "20",
+                                           "manufactured_company": "Bench", "unit": "kg"})],
+            "delete_commodity": [scenario("delete_commodity", supplier, "get",
+                                          reverse("delete_commodity", args=[listing.id]))],
+            "bulk_import_inventory": [scenario("bulk_import_inventory (50 rows)", supplier, "post",
+                                               reverse("bulk_import_inventory"), lambda: {
+                                                   "file": SimpleUploadedFile("bench.csv", upload.encode())})],
+            "export_inventory": [scenario("export_inventory", supplier, "get", reverse("export_inventory"))],
+            "supplier_orders": [
+                scenario("supplier_orders", supplier, "get", reverse("supplier_orders")),
+                scenario("supplier_orders (month)", supplier, "get", reverse("supplier_orders"),
+                         {"time_filter": "month"}),
+            ],
+            "vendor_dashboard": [
+                scenario("vendor_dashboard", vendor, "get", reverse("vendor_dashboard")),
+                scenario("vendor_dashboard (search)", vendor, "get", reverse("vendor_dashboard"),
+                         {"search": "rice"}),
+                scenario("vendor_dashboard (price per kg)", vendor, "get", reverse("vendor_dashboard"),
+                         {"sort": "price", "base_unit": "kg", "page": 5}),
+                scenario("vendor_dashboard (best supplier)", vendor, "get", reverse("vendor_dashboard"),
+                         {"sort": "score", "page": 5}),
+            ],
+            "place_order": [scenario("place_order", vendor, "post", reverse("place_order", args=[in_stock[0].id]),
+                                     {"quantity": 1}) if in_stock else None],
+            "place_cart_order": [scenario("place_cart_order (10 lines)", vendor, "post", reverse("place_cart_order"),
+                                          {f"cart_{sc.id}": 1 for sc in in_stock}) if in_stock else None],
+            "accept_order": [order_scenario("accept_order", "accept_order")],
+            "reject_order": [order_scenario("reject_order", "reject_order")],
+            "bulk_process_orders": [scenario("bulk_process_orders (20 orders)", supplier, "post",
+                                             reverse("bulk_process_orders"),
+                                             {"action": "accept", "order_ids": pending}) if pending else None],
+            "order_request": [scenario("order_request", vendor, "get", reverse("order_request"))],
+            "forecast": [scenario("forecast", supplier, "get", reverse("forecast"))],
+            "supplier_ratings": [scenario("supplier_ratings", supplier, "get", reverse("supplier_ratings"))],
+            "rate_order": [scenario("rate_order", vendor, "get", reverse("rate_order", args=[rateable.id]))
+                           if rateable else None],
+        }
+
+    def run(self, name, label, user, method, path, data, count, warmup):
+        # A host the project accepts; with DEBUG and no ALLOWED_HOSTS that is localhost
+        host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")),
+                    "localhost")
+        client = Client(SERVER_NAME=host)
+        latencies, query_counts, statuses = [], [], set()
+        for i in range(warmup + count):
+            # Log in again each time so logout can be measured like any other view
+            if user is not None:
+                client.force_login(user)
+            payload = data() if callable(data) else data
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, payload)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if i >= warmup:
+                latencies.append(elapsed)
+                query_counts.append(len(queries))
+                statuses.add(response.status_code)
+        return {
+            "name": name,
+            "label": label,
+            "method": method.upper(),
+            "path": path,
+            "requests": count,
+            "statuses": sorted(statuses),
+            "throughput_rps": round(count / sum(latencies), 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_queries": round(statistics.mean(query_counts), 1),
+            "max_queries": max(query_counts),
+        }
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['label']:<34} {result['method']:<4} {'/'.join(map(str, result['statuses'])):<8} "
+            f"{result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>7.1f}  p95 {result['p95_ms']:>7.1f}  "
+            f"p99 {result['p99_ms']:>7.1f} ms  queries {result['mean_queries']:>5.1f} (max {result['max_queries']})"
+        )
+
+    def meta(self, supplier, vendor, options):
+        try:
+            commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                    check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "timestamp": timezone.now().isoformat(),
+            "commit": commit,
+            "database": connection.vendor,
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "requests_per_scenario": options["requests"],
+            "supplier": supplier.username,
+            "vendor": vendor.username,
+            "orders": Order.objects.count(),
+            "listings": SupplierCommodity.objects.count(),
+        }
+
+    def compare(self, results, path):
+        try:
+            with open(path) as f:
+                previous = {result["label"]: result for result in json.load(f)["results"]}
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        self.stdout.write(f"\nCompared with {path} (p95 ms, queries):")
+        for result in results:
+            before = previous.get(result["label"])
+            if before is None:
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+            self.stdout.write(
+                f"{result['label']:<34} {before['p95_ms']:>8.1f} -> {result['p95_ms']:>8.1f} ({change:+.0f}%)  "
+                f"{before['mean_queries']:>5.1f} -> {result['mean_queries']:>5.1f}"
+            )
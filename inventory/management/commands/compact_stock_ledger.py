@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.ledger import compact
+
+
+class Command(BaseCommand):
+    help = "Snapshot the stock of every listing that moved since the last run, so stock-at-T reads stay short."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker.")
+        parser.add_argument("--interval", type=int, help="Seconds between passes with --loop "
+                                                         "(default: STOCK_SNAPSHOT_INTERVAL_SECONDS).")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or getattr(settings, "STOCK_SNAPSHOT_INTERVAL_SECONDS", 3600)
+        while True:
+            self.stdout.write(f"Wrote {compact()} stock snapshot(s).")
+            if not options["loop"]:
+                break
+            time.sleep(interval)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.cache import unshared_cache_warning
+from inventory.reservations import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Release the stock held by pending orders whose hold has expired (STOCK_HOLD_SECONDS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Orders released per transaction.")
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker.")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        if options["loop"] and unshared_cache_warning():
+            self.stderr.write(unshared_cache_warning())
+        while True:
+            released = expire_holds(batch_size=options["batch_size"])
+            self.stdout.write(f"Released {released} expired hold(s).")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
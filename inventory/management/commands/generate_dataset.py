@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.synthetic import PASSWORD, delete_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic marketplace (suppliers, listings, seasonal orders, ratings) for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suppliers", type=int, default=20)
+        parser.add_argument("--skus", type=int, default=50, help="Listings per supplier.")
+        parser.add_argument("--vendors", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=365, help="Days of order history up to today.")
+        parser.add_argument("--rated", type=float, default=0.3, help="Share of accepted orders that get rated.")
+        parser.add_argument("--prefix", default="synthetic", help="Username prefix of the generated users.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert.")
+        parser.add_argument("--replace", action="store_true", help="Delete an earlier dataset with this prefix first.")
+
+    def handle(self, *args, **options):
+        if options["replace"]:
+            delete_dataset(options["prefix"], batch_size=options["batch_size"])
+        started = time.perf_counter()
+        dataset = generate_dataset(
+            suppliers=options["suppliers"], skus=options["skus"], vendors=options["vendors"],
+            orders=options["orders"], days=options["days"], rated=options["rated"], prefix=options["prefix"],
+            seed=options["seed"], batch_size=options["batch_size"],
+            log=lambda message: self.stdout.write(message) if options["verbosity"] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Generated {dataset.suppliers} suppliers, {dataset.vendors} vendors, {dataset.listings} listings, "
+            f"{dataset.orders} orders and {dataset.ratings} ratings in {elapsed:.1f}s "
+            f"({dataset.orders / elapsed:.0f} orders/s)."
+        )
+        self.stdout.write(f"Users are named {options['prefix']}-supplier-N / {options['prefix']}-vendor-N "
+                          f"with password {PASSWORD!r}.")
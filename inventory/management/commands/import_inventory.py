@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.bulk_inventory import FORMATS, detect_format, import_inventory, read_rows
+from inventory.models import User
+
+
+class Command(BaseCommand):
+    help = "Create or update a supplier's inventory from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("supplier", help="Username of the supplier who owns the inventory.")
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=FORMATS, help="File format (default: from the extension).")
+        parser.add_argument("--batch-size", type=int, help="Rows per batch (default: INVENTORY_IMPORT_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        try:
+            supplier = User.objects.get(username=options["supplier"], role="supplier")
+        except User.DoesNotExist:
+            raise CommandError(f"No supplier named {options['supplier']!r}.")
+
+        with open(options["path"], "rb") as stream:
+            rows = read_rows(stream, detect_format(options["path"], options["format"]))
+            result = import_inventory(supplier, rows, batch_size=options["batch_size"])
+
+        self.stdout.write(f"Added {result.created}, updated {result.updated}, skipped {result.error_count}.")
+        for line_number, message in result.errors:
+            self.stderr.write(f"line {line_number}: {message}")
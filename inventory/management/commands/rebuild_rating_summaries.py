@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute supplier rating summaries from the ratings table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--supplier", type=int, help="Only rebuild the summary of this supplier id.")
+
+    def handle(self, *args, **options):
+        written = rebuild_rating_summaries(supplier_id=options["supplier"])
+        self.stdout.write(f"Rebuilt {written} rating summary(ies).")
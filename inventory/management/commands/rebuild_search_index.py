@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import ensure_search_index, refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Recompute listing search documents and create the PostgreSQL search index if missing."
+
+    def handle(self, *args, **options):
+        changed = refresh_search_documents()
+        self.stdout.write(f"Updated {changed} search document(s).")
+        if ensure_search_index():
+            self.stdout.write("Created the search index.")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.cache import unshared_cache_warning
+from inventory.forecasting import refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = "Refit demand forecasts for supplier commodities that received new accepted orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--supplier", type=int, help="Only refresh forecasts for this supplier id.")
+        parser.add_argument("--force", action="store_true", help="Refit even if no new orders arrived.")
+        parser.add_argument("--workers", type=int, help="Processes used for fitting (default: FORECAST_WORKERS).")
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker.")
+        parser.add_argument("--interval", type=int, default=300, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        if options["loop"] and unshared_cache_warning():
+            self.stderr.write(unshared_cache_warning())
+        while True:
+            refitted = refresh_forecasts(
+                supplier_id=options["supplier"], force=options["force"], workers=options["workers"]
+            )
+            self.stdout.write(f"Refitted {refitted} forecast(s).")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
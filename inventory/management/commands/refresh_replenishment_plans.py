@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.cache import unshared_cache_warning
+from inventory.replenishment import refresh_plans
+
+
+class Command(BaseCommand):
+    help = ("Recompute reorder points, safety stock and days of cover for every listing from its recent "
+            "accepted-order demand and current stock.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--supplier", type=int, help="Only plan this supplier's listings.")
+        parser.add_argument("--batch-size", type=int, help="Listings per batch (default REPLENISHMENT_BATCH_SIZE).")
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker.")
+        parser.add_argument("--interval", type=int, default=900, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        if options["loop"] and unshared_cache_warning():
+            self.stderr.write(unshared_cache_warning())
+        while True:
+            started = time.perf_counter()
+            planned = refresh_plans(supplier_id=options["supplier"], batch_size=options["batch_size"])
+            self.stdout.write(f"Planned {planned} listing(s) in {time.perf_counter() - started:.2f}s.")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
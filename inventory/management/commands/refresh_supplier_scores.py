@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.cache import unshared_cache_warning
+from inventory.ranking import refresh_scores
+
+
+class Command(BaseCommand):
+    help = "Rank each commodity's suppliers, recomputing only commodities that changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every commodity.")
+        parser.add_argument("--batch-size", type=int, help="Commodities per batch (default RANKING_BATCH_SIZE).")
+        parser.add_argument("--loop", action="store_true", help="Keep running as a background worker.")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        if options["loop"] and unshared_cache_warning():
+            self.stderr.write(unshared_cache_warning())
+        full = options["full"]
+        while True:
+            started = time.perf_counter()
+            ranked = refresh_scores(full=full, batch_size=options["batch_size"])
+            self.stdout.write(f"Ranked suppliers of {ranked} commodit{'y' if ranked == 1 else 'ies'} "
+                              f"in {time.perf_counter() - started:.2f}s.")
+            if not options["loop"]:
+                break
+            full = False
+            time.sleep(options["interval"])
@@ -0,0 +1,197 @@
+"""In-process request metrics, exposed in the Prometheus text format.
+
+``inventory.middleware.PerformanceMiddleware`` records, for every view,
+wall time, database time, query count, repeated queries and template
+render time. With ``PERFORMANCE_TRACE_ALLOCATIONS`` it also records the
+Python allocation peak. Histograms are cumulative, as Prometheus expects,
+so dashboards window them with ``rate()``. Wall time is also kept over the
+last ``RECENT_SAMPLES`` requests of each view, as quantiles you can read
+without a Prometheus server.
+
+Each worker process keeps its own numbers. Scrape each worker, or run one
+worker per scrape target.
+
+Queries are timed by an execute wrapper installed on every database
+connection. Template time comes from ``TimedDjangoTemplates``, a drop-in
+template backend. Both report to the stats of the request being handled
+(a context variable), so they work for sync and async views alike.
+"""
+import bisect
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+BYTE_BUCKETS = tuple(2 ** power for power in range(16, 30, 2))  # 64 KiB .. 256 MiB
+QUANTILES = (0.5, 0.95, 0.99)
+RECENT_SAMPLES = 1000
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """``(le, cumulative count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Per-view histograms and counters, safe to update from many threads."""
+
+    METRICS = {
+        'duration': ('vsm_view_duration_seconds', "Wall time per request.", DURATION_BUCKETS),
+        'db': ('vsm_view_db_seconds', "Time spent in database queries per request.", DURATION_BUCKETS),
+        'queries': ('vsm_view_queries', "Database queries per request.", QUERY_BUCKETS),
+        'template': ('vsm_view_template_seconds', "Template render time per request.", DURATION_BUCKETS),
+        'alloc_peak': ('vsm_view_alloc_peak_bytes', "Python allocation peak per request.", BYTE_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {key: {} for key in self.METRICS}
+            self.duplicates = Counter()
+            self.responses = Counter()
+            self.recent = defaultdict(lambda: deque(maxlen=RECENT_SAMPLES))
+
+    def record(self, view, status, **values):
+        """Record one request to ``view``; ``values`` are keyed like ``METRICS``, plus ``duplicates``."""
+        with self._lock:
+            for key, value in values.items():
+                if key == 'duplicates':
+                    self.duplicates[view] += value
+                elif value is not None:
+                    histograms = self.histograms[key]
+                    if view not in histograms:
+                        histograms[view] = Histogram(self.METRICS[key][2])
+                    histograms[view].observe(value)
+            self.responses[view, f"{status // 100}xx"] += 1
+            if values.get('duration') is not None:
+                self.recent[view].append(values['duration'])
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for key, (name, help_text, _) in self.METRICS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for view, histogram in sorted(self.histograms[key].items()):
+                    label = f'view="{_escape(view)}"'
+                    for bound, total in histogram.samples():
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {total}')
+                    lines.append(f"{name}_sum{{{label}}} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+            lines += ["# HELP vsm_view_recent_duration_seconds Wall time over each view's most recent requests.",
+                      "# TYPE vsm_view_recent_duration_seconds summary"]
+            for view, samples in sorted(self.recent.items()):
+                ordered = sorted(samples)
+                for quantile in QUANTILES:
+                    value = ordered[min(len(ordered) - 1, int(len(ordered) * quantile))]
+                    lines.append(f'vsm_view_recent_duration_seconds{{view="{_escape(view)}",'
+                                 f'quantile="{quantile}"}} {value:.6f}')
+
+            lines += ["# HELP vsm_view_duplicate_queries_total Queries repeated with the same SQL and parameters "
+                      "within one request.",
+                      "# TYPE vsm_view_duplicate_queries_total counter"]
+            for view, count in sorted(self.duplicates.items()):
+                lines.append(f'vsm_view_duplicate_queries_total{{view="{_escape(view)}"}} {count}')
+
+            lines += ["# HELP vsm_view_responses_total Responses by status class.",
+                      "# TYPE vsm_view_responses_total counter"]
+            for (view, status), count in sorted(self.responses.items()):
+                lines.append(f'vsm_view_responses_total{{view="{_escape(view)}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """What one request spent, filled in by the query wrapper and the template backend."""
+
+    def __init__(self):
+        self.db_time = 0
+        self.template_time = 0
+        self.queries = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.queries.values())
+
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries[sql, repr(params)] += 1
+
+
+def instrument(connection):
+    """Time the queries run on ``connection``; safe to call more than once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+connection_created.connect(instrument_new_connection)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            if stats is not None:
+                stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, reporting render time to the current request's stats."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
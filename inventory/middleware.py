@@ -0,0 +1,183 @@
+"""Request profiling (see ``inventory.metrics``).
+
+``PerformanceMiddleware`` records every request in the metrics registry.
+A staff user can also send ``X-Profile: cprofile`` (or ``pyinstrument``,
+when it is installed) to get the profile of that one request back in
+place of the page. With ``PERFORMANCE_PROFILE_DIR`` set, the raw profile is
+also saved there for offline analysis.
+
+Under WSGI the profile covers the rest of the middleware chain and the
+view. Under ASGI it covers the view alone: a sync view runs in a worker
+thread, so the profiler is started in that thread, around the view.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .metrics import RequestStats, current_stats, instrument, registry
+
+try:
+    import pyinstrument
+except ImportError:  # optional
+    pyinstrument = None
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ROWS = 60
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class PerformanceMiddleware:
+    """Record per-view timings and serve staff profiling requests.
+
+    Place it after ``AuthenticationMiddleware`` so the profiling header can
+    be checked against ``request.user``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self.profile_view
+        self.trace_allocations = getattr(settings, 'PERFORMANCE_TRACE_ALLOCATIONS', False)
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for connection in connections.all():
+            instrument(connection)
+        mode = self.profile_mode(request)
+        if mode and request.user.is_staff:
+            return self.profile(request, mode)
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        duration = time.perf_counter() - started
+        alloc_peak = tracemalloc.get_traced_memory()[1] - baseline if self.trace_allocations else None
+        self.record(request, response, stats, duration, alloc_peak)
+        return response
+
+    async def __acall__(self, request):
+        mode = self.profile_mode(request)
+        # request.user loads lazily from the database; auser() needs Django 5.0
+        if mode and await sync_to_async(lambda: request.user.is_staff)():
+            # profile_view takes the profile once the view is known
+            request._profile_mode = mode
+            response = await self.get_response(request)
+            profiler = getattr(request, '_profiler', None)
+            return response if profiler is None else self.report(request, mode, profiler, response)
+
+        # Allocation peaks are process-wide and meaningless across interleaved coroutines, so they are skipped here
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started, None)
+        return response
+
+    def record(self, request, response, stats, duration, alloc_peak):
+        registry.record(
+            view_name(request), response.status_code,
+            duration=duration, db=stats.db_time, queries=stats.query_count,
+            template=stats.template_time, alloc_peak=alloc_peak, duplicates=stats.duplicate_count,
+        )
+
+    def profile_mode(self, request):
+        """The profiler the request asks for; callers still check the user is staff."""
+        mode = request.headers.get(PROFILE_HEADER, '').lower()
+        if mode not in ('cprofile', 'pyinstrument'):
+            return None
+        return 'pyinstrument' if mode == 'pyinstrument' and pyinstrument is not None else 'cprofile'
+
+    def start_profiler(self, mode, async_view=False):
+        if mode == 'pyinstrument':
+            profiler = pyinstrument.Profiler(async_mode='enabled' if async_view else 'disabled')
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def stop_profiler(self, profiler, mode):
+        if mode == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+
+    def run_profiled(self, mode, view, request, args, kwargs):
+        profiler = self.start_profiler(mode)
+        try:
+            return profiler, view(request, *args, **kwargs)
+        finally:
+            self.stop_profiler(profiler, mode)
+
+    def profile(self, request, mode):
+        """Run the view under a profiler and answer with the report instead of the page."""
+        profiler, response = self.run_profiled(mode, self.get_response, request, (), {})
+        return self.report(request, mode, profiler, response)
+
+    async def profile_view(self, request, view_func, view_args, view_kwargs):
+        """``process_view`` under ASGI: profile the view where it runs, for ``__acall__`` to report."""
+        mode = getattr(request, '_profile_mode', None)
+        if mode is None:
+            return None
+        if iscoroutinefunction(view_func):
+            profiler = self.start_profiler(mode, async_view=True)
+            try:
+                response = await view_func(request, *view_args, **view_kwargs)
+            finally:
+                self.stop_profiler(profiler, mode)
+        else:
+            # The thread Django itself would run the sync view in
+            profiler, response = await sync_to_async(self.run_profiled, thread_sensitive=True)(
+                mode, view_func, request, view_args, view_kwargs,
+            )
+        request._profiler = profiler
+        return response
+
+    def report(self, request, mode, profiler, response):
+        directory = getattr(settings, 'PERFORMANCE_PROFILE_DIR', None)
+        stem = f"{timezone.now():%Y%m%dT%H%M%S}-{view_name(request).replace(':', '_')}"
+        if mode == 'pyinstrument':
+            report = HttpResponse(profiler.output_html())
+            if directory:
+                with open(os.path.join(directory, f"{stem}.html"), 'w') as f:
+                    f.write(report.content.decode())
+        else:
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(PROFILE_ROWS)
+            report = HttpResponse(text.getvalue(), content_type='text/plain; charset=utf-8')
+            if directory:
+                profiler.dump_stats(os.path.join(directory, f"{stem}.prof"))
+        report['X-Profiled-Status'] = response.status_code
+        return report
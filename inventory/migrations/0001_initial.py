@@ -0,0 +1,186 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:14
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('role', models.CharField(choices=[('supplier', 'Supplier'), ('vendor', 'Vendor')], max_length=10)),
+                ('phone_number', models.CharField(max_length=15)),
+                ('address', models.TextField()),
+                ('pincode', models.CharField(max_length=10)),
+                ('state', models.CharField(max_length=50)),
+                ('groups', models.ManyToManyField(blank=True, related_name='custom_user_groups', to='auth.group')),
+                ('user_permissions', models.ManyToManyField(blank=True, related_name='custom_user_permissions', to='auth.permission')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListCommodity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SupplierRatingSummary',
+            fields=[
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.FloatField(blank=True, null=True)),
+                ('one_star', models.PositiveIntegerField(default=0)),
+                ('two_star', models.PositiveIntegerField(default=0)),
+                ('three_star', models.PositiveIntegerField(default=0)),
+                ('four_star', models.PositiveIntegerField(default=0)),
+                ('five_star', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SupplierCommodity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(choices=[('kg', 'Kilogram'), ('g', 'Gram'), ('q', 'Quintal'), ('t', 'Ton'), ('m', 'Metre'), ('cm', 'Centimetre'), ('in', 'Inch'), ('ft', 'Foot'), ('unit', 'Unit'), ('l', 'Litre'), ('ml', 'Millilitre')], default='unit', max_length=10)),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('manufactured_company', models.CharField(max_length=100)),
+                ('available_units', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('forecast_backend', models.CharField(blank=True, choices=[('', 'Default'), ('prophet', 'Prophet'), ('holt_winters', 'Holt-Winters')], default='', max_length=20)),
+                ('search_document', models.TextField(blank=True, default='', editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('commodity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.listcommodity')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity_requested', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('ordered_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(limit_choices_to={'role': 'vendor'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('supplier_commodity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.suppliercommodity')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ForecastResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('insufficient', 'Insufficient Data')], max_length=15)),
+                ('points', models.JSONField(default=list)),
+                ('series', models.JSONField(default=list)),
+                ('history', models.JSONField(default=list)),
+                ('insight', models.TextField(blank=True)),
+                ('backend', models.CharField(blank=True, max_length=20)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('last_order_id', models.BigIntegerField(blank=True, null=True)),
+                ('fitted_at', models.DateTimeField(auto_now=True)),
+                ('supplier_commodity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='inventory.suppliercommodity')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('supplier_commodity', 'Supplier Commodity'), ('order', 'Order')], max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('supplier', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.IntegerField(choices=[(1, '1 Star'), (2, '2 Stars'), (3, '3 Stars'), (4, '4 Stars'), (5, '5 Stars')])),
+                ('comment', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating', to='inventory.order')),
+                ('supplier', models.ForeignKey(limit_choices_to={'role': 'supplier'}, on_delete=django.db.models.deletion.CASCADE, related_name='supplier_ratings', to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(limit_choices_to={'role': 'vendor'}, on_delete=django.db.models.deletion.CASCADE, related_name='vendor_ratings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['supplier', '-created_at', '-id'], name='rating_supplier_recent_idx')],
+                'unique_together': {('order', 'vendor')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='suppliercommodity',
+            index=models.Index(fields=['updated_at', 'id'], name='sc_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliercommodity',
+            index=models.Index(fields=['supplier', 'updated_at', 'id'], name='sc_supplier_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppliercommodity',
+            index=models.Index(condition=models.Q(('available_units__gt', 0)), fields=['id'], name='sc_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendor', '-ordered_at', '-id'], name='order_vendor_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['supplier_commodity', '-ordered_at', '-id'], name='order_sc_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['supplier_commodity', 'status', '-ordered_at'], name='order_sc_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'accepted')), fields=['supplier_commodity', 'ordered_at', 'quantity_requested'], name='order_accepted_sc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at', 'id'], name='order_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendor', 'updated_at', 'id'], name='order_vendor_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'supplier', 'deleted_at', 'id'], name='tombstone_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'vendor', 'deleted_at', 'id'], name='tombstone_vendor_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def record_opening_stock(apps, schema_editor):
+    # Every listing's current stock becomes its opening balance in the ledger
+    SupplierCommodity = apps.get_model('inventory', 'SupplierCommodity')
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    listings = SupplierCommodity.objects.exclude(available_units=0).values_list('id', 'available_units')
+    StockMovement.objects.bulk_create(
+        (StockMovement(supplier_commodity_id=listing_id, kind='adjustment', quantity=units)
+         for listing_id, units in listings.iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Receipt'), ('sale', 'Sale'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.order')),
+                ('supplier_commodity', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.suppliercommodity')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['supplier_commodity', 'created_at'], name='movement_sc_time_idx'), models.Index(fields=['created_at'], name='movement_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('taken_at', models.DateTimeField()),
+                ('supplier_commodity', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.suppliercommodity')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['taken_at'], name='snapshot_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('supplier_commodity', 'taken_at'), name='snapshot_sc_time_uniq')],
+            },
+        ),
+        migrations.RunPython(record_opening_stock, migrations.RunPython.noop),
+    ]
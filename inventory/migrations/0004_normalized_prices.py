@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+from inventory.units import normalize
+
+
+def normalize_prices(apps, schema_editor):
+    SupplierCommodity = apps.get_model('inventory', 'SupplierCommodity')
+    listings = SupplierCommodity.objects.only('unit', 'price_per_unit')
+    batch = []
+    for listing in listings.iterator(chunk_size=2000):
+        normalize(listing)
+        batch.append(listing)
+        if len(batch) == 2000:
+            SupplierCommodity.objects.bulk_update(batch, ['base_unit', 'normalized_price'])
+            batch = []
+    SupplierCommodity.objects.bulk_update(batch, ['base_unit', 'normalized_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suppliercommodity',
+            name='base_unit',
+            field=models.CharField(default='unit', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='suppliercommodity',
+            name='normalized_price',
+            field=models.DecimalField(decimal_places=6, default=0, editable=False, max_digits=18),
+        ),
+        migrations.AddIndex(
+            model_name='suppliercommodity',
+            index=models.Index(condition=models.Q(('available_units__gt', 0)), fields=['base_unit', 'normalized_price', 'id'], name='sc_normalized_price_idx'),
+        ),
+        migrations.RunPython(normalize_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_normalized_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('price_score', models.FloatField()),
+                ('stock_score', models.FloatField()),
+                ('rating_score', models.FloatField()),
+                ('fulfilment_score', models.FloatField()),
+                ('fulfilment_rate', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['created_at'], name='rating_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='supplierscore',
+            name='commodity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.listcommodity'),
+        ),
+        migrations.AddField(
+            model_name='supplierscore',
+            name='supplier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='supplierscore',
+            name='supplier_commodity',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score', to='inventory.suppliercommodity'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierscore',
+            index=models.Index(fields=['commodity', '-score', 'id'], name='score_commodity_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierscore',
+            index=models.Index(fields=['computed_at'], name='score_computed_idx'),
+        ),
+    ]
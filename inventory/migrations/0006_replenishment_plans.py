@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_supplier_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplenishmentPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('reorder', 'Reorder'), ('stockout', 'Out of Stock'), ('no_demand', 'No Demand')], max_length=10)),
+                ('daily_demand', models.FloatField()),
+                ('demand_std', models.FloatField()),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('safety_stock', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reorder_point', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('suggested_quantity', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('days_of_cover', models.FloatField(blank=True, null=True)),
+                ('stockout_date', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('supplier_commodity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='replenishment', to='inventory.suppliercommodity')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status__in', ('reorder', 'stockout'))), fields=['supplier', 'days_of_cover', 'id'], name='replenishment_alert_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from . import units
+
 # Custom User Model
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -29,18 +33,11 @@ class ListCommodity(models.Model):
 
 
 class SupplierCommodity(models.Model):
-    UNIT_CHOICES = [
-        ('kg', 'Kilogram'),
-        ('g', 'Gram'),
-        ('q', 'Quintal'),
-        ('t', 'Ton'),
-        ('m', 'Metre'),
-        ('cm', 'Centimetre'),
-        ('in', 'Inch'),
-        ('ft', 'Foot'),
-        ('unit', 'Unit'),
-        ('l', 'Litre'),
-        ('ml', 'Millilitre'),
+    UNIT_CHOICES = units.CHOICES
+    FORECAST_BACKEND_CHOICES = [
+        ('', 'Default'),
+        ('prophet', 'Prophet'),
+        ('holt_winters', 'Holt-Winters'),
     ]
     
     supplier = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -49,9 +46,51 @@ class SupplierCommodity(models.Model):
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
     manufactured_company = models.CharField(max_length=100)
     available_units = models.DecimalField(max_digits=10, decimal_places=2)
+    # Held by pending orders (see inventory.reservations); never more than available_units
+    reserved_units = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # price_per_unit per base_unit (see inventory.units), so prices compare across units in SQL
+    base_unit = models.CharField(max_length=10, editable=False, default='unit')
+    normalized_price = models.DecimalField(max_digits=18, decimal_places=6, editable=False, default=0)
+    # Blank uses the FORECAST_BACKEND setting
+    forecast_backend = models.CharField(max_length=20, choices=FORECAST_BACKEND_CHOICES, blank=True, default='')
+    # Commodity name, supplier username and address; maintained by inventory.signals for search
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Set on every write, including update()/bulk_update() paths, for the change feed
+    updated_at = models.DateTimeField(auto_now=True)
 
     def get_unit_display(self):
-        return dict(self.UNIT_CHOICES).get(self.unit, self.unit)
+        return units.label(self.unit)
+
+    def get_base_unit_display(self):
+        return units.label(self.base_unit)
+
+    @property
+    def available_to_promise(self):
+        """Stock not yet held by pending orders."""
+        return self.available_units - self.reserved_units
+
+    def save(self, *args, **kwargs):
+        """Save, writing any change to ``available_units`` to the stock ledger in the same transaction."""
+        from .ledger import record_saved_stock, stock_before_save
+        with transaction.atomic():
+            created = self._state.adding
+            before = None if created else stock_before_save(self, kwargs.get('update_fields'))
+            super().save(*args, **kwargs)
+            record_saved_stock(self, created, before)
+
+    class Meta:
+        indexes = [
+            # Change feed: rows modified after a (updated_at, id) high-water mark
+            models.Index(fields=['updated_at', 'id'], name='sc_updated_idx'),
+            models.Index(fields=['supplier', 'updated_at', 'id'], name='sc_supplier_updated_idx'),
+            # The marketplace only ever lists in-stock rows; sold-out ones stay out of this index
+            models.Index(fields=['id'], name='sc_in_stock_idx', condition=Q(available_units__gt=0)),
+            # Marketplace filtering and sorting by comparable price
+            models.Index(
+                fields=['base_unit', 'normalized_price', 'id'], name='sc_normalized_price_idx',
+                condition=Q(available_units__gt=0),
+            ),
+        ]
 
 # Order Model (Vendor buys from Supplier)
 class Order(models.Model):
@@ -65,22 +104,46 @@ class Order(models.Model):
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     ordered_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # While set, quantity_requested is reserved on the listing (see inventory.reservations)
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Order {self.id} - {self.vendor.username} -> {self.supplier_commodity.commodity.name}"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of order listings on (ordered_at, id)
+            models.Index(fields=['vendor', '-ordered_at', '-id'], name='order_vendor_recent_idx'),
+            models.Index(fields=['supplier_commodity', '-ordered_at', '-id'], name='order_sc_recent_idx'),
+            # Supplier order queues: pending/previous orders per listing, newest first
+            models.Index(fields=['supplier_commodity', 'status', '-ordered_at'], name='order_sc_status_recent_idx'),
+            # Demand history and forecast watermarks read accepted orders only
+            models.Index(
+                fields=['supplier_commodity', 'ordered_at', 'quantity_requested'], name='order_accepted_sc_idx',
+                condition=Q(status='accepted'),
+            ),
+            # Change feed: rows modified after a (updated_at, id) high-water mark
+            models.Index(fields=['updated_at', 'id'], name='order_updated_idx'),
+            models.Index(fields=['vendor', 'updated_at', 'id'], name='order_vendor_updated_idx'),
+            # The hold sweeper only looks at orders still holding stock
+            models.Index(
+                fields=['hold_expires_at'], name='order_hold_expiry_idx', condition=Q(hold_expires_at__isnull=False),
+            ),
+        ]
+
     def accept_order(self):
-        """When supplier accepts the order, decrease stock."""
-        if self.quantity_requested <= self.supplier_commodity.available_units:
-            self.supplier_commodity.available_units -= self.quantity_requested
-            self.supplier_commodity.save()
-            self.status = 'accepted'
-            self.save()
+        """When supplier accepts the order, decrease stock atomically.
+
+        Returns the outcome from ``inventory.fulfilment``.
+        """
+        from .fulfilment import accept_order
+        return accept_order(self)
 
     def reject_order(self):
         """Supplier can reject an order."""
-        self.status = 'rejected'
-        self.save()
+        from .fulfilment import reject_order
+        return reject_order(self)
 
 
 # Rating Model
@@ -105,6 +168,205 @@ class Rating(models.Model):
 
     class Meta:
         unique_together = ('order', 'vendor')  # One rating per order
+        indexes = [
+            # A supplier's ratings, newest first
+            models.Index(fields=['supplier', '-created_at', '-id'], name='rating_supplier_recent_idx'),
+            # Ratings since the last supplier ranking refresh
+            models.Index(fields=['created_at'], name='rating_created_idx'),
+        ]
+
+
+# Tombstone Model (records deletions so the change feed can report them)
+class Tombstone(models.Model):
+    MODEL_CHOICES = [
+        ('supplier_commodity', 'Supplier Commodity'),
+        ('order', 'Order'),
+    ]
+    model = models.CharField(max_length=30, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    # No database constraint: deleting a user writes tombstones for their rows that still name them
+    supplier = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    vendor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'supplier', 'deleted_at', 'id'], name='tombstone_supplier_idx'),
+            models.Index(fields=['model', 'vendor', 'deleted_at', 'id'], name='tombstone_vendor_idx'),
+        ]
+
+
+# Stock ledger (append-only; see inventory.ledger)
+class StockMovement(models.Model):
+    RECEIPT = 'receipt'
+    SALE = 'sale'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (RECEIPT, 'Receipt'),
+        (SALE, 'Sale'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+    # No database constraints: the ledger outlives deleted listings and orders. The
+    # composite index below covers lookups by listing.
+    supplier_commodity = models.ForeignKey(
+        SupplierCommodity, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Signed change in available_units
+    quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    order = models.ForeignKey(
+        Order, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+} on {self.supplier_commodity_id}"
+
+    class Meta:
+        indexes = [
+            # Stock-at-T reads one listing's movements after its latest snapshot
+            models.Index(fields=['supplier_commodity', 'created_at'], name='movement_sc_time_idx'),
+            # Compaction reads every movement since the last snapshot
+            models.Index(fields=['created_at'], name='movement_time_idx'),
+        ]
+
+
+class StockSnapshot(models.Model):
+    # Covered by the unique constraint below
+    supplier_commodity = models.ForeignKey(
+        SupplierCommodity, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    # available_units after every movement created at or before taken_at
+    units = models.DecimalField(max_digits=12, decimal_places=2)
+    taken_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.units} of {self.supplier_commodity_id} at {self.taken_at}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['supplier_commodity', 'taken_at'], name='snapshot_sc_time_uniq'),
+        ]
+        indexes = [
+            # The compaction watermark is the newest snapshot overall
+            models.Index(fields=['taken_at'], name='snapshot_time_idx'),
+        ]
+
+
+# Rating summary (denormalized per-supplier aggregate, kept current by inventory.ratings)
+class SupplierRatingSummary(models.Model):
+    supplier = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(null=True, blank=True)
+    one_star = models.PositiveIntegerField(default=0)
+    two_star = models.PositiveIntegerField(default=0)
+    three_star = models.PositiveIntegerField(default=0)
+    four_star = models.PositiveIntegerField(default=0)
+    five_star = models.PositiveIntegerField(default=0)
+
+    STAR_FIELDS = {1: 'one_star', 2: 'two_star', 3: 'three_star', 4: 'four_star', 5: 'five_star'}
+
+    def __str__(self):
+        return f"{self.supplier.username}: {self.rating_count} ratings"
+
+    @property
+    def histogram(self):
+        """``[(stars, count), ...]`` from five stars down to one."""
+        return [(stars, getattr(self, field)) for stars, field in sorted(self.STAR_FIELDS.items(), reverse=True)]
 
 
+# Supplier ranking (precomputed per in-stock listing by inventory.ranking)
+class SupplierScore(models.Model):
+    supplier_commodity = models.OneToOneField(SupplierCommodity, on_delete=models.CASCADE, related_name='score')
+    # Copied from the listing so a commodity's ranking is one index range
+    commodity = models.ForeignKey(ListCommodity, on_delete=models.CASCADE, related_name='+')
+    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Components, each between 0 and 1
+    price_score = models.FloatField()
+    stock_score = models.FloatField()
+    rating_score = models.FloatField()
+    fulfilment_score = models.FloatField()
+    # Accepted over accepted and rejected orders of the supplier; None before any were decided
+    fulfilment_rate = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Score for {self.supplier_commodity_id}: {self.score:.3f}"
+
+    class Meta:
+        indexes = [
+            # Top-k suppliers of a commodity
+            models.Index(fields=['commodity', '-score', 'id'], name='score_commodity_rank_idx'),
+            models.Index(fields=['computed_at'], name='score_computed_idx'),
+        ]
+
+
+# Replenishment plan (reorder point and days of cover per listing, computed by inventory.replenishment)
+class ReplenishmentPlan(models.Model):
+    STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('reorder', 'Reorder'),
+        ('stockout', 'Out of Stock'),
+        ('no_demand', 'No Demand'),
+    ]
+    ALERT_STATUSES = ('reorder', 'stockout')
+
+    supplier_commodity = models.OneToOneField(SupplierCommodity, on_delete=models.CASCADE, related_name='replenishment')
+    # Copied from the listing so a supplier's alerts are one index range
+    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    # Accepted units per day over the demand window, and their standard deviation
+    daily_demand = models.FloatField()
+    demand_std = models.FloatField()
+    # Available-to-promise units when the plan was computed
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+    safety_stock = models.DecimalField(max_digits=12, decimal_places=2)
+    reorder_point = models.DecimalField(max_digits=12, decimal_places=2)
+    # Units to restock now to cover lead time and the next review period; 0 above the reorder point
+    suggested_quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    # None when there is no demand
+    days_of_cover = models.FloatField(null=True, blank=True)
+    stockout_date = models.DateField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Replenishment for {self.supplier_commodity_id} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # Dashboard alerts: a supplier's listings due for restocking
+            models.Index(
+                fields=['supplier', 'days_of_cover', 'id'], name='replenishment_alert_idx',
+                condition=Q(status__in=('reorder', 'stockout')),
+            ),
+        ]
+
+
+# Forecast Model (Precomputed demand forecast per supplier commodity)
+class ForecastResult(models.Model):
+    STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('insufficient', 'Insufficient Data'),
+    ]
+
+    supplier_commodity = models.OneToOneField(SupplierCommodity, on_delete=models.CASCADE, related_name='forecast')
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES)
+    points = models.JSONField(default=list)   # Next days: ds, yhat, yhat_lower, yhat_upper
+    series = models.JSONField(default=list)   # Fitted curve over history + horizon, used for the chart
+    history = models.JSONField(default=list)  # Observed demand: ds, y
+    insight = models.TextField(blank=True)
+    backend = models.CharField(max_length=20, blank=True)
+    # Accepted-order watermark at fit time; the worker refits when it moves
+    order_count = models.PositiveIntegerField(default=0)
+    last_order_id = models.BigIntegerField(null=True, blank=True)
+    fitted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Forecast for {self.supplier_commodity_id} ({self.status})"
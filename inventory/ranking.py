@@ -0,0 +1,182 @@
+"""Supplier ranking.
+
+Every in-stock listing gets a ``SupplierScore`` ranking it against the other
+suppliers of its commodity. The score is a weighted sum (``RANKING_WEIGHTS``)
+of four components between 0 and 1:
+
+* price: the cheapest normalized price for the commodity over the listing's,
+  among listings in the same base unit (see ``inventory.units``)
+* stock: available-to-promise units against the best stocked listing's, on
+  a log scale so one huge stockpile doesn't flatten everyone else
+* rating: the supplier's average rating out of five stars
+* fulfilment: the supplier's accepted orders over accepted and rejected ones
+
+Ratings and fulfilment are pulled towards a neutral value until the supplier
+has ``RANKING_PRIOR_WEIGHT`` ratings or decided orders of its own, so one
+five-star rating doesn't put a newcomer on top.
+
+Scores are computed with NumPy for a batch of commodities at a time, from
+two queries. ``refresh_scores`` only recomputes commodities that changed
+since the last refresh: a listing was edited, sold or held, or one of its
+suppliers had an order decided or a new rating. Run
+``refresh_supplier_scores --loop`` to keep rankings current;
+``top_suppliers`` then reads a commodity's ranking with one indexed query.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .cache import MARKETPLACE, bump
+from .models import ListCommodity, Order, Rating, SupplierCommodity, SupplierScore
+
+COMPONENTS = ('price', 'stock', 'rating', 'fulfilment')
+DEFAULT_WEIGHTS = {'price': 0.4, 'stock': 0.2, 'rating': 0.25, 'fulfilment': 0.15}
+# Where ratings and fulfilment start before a supplier has a record: three stars, half its orders accepted
+NEUTRAL_RATING = 3 / 5
+NEUTRAL_FULFILMENT = 0.5
+# Changes committed while the previous refresh ran are picked up by the next one
+LOOKBACK = timedelta(minutes=1)
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 50
+
+
+def get_weights():
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'RANKING_WEIGHTS', {})}
+    total = sum(weights[name] for name in COMPONENTS)
+    return {name: weights[name] / total for name in COMPONENTS}
+
+
+def get_prior_weight():
+    return getattr(settings, 'RANKING_PRIOR_WEIGHT', 5)
+
+
+def get_batch_size():
+    return getattr(settings, 'RANKING_BATCH_SIZE', 500)
+
+
+def smoothed(successes, trials, neutral, prior):
+    """``successes / trials`` with ``prior`` extra trials at the ``neutral`` rate."""
+    denominator = trials + prior
+    return np.divide(successes + prior * neutral, denominator, out=np.full(len(trials), neutral),
+                     where=denominator > 0)
+
+
+def compute_scores(commodity_ids, now=None):
+    """Unsaved ``SupplierScore`` rows for the in-stock listings of ``commodity_ids``."""
+    now = now or timezone.now()
+    rows = list(
+        SupplierCommodity.objects.filter(commodity_id__in=commodity_ids, available_units__gt=0)
+        .annotate(available=F('available_units') - F('reserved_units'))
+        .order_by()
+        .values_list(
+            'id', 'commodity_id', 'supplier_id', 'base_unit', 'normalized_price', 'available',
+            'supplier__rating_summary__rating_sum', 'supplier__rating_summary__rating_count',
+        )
+    )
+    if not rows:
+        return []
+    ids, commodities, suppliers, base_units, prices, available, rating_sums, rating_counts = zip(*rows)
+    decided = (
+        Order.objects.filter(supplier_commodity__supplier_id__in=set(suppliers), status__in=('accepted', 'rejected'))
+        .values('supplier_commodity__supplier_id')
+        .annotate(accepted=Count('id', filter=Q(status='accepted')), total=Count('id'))
+        .order_by()
+        .values_list('supplier_commodity__supplier_id', 'accepted', 'total')
+    )
+    fulfilment = {supplier_id: (accepted, total) for supplier_id, accepted, total in decided}
+
+    prices = np.array(prices, dtype=float)
+    stock = np.log1p(np.maximum(np.array(available, dtype=float), 0))
+    # Listings compete within their commodity and base unit; prices per kg and per litre don't compare
+    _, group = np.unique([f'{commodity}:{unit}' for commodity, unit in zip(commodities, base_units)],
+                         return_inverse=True)
+    group = group.ravel()
+    cheapest = np.full(group.max() + 1, np.inf)
+    np.minimum.at(cheapest, group, prices)
+    best_stocked = np.zeros(group.max() + 1)
+    np.maximum.at(best_stocked, group, stock)
+
+    prior = get_prior_weight()
+    accepted, total = np.array([fulfilment.get(supplier_id, (0, 0)) for supplier_id in suppliers], dtype=float).T
+    components = {
+        'price': np.divide(cheapest[group], prices, out=np.ones(len(prices)), where=prices > 0),
+        'stock': np.divide(stock, best_stocked[group], out=np.zeros(len(stock)), where=best_stocked[group] > 0),
+        'rating': smoothed(np.array([s or 0 for s in rating_sums], dtype=float) / 5,
+                           np.array([c or 0 for c in rating_counts], dtype=float), NEUTRAL_RATING, prior),
+        'fulfilment': smoothed(accepted, total, NEUTRAL_FULFILMENT, prior),
+    }
+    weights = get_weights()
+    scores = sum(weights[name] * components[name] for name in COMPONENTS)
+
+    return [
+        SupplierScore(
+            supplier_commodity_id=ids[i], commodity_id=commodities[i], supplier_id=suppliers[i],
+            score=float(scores[i]),
+            price_score=float(components['price'][i]),
+            stock_score=float(components['stock'][i]),
+            rating_score=float(components['rating'][i]),
+            fulfilment_score=float(components['fulfilment'][i]),
+            fulfilment_rate=float(accepted[i] / total[i]) if total[i] else None,
+            computed_at=now,
+        )
+        for i in range(len(ids))
+    ]
+
+
+def changed_commodities(since):
+    """Ids of commodities whose ranking may have changed after ``since``."""
+    commodity_ids = set(
+        SupplierCommodity.objects.filter(updated_at__gt=since).values_list('commodity_id', flat=True).distinct()
+    )
+    # A decided order or a new rating moves its supplier in every commodity it sells
+    supplier_ids = set(
+        Order.objects.filter(updated_at__gt=since).exclude(status='pending')
+        .values_list('supplier_commodity__supplier_id', flat=True).distinct()
+    )
+    supplier_ids |= set(Rating.objects.filter(created_at__gt=since).values_list('supplier_id', flat=True).distinct())
+    if supplier_ids:
+        commodity_ids |= set(
+            SupplierCommodity.objects.filter(supplier_id__in=supplier_ids)
+            .values_list('commodity_id', flat=True).distinct()
+        )
+    return commodity_ids
+
+
+def refresh_scores(full=False, batch_size=None):
+    """Recompute the scores of commodities that changed since the last refresh, or of all of them.
+
+    The first refresh is always a full one. Returns the number of
+    commodities ranked.
+    """
+    now = timezone.now()
+    latest = None if full else SupplierScore.objects.aggregate(latest=Max('computed_at'))['latest']
+    if latest is None:
+        commodity_ids = set(ListCommodity.objects.values_list('id', flat=True))
+    else:
+        commodity_ids = changed_commodities(latest - LOOKBACK)
+    commodity_ids = sorted(commodity_ids)
+    batch_size = batch_size or get_batch_size()
+    for start in range(0, len(commodity_ids), batch_size):
+        batch = commodity_ids[start:start + batch_size]
+        with transaction.atomic():
+            scores = compute_scores(batch, now)
+            SupplierScore.objects.filter(commodity_id__in=batch).delete()
+            SupplierScore.objects.bulk_create(scores)
+    if commodity_ids:
+        # Marketplace pages sorted by score are cached
+        bump(MARKETPLACE)
+    return len(commodity_ids)
+
+
+def top_suppliers(commodity_id, k=DEFAULT_TOP_K):
+    """The ``k`` best scored listings of a commodity that are still in stock, best first."""
+    return (
+        SupplierScore.objects.filter(commodity_id=commodity_id, supplier_commodity__available_units__gt=0)
+        .select_related('supplier_commodity', 'supplier')
+        .order_by('-score', 'id')[:k]
+    )
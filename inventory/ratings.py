@@ -0,0 +1,57 @@
+"""Per-supplier rating summaries.
+
+``SupplierRatingSummary`` holds each supplier's rating count, sum, average and
+star histogram so listings can read them with a plain join instead of
+aggregating the ``Rating`` table on every request. ``record_rating`` applies a
+new rating incrementally; ``rebuild_rating_summaries`` recomputes summaries
+from scratch (after imports, admin edits or deletions).
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+from .cache import MARKETPLACE, bump
+from .models import Rating, SupplierRatingSummary
+
+STAR_FIELDS = SupplierRatingSummary.STAR_FIELDS
+
+
+def record_rating(rating):
+    """Add a newly created ``rating`` to its supplier's summary."""
+    field = STAR_FIELDS[rating.rating]
+    with transaction.atomic():
+        SupplierRatingSummary.objects.get_or_create(supplier_id=rating.supplier_id)
+        summaries = SupplierRatingSummary.objects.filter(supplier_id=rating.supplier_id)
+        # F() increments so concurrent ratings of one supplier can't lose an update
+        summaries.update(
+            rating_count=F('rating_count') + 1,
+            rating_sum=F('rating_sum') + rating.rating,
+            **{field: F(field) + 1},
+        )
+        summaries.update(average_rating=Cast('rating_sum', FloatField()) / F('rating_count'))
+
+
+def rebuild_rating_summaries(supplier_id=None):
+    """Recompute summaries from the ``Rating`` table. Returns how many were written."""
+    ratings = Rating.objects.all()
+    existing = SupplierRatingSummary.objects.all()
+    if supplier_id is not None:
+        ratings = ratings.filter(supplier_id=supplier_id)
+        existing = existing.filter(supplier_id=supplier_id)
+
+    rows = ratings.values('supplier_id').annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{field: Count('id', filter=Q(rating=stars)) for stars, field in STAR_FIELDS.items()},
+    ).order_by()
+
+    summaries = [
+        SupplierRatingSummary(average_rating=row['rating_sum'] / row['rating_count'], **row)
+        for row in rows
+    ]
+    with transaction.atomic():
+        # Suppliers whose ratings are all gone lose their summary row too
+        existing.delete()
+        SupplierRatingSummary.objects.bulk_create(summaries, batch_size=500)
+        bump(MARKETPLACE)
+    return len(summaries)
@@ -0,0 +1,162 @@
+"""Reorder points and replenishment suggestions.
+
+For every listing, ``refresh_plans`` combines its accepted-order demand
+over the last ``REPLENISHMENT_WINDOW_DAYS`` (the history ``load_daily_demand``
+loads for forecasting) with its available-to-promise stock:
+
+* daily demand: mean and standard deviation of units accepted per day,
+  counting days without orders and ignoring days before the first one
+* safety stock: ``z * std * sqrt(lead time)``, with ``z`` set by
+  ``REPLENISHMENT_SERVICE_LEVEL`` (the chance of not running out during a
+  lead time)
+* reorder point: demand over ``REPLENISHMENT_LEAD_TIME_DAYS`` plus safety stock
+* days of cover: how long current stock lasts at the daily demand
+* suggested quantity: at or below the reorder point, enough to get back to
+  the reorder point plus ``REPLENISHMENT_REVIEW_DAYS`` of demand
+
+Listings are planned in batches of ``REPLENISHMENT_BATCH_SIZE``, each with
+one demand query and NumPy arithmetic over the whole batch. The results are
+stored as ``ReplenishmentPlan`` rows, so dashboards read alerts with one
+indexed query. Run ``refresh_replenishment_plans --loop`` to keep them
+current.
+"""
+import math
+from datetime import timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import SUPPLIER, bump
+from .demand import load_daily_demand
+from .models import Order, ReplenishmentPlan, SupplierCommodity
+
+CENTS = Decimal('0.01')
+# Stockout dates further out than this are left blank (and would overflow a date for slow movers)
+STOCKOUT_HORIZON_DAYS = 5 * 365
+
+
+def get_window_days():
+    return getattr(settings, 'REPLENISHMENT_WINDOW_DAYS', 56)
+
+
+def get_lead_time_days():
+    return getattr(settings, 'REPLENISHMENT_LEAD_TIME_DAYS', 7)
+
+
+def get_review_days():
+    return getattr(settings, 'REPLENISHMENT_REVIEW_DAYS', 7)
+
+
+def get_safety_factor():
+    """Standard deviations of lead-time demand covered by safety stock."""
+    return NormalDist().inv_cdf(getattr(settings, 'REPLENISHMENT_SERVICE_LEVEL', 0.95))
+
+
+def get_batch_size():
+    return getattr(settings, 'REPLENISHMENT_BATCH_SIZE', 2000)
+
+
+def _units(value):
+    return Decimal(str(round(float(value), 2))).quantize(CENTS)
+
+
+def build_plans(rows, demand, today, now=None):
+    """Unsaved ``ReplenishmentPlan`` rows.
+
+    ``rows`` holds ``(supplier_commodity_id, supplier_id, available units,
+    day of first accepted order)`` tuples and ``demand`` their
+    ``load_daily_demand`` series; days before the window are ignored.
+    """
+    now = now or timezone.now()
+    window, lead_time = get_window_days(), get_lead_time_days()
+    start = np.datetime64(today - timedelta(days=window - 1), 'D')
+    ids, suppliers, available, first_days = zip(*rows)
+    index = {sc_id: i for i, sc_id in enumerate(ids)}
+
+    # Daily quantities of the whole batch flattened into one array, summed per listing
+    totals, squares = np.zeros(len(ids)), np.zeros(len(ids))
+    series = [(index[sc_id], s) for sc_id, s in demand.items() if sc_id in index]
+    if series:
+        owner = np.repeat([i for i, _ in series], [len(s.y) for _, s in series])
+        days = np.concatenate([s.ds for _, s in series])
+        quantities = np.concatenate([s.y for _, s in series])
+        recent = days >= start
+        totals = np.bincount(owner[recent], weights=quantities[recent], minlength=len(ids))
+        squares = np.bincount(owner[recent], weights=quantities[recent] ** 2, minlength=len(ids))
+
+    # Days observed: the whole window, or fewer for listings first ordered within it
+    observed = np.array([window if first is None else (today - first).days + 1 for first in first_days])
+    observed = np.clip(observed, 1, window)
+    mean = totals / observed
+    std = np.sqrt(np.maximum(squares / observed - mean ** 2, 0))
+    stock = np.array(available, dtype=float)
+
+    safety_stock = get_safety_factor() * std * math.sqrt(lead_time)
+    reorder_point = mean * lead_time + safety_stock
+    cover = np.divide(np.maximum(stock, 0), mean, out=np.full(len(ids), np.nan), where=mean > 0)
+    due = (mean > 0) & (stock <= reorder_point)
+    suggested = np.where(due, np.ceil(reorder_point + mean * get_review_days() - stock), 0)
+    status = np.select([mean <= 0, stock <= 0, due], ['no_demand', 'stockout', 'reorder'], 'ok')
+
+    plans = []
+    for i, sc_id in enumerate(ids):
+        days_of_cover = None if np.isnan(cover[i]) else round(float(cover[i]), 1)
+        plans.append(ReplenishmentPlan(
+            supplier_commodity_id=sc_id, supplier_id=suppliers[i], status=str(status[i]),
+            daily_demand=float(mean[i]), demand_std=float(std[i]), stock=_units(stock[i]),
+            safety_stock=_units(safety_stock[i]), reorder_point=_units(reorder_point[i]),
+            suggested_quantity=_units(suggested[i]), days_of_cover=days_of_cover,
+            stockout_date=(today + timedelta(days=int(days_of_cover))
+                           if days_of_cover is not None and days_of_cover <= STOCKOUT_HORIZON_DAYS else None),
+            computed_at=now,
+        ))
+    return plans
+
+
+def refresh_plans(supplier_id=None, batch_size=None):
+    """Recompute the replenishment plan of every listing (of one supplier). Returns how many were written."""
+    now = timezone.now()
+    today = timezone.localdate(now) if settings.USE_TZ else now.date()
+    # Whole days are cut off in build_plans; this only bounds the history read
+    since = now - timedelta(days=get_window_days())
+    first_orders = Order.objects.filter(supplier_commodity=OuterRef('pk'), status='accepted').order_by('ordered_at')
+    listings = SupplierCommodity.objects.annotate(
+        available=F('available_units') - F('reserved_units'),
+        first_day=Subquery(first_orders.annotate(day=TruncDate('ordered_at')).values('day')[:1]),
+    ).order_by('id')
+    if supplier_id is not None:
+        listings = listings.filter(supplier_id=supplier_id)
+    rows = list(listings.values_list('id', 'supplier_id', 'available', 'first_day'))
+
+    batch_size = batch_size or get_batch_size()
+    written, alerted = 0, set()
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        ids = [row[0] for row in batch]
+        plans = build_plans(batch, load_daily_demand(supplier_commodity_ids=ids, since=since), today, now)
+        with transaction.atomic():
+            previous = ReplenishmentPlan.objects.filter(supplier_commodity_id__in=ids)
+            alerted.update(previous.filter(status__in=ReplenishmentPlan.ALERT_STATUSES)
+                           .values_list('supplier_id', flat=True).distinct())
+            previous.delete()
+            written += len(ReplenishmentPlan.objects.bulk_create(plans))
+        alerted.update(plan.supplier_id for plan in plans if plan.status in ReplenishmentPlan.ALERT_STATUSES)
+    # Dashboards cache their alerts; only suppliers with alerts before or after need a fresh copy
+    for owner_id in alerted:
+        bump(SUPPLIER, owner_id)
+    return written
+
+
+def alerts(supplier_id):
+    """A supplier's plans due for restocking, soonest to run out first."""
+    return (
+        ReplenishmentPlan.objects.filter(supplier_id=supplier_id, status__in=ReplenishmentPlan.ALERT_STATUSES)
+        .select_related('supplier_commodity__commodity')
+        .order_by('days_of_cover', 'id')
+    )
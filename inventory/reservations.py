@@ -0,0 +1,96 @@
+"""Stock reservations ("holds") for pending orders.
+
+Placing an order reserves its quantity on the listing with one conditional
+``UPDATE``: ``reserved_units`` only grows while ``available_units -
+reserved_units`` still covers the order, so concurrent vendors can never be
+promised the same stock twice. A hold lasts ``STOCK_HOLD_SECONDS``.
+Accepting the order turns its hold into the stock decrement, rejecting it
+gives the hold back, and ``expire_holds`` releases holds that ran out, in
+bulk. An order whose hold expired stays pending; accepting it then needs
+free stock like a new order would.
+
+Available-to-promise is ``available_units - reserved_units`` on the listing
+row itself, so reading it costs nothing extra.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from .cache import MARKETPLACE, SUPPLIER, bump
+from .models import Order, SupplierCommodity
+
+# Expired holds released per transaction
+EXPIRE_BATCH_SIZE = 1000
+
+
+def get_hold_duration():
+    return timedelta(seconds=getattr(settings, 'STOCK_HOLD_SECONDS', 24 * 3600))
+
+
+def place_order(vendor, supplier_commodity, quantity):
+    """Create a pending order that holds ``quantity``. Returns ``None`` if that much isn't free."""
+    with transaction.atomic():
+        now = timezone.now()
+        held = SupplierCommodity.objects.filter(
+            id=supplier_commodity.id, available_units__gte=F('reserved_units') + quantity
+        ).update(reserved_units=F('reserved_units') + quantity, updated_at=now)
+        if not held:
+            return None
+        order = Order.objects.create(
+            vendor=vendor, supplier_commodity=supplier_commodity, quantity_requested=quantity,
+            status='pending', hold_expires_at=now + get_hold_duration(),
+        )
+    # The order's own signal bumps the vendor and supplier; available-to-promise changed too
+    bump(MARKETPLACE)
+    return order
+
+
+def release(quantities, now=None):
+    """Give back ``{supplier_commodity_id: quantity}`` of held stock with one ``UPDATE``."""
+    if not quantities:
+        return
+    SupplierCommodity.objects.filter(id__in=quantities).update(
+        reserved_units=F('reserved_units') - Case(
+            *(When(id=sc_id, then=Value(quantity)) for sc_id, quantity in quantities.items()),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        updated_at=now or timezone.now(),
+    )
+
+
+def expire_holds(now=None, batch_size=EXPIRE_BATCH_SIZE):
+    """Release every hold that expired by ``now``. Returns the number of orders released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            # Locked rows can't be accepted or rejected while their hold is released
+            expired = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', hold_expires_at__lte=now)
+                .order_by('hold_expires_at')
+                .values_list('id', 'supplier_commodity_id', 'quantity_requested')[:batch_size]
+            )
+            if not expired:
+                break
+            quantities = {}
+            for _, sc_id, quantity in expired:
+                quantities[sc_id] = quantities.get(sc_id, 0) + quantity
+            Order.objects.filter(id__in=[order_id for order_id, _, _ in expired]).update(
+                hold_expires_at=None, updated_at=now
+            )
+            release(quantities, now)
+            supplier_ids = set(
+                SupplierCommodity.objects.filter(id__in=quantities).values_list('supplier_id', flat=True)
+            )
+        released += len(expired)
+        # update() sends no signals
+        for supplier_id in supplier_ids:
+            bump(SUPPLIER, supplier_id)
+        bump(MARKETPLACE)
+        if len(expired) < batch_size:
+            break
+    return released
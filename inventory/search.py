@@ -0,0 +1,207 @@
+"""Marketplace listing search.
+
+Every ``SupplierCommodity`` carries a denormalized ``search_document`` (the
+commodity name plus the supplier's username and address), kept current by
+the receivers in ``inventory.signals``. Queries are tokenized and matched as
+prefixes, so results narrow as the user types.
+
+On PostgreSQL the document is matched with a ``tsvector`` GIN index and
+ordered by ``ts_rank``. Other databases (SQLite in dev and tests) use an
+in-process inverted index built from the documents on first use and rebuilt
+whenever a listing changes.
+"""
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection, connections
+from django.utils import timezone
+
+from .models import SupplierCommodity
+
+SEARCH_CONFIG = 'simple'
+SEARCH_INDEX_NAME = 'sc_search_document_gin'
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Past this many matches, scanning the listing ids beats one huge IN (...) list
+VISIBLE_ID_FILTER_LIMIT = 500
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def build_search_document(commodity_name, username, address):
+    return ' '.join(tokenize(f"{commodity_name} {username} {address}"))
+
+
+def document_for(supplier_commodity):
+    supplier = supplier_commodity.supplier
+    return build_search_document(supplier_commodity.commodity.name, supplier.username, supplier.address)
+
+
+def refresh_search_documents(queryset=None):
+    """Recompute ``search_document`` for ``queryset`` (default: every listing).
+
+    Only rows whose document changed are written. Returns how many were.
+    """
+    queryset = SupplierCommodity.objects.all() if queryset is None else queryset
+    listings = queryset.select_related('commodity', 'supplier').only(
+        'search_document', 'updated_at', 'commodity__name', 'supplier__username', 'supplier__address'
+    )
+    changed = []
+    now = timezone.now()
+    for listing in listings.iterator(chunk_size=2000):
+        document = document_for(listing)
+        if document != listing.search_document:
+            # The listing's commodity or supplier details changed, so it counts as modified
+            listing.search_document = document
+            listing.updated_at = now
+            changed.append(listing)
+    SupplierCommodity.objects.bulk_update(changed, ['search_document', 'updated_at'], batch_size=500)
+    if changed:
+        fallback_index.invalidate()
+    return len(changed)
+
+
+class InvertedIndex:
+    """Token -> ``{listing_id: term frequency}`` postings with prefix lookup."""
+
+    def __init__(self, documents):
+        postings = defaultdict(dict)
+        self.lengths = {}
+        for doc_id, document in documents:
+            tokens = document.split()
+            self.lengths[doc_id] = len(tokens)
+            for token in tokens:
+                postings[token][doc_id] = postings[token].get(doc_id, 0) + 1
+        self.postings = dict(postings)
+        self.terms = sorted(self.postings)
+        self.size = len(self.lengths)
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff', start)
+        return self.terms[start:end]
+
+    def search(self, terms):
+        """Return ``[(listing_id, score), ...]`` matching every term as a prefix, best first."""
+        scores = None
+        for prefix in terms:
+            term_scores = defaultdict(float)
+            for term in self._expand(prefix):
+                docs = self.postings[term]
+                idf = math.log(1 + self.size / len(docs))
+                # Whole-word matches outrank matches on a longer word
+                weight = idf if term == prefix else idf * len(prefix) / len(term)
+                for doc_id, tf in docs.items():
+                    term_scores[doc_id] += tf * weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+        # Shorter documents rank higher: the query covers more of them
+        ranked = [(doc_id, score / math.sqrt(self.lengths[doc_id])) for doc_id, score in scores.items()]
+        return sorted(ranked, key=lambda item: (-item[1], item[0]))
+
+
+class FallbackIndex:
+    """The process-wide ``InvertedIndex``, rebuilt lazily after ``invalidate()``."""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._index is None:
+                self._index = InvertedIndex(SupplierCommodity.objects.values_list('id', 'search_document').iterator())
+            return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+fallback_index = FallbackIndex()
+
+
+class RankedResults:
+    """Fallback search results: listing ids in rank order, loaded a page at a time.
+
+    Works as a ``Paginator`` object list; each page is one ``id__in`` query.
+    """
+
+    def __init__(self, queryset, ranked):
+        self.queryset = queryset
+        self.ranked = ranked
+
+    def __len__(self):
+        return len(self.ranked)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        page = self.ranked[index]
+        listings = self.queryset.in_bulk([doc_id for doc_id, _ in page])
+        for doc_id, score in page:
+            listings[doc_id].search_rank = score
+        return [listings[doc_id] for doc_id, _ in page]
+
+
+def search_listings(queryset, query):
+    """Narrow ``queryset`` of listings to those matching ``query``, most relevant first.
+
+    Returns a queryset on PostgreSQL and a ``RankedResults`` elsewhere; both
+    can be handed straight to a ``Paginator``. Each listing gets a
+    ``search_rank`` attribute.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, terms)
+
+    ranked = fallback_index.get().search(terms)
+    # The caller's filters still apply: keep only ranked ids the queryset contains
+    visible = queryset
+    if len(ranked) <= VISIBLE_ID_FILTER_LIMIT:
+        visible = queryset.filter(id__in=[doc_id for doc_id, _ in ranked])
+    visible = set(visible.values_list('id', flat=True))
+    return RankedResults(queryset, [item for item in ranked if item[0] in visible])
+
+
+def _postgres_search(queryset, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector('search_document', config=SEARCH_CONFIG)
+    # Terms are [a-z0-9]+ only, so they are safe to splice into a raw tsquery
+    query = SearchQuery(' & '.join(f"{term}:*" for term in terms), config=SEARCH_CONFIG, search_type='raw')
+    return queryset.annotate(
+        search=vector, search_rank=SearchRank(vector, query)
+    ).filter(search=query).order_by('-search_rank', 'id')
+
+
+def ensure_search_index(using='default'):
+    """Create the GIN index behind PostgreSQL search if it is missing.
+
+    Built with Django's own ``SearchVector`` SQL so it matches the
+    expression ``search_listings`` filters on. Returns whether it was created.
+    """
+    db = connections[using]
+    if db.vendor != 'postgresql':
+        return False
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    with db.cursor() as cursor:
+        existing = db.introspection.get_constraints(cursor, SupplierCommodity._meta.db_table)
+    if SEARCH_INDEX_NAME in existing:
+        return False
+    index = GinIndex(SearchVector('search_document', config=SEARCH_CONFIG), name=SEARCH_INDEX_NAME)
+    with db.schema_editor() as editor:
+        editor.add_index(SupplierCommodity, index)
+    return True
@@ -0,0 +1,167 @@
+"""Serializers for the JSON API (``inventory.api``)."""
+from django.db import transaction
+from rest_framework import serializers
+
+from . import ledger, reservations
+from .models import ListCommodity, SupplierCommodity, Order, Rating, ForecastResult, SupplierScore
+from .ratings import record_rating
+
+
+class SparseFieldsetMixin:
+    """Return only the fields named in ``?fields=a,b,c`` (all of them by default)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class ListCommoditySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ListCommodity
+        fields = ['id', 'name']
+
+
+class SupplierCommoditySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    commodity_name = serializers.CharField(source='commodity.name', read_only=True)
+    supplier_name = serializers.CharField(source='supplier.username', read_only=True)
+    supplier_avg_rating = serializers.FloatField(read_only=True)
+    supplier_rating_count = serializers.IntegerField(read_only=True)
+    available_to_promise = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = SupplierCommodity
+        fields = [
+            'id', 'commodity', 'commodity_name', 'supplier', 'supplier_name', 'unit', 'price_per_unit',
+            'manufactured_company', 'available_units', 'reserved_units', 'available_to_promise',
+            'base_unit', 'normalized_price', 'supplier_avg_rating', 'supplier_rating_count', 'updated_at',
+        ]
+        read_only_fields = ['supplier', 'reserved_units']
+
+    def update(self, instance, validated_data):
+        """Save under the row lock, refusing stock below what pending orders hold."""
+        with transaction.atomic():
+            instance.reserved_units = SupplierCommodity.objects.select_for_update().values_list(
+                'reserved_units', flat=True
+            ).get(pk=instance.pk)
+            if validated_data.get('available_units', instance.available_units) < instance.reserved_units:
+                raise serializers.ValidationError({'available_units': [
+                    f"Pending orders hold {instance.reserved_units}; available units can't be set below that."
+                ]})
+            return super().update(instance, validated_data)
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    commodity_name = serializers.CharField(source='supplier_commodity.commodity.name', read_only=True)
+    supplier = serializers.IntegerField(source='supplier_commodity.supplier_id', read_only=True)
+    supplier_name = serializers.CharField(source='supplier_commodity.supplier.username', read_only=True)
+    vendor_name = serializers.CharField(source='vendor.username', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'supplier_commodity', 'commodity_name', 'supplier', 'supplier_name', 'vendor', 'vendor_name',
+            'quantity_requested', 'status', 'ordered_at', 'updated_at', 'hold_expires_at',
+        ]
+        read_only_fields = ['vendor', 'status', 'ordered_at', 'hold_expires_at']
+
+    def validate(self, attrs):
+        if attrs['quantity_requested'] <= 0:
+            raise serializers.ValidationError({'quantity_requested': "Invalid quantity."})
+        if attrs['quantity_requested'] > attrs['supplier_commodity'].available_to_promise:
+            raise serializers.ValidationError({'quantity_requested': "Insufficient stock."})
+        return attrs
+
+    def create(self, validated_data):
+        # The stock may have been held by someone else since validate() looked
+        order = reservations.place_order(
+            validated_data['vendor'], validated_data['supplier_commodity'], validated_data['quantity_requested']
+        )
+        if order is None:
+            raise serializers.ValidationError({'quantity_requested': "Insufficient stock."})
+        return order
+
+
+class RatingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    commodity_name = serializers.CharField(source='order.supplier_commodity.commodity.name', read_only=True)
+    vendor_name = serializers.CharField(source='vendor.username', read_only=True)
+
+    class Meta:
+        model = Rating
+        fields = ['id', 'order', 'commodity_name', 'vendor', 'vendor_name', 'supplier', 'rating', 'comment', 'created_at']
+        read_only_fields = ['vendor', 'supplier', 'created_at']
+        # One rating per order is checked in validate_order, with a clearer message
+        validators = []
+
+    def validate_order(self, order):
+        vendor = self.context['request'].user
+        if order.vendor_id != vendor.id or order.status != 'accepted':
+            raise serializers.ValidationError("You can only rate your own accepted orders.")
+        if Rating.objects.filter(order=order).exists():
+            raise serializers.ValidationError("You have already rated this order.")
+        return order
+
+    def create(self, validated_data):
+        order = validated_data['order']
+        with transaction.atomic():
+            rating = Rating.objects.create(supplier_id=order.supplier_commodity.supplier_id, **validated_data)
+            record_rating(rating)
+        return rating
+
+
+class ForecastResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    commodity_name = serializers.CharField(source='supplier_commodity.commodity.name', read_only=True)
+
+    class Meta:
+        model = ForecastResult
+        fields = [
+            'supplier_commodity', 'commodity_name', 'status', 'insight', 'points', 'series', 'history',
+            'backend', 'order_count', 'fitted_at',
+        ]
+
+
+class StockLevelSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    at = serializers.DateTimeField()
+    units = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class StockTurnoverSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """A listing annotated by ``ledger.with_turnover``."""
+    commodity_name = serializers.CharField(source='commodity.name', read_only=True)
+    opening = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    closing = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    sold = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    turns = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SupplierCommodity
+        fields = ['id', 'commodity_name', 'opening', 'closing', 'sold', 'turns']
+
+    def get_turns(self, listing):
+        return ledger.stock_turns(listing)
+
+
+class SupplierScoreSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """A ranked listing from ``ranking.top_suppliers``."""
+    supplier_name = serializers.CharField(source='supplier.username', read_only=True)
+    unit = serializers.CharField(source='supplier_commodity.unit', read_only=True)
+    price_per_unit = serializers.DecimalField(source='supplier_commodity.price_per_unit', max_digits=10,
+                                              decimal_places=2, read_only=True)
+    base_unit = serializers.CharField(source='supplier_commodity.base_unit', read_only=True)
+    normalized_price = serializers.DecimalField(source='supplier_commodity.normalized_price', max_digits=18,
+                                                decimal_places=6, read_only=True)
+    available_to_promise = serializers.DecimalField(source='supplier_commodity.available_to_promise',
+                                                    max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = SupplierScore
+        fields = [
+            'supplier_commodity', 'supplier', 'supplier_name', 'unit', 'price_per_unit', 'base_unit',
+            'normalized_price', 'available_to_promise', 'score', 'price_score', 'stock_score', 'rating_score',
+            'fulfilment_score', 'fulfilment_rate', 'computed_at',
+        ]
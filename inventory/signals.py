@@ -0,0 +1,89 @@
+"""Signal receivers, connected in ``InventoryConfig.ready``."""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import COMMODITIES, MARKETPLACE, SUPPLIER, VENDOR, bump
+from .models import ListCommodity, Order, Rating, SupplierCommodity, SupplierRatingSummary, Tombstone, User
+from .reservations import release
+from .search import document_for, fallback_index, refresh_search_documents
+from .units import normalize
+
+
+@receiver(pre_save, sender=SupplierCommodity)
+def set_search_document(sender, instance, **kwargs):
+    instance.search_document = document_for(instance)
+
+
+@receiver(pre_save, sender=SupplierCommodity)
+def set_normalized_price(sender, instance, **kwargs):
+    normalize(instance)
+
+
+@receiver(post_save, sender=SupplierCommodity)
+@receiver(post_delete, sender=SupplierCommodity)
+def supplier_commodity_changed(sender, instance, **kwargs):
+    fallback_index.invalidate()
+    bump(SUPPLIER, instance.supplier_id)
+    bump(MARKETPLACE)
+
+
+@receiver(post_delete, sender=SupplierCommodity)
+def record_listing_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(model='supplier_commodity', object_id=instance.id, supplier_id=instance.supplier_id)
+
+
+@receiver(post_save, sender=ListCommodity)
+@receiver(post_delete, sender=ListCommodity)
+def commodity_changed(sender, instance, created=False, **kwargs):
+    bump(COMMODITIES)
+    if created or kwargs['signal'] is post_delete:
+        return
+    refresh_search_documents(SupplierCommodity.objects.filter(commodity=instance))
+    bump(MARKETPLACE)
+
+
+@receiver(post_save, sender=User)
+def refresh_supplier_listings(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save only last_login; skip anything that can't change a document
+    if created or instance.role != 'supplier':
+        return
+    if update_fields is not None and not {'username', 'address'} & set(update_fields):
+        return
+    if refresh_search_documents(SupplierCommodity.objects.filter(supplier=instance)):
+        bump(MARKETPLACE)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    bump(VENDOR, instance.vendor_id)
+    bump(SUPPLIER, instance.supplier_commodity.supplier_id)
+
+
+@receiver(post_delete, sender=Order)
+def record_order_deleted(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model='order', object_id=instance.id,
+        supplier_id=instance.supplier_commodity.supplier_id, vendor_id=instance.vendor_id,
+    )
+
+
+@receiver(post_delete, sender=Order)
+def release_deleted_hold(sender, instance, **kwargs):
+    # e.g. the vendor's account was deleted while the order still held stock
+    if instance.status == 'pending' and instance.hold_expires_at is not None:
+        release({instance.supplier_commodity_id: instance.quantity_requested})
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def rating_changed(sender, instance, **kwargs):
+    bump(VENDOR, instance.vendor_id)
+    bump(SUPPLIER, instance.supplier_id)
+    bump(MARKETPLACE)
+
+
+@receiver(post_save, sender=SupplierRatingSummary)
+@receiver(post_delete, sender=SupplierRatingSummary)
+def rating_summary_changed(sender, **kwargs):
+    bump(MARKETPLACE)
@@ -0,0 +1,229 @@
+"""Synthetic marketplace data at production scale, for benchmarks.
+
+``generate_dataset`` creates suppliers, vendors, listings and any number
+of orders with bulk inserts, one batch (and one transaction) at a time, so
+memory stays flat however many orders are asked for. Demand has a
+yearly season, a weekly cycle and a slow trend. A few popular listings
+take most of the orders. Older orders are mostly settled while recent
+ones are still pending. Some accepted orders are rated, and each supplier
+has its own typical score.
+
+Everything is named with a prefix so a dataset can be removed again with
+``delete_dataset``.
+"""
+import math
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import COMMODITIES, MARKETPLACE, SUPPLIER, VENDOR, bump
+from .models import (
+    User, ListCommodity, SupplierCommodity, Order, Rating, StockMovement, StockSnapshot, ForecastResult,
+    SupplierScore, ReplenishmentPlan,
+)
+from .ratings import rebuild_rating_summaries
+from .search import build_search_document, fallback_index
+from .units import normalize
+
+GOODS = ["rice", "wheat", "sugar", "salt", "cotton", "steel", "copper", "cement", "timber", "paper",
+         "maize", "barley", "lentils", "turmeric", "pepper", "cardamom", "tea", "coffee", "jute", "rubber",
+         "glass", "plastic", "wire", "paint", "bricks", "tiles", "pipes", "bolts", "fabric", "yarn"]
+GRADES = ["premium", "basmati", "organic", "refined", "raw", "grade", "export", "fine", "coarse", "industrial"]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Chennai", "Kolkata", "Pune", "Hyderabad", "Jaipur", "Lucknow",
+          "Indore", "Nagpur", "Surat", "Kochi", "Mysuru", "Patna", "Bhopal", "Ranchi", "Guwahati", "Vadodara"]
+UNITS = ['kg', 'q', 't', 'l', 'unit']
+# Share of settled orders that were accepted; the rest were rejected
+ACCEPT_RATE = 0.85
+# Orders younger than this are still waiting for the supplier
+PENDING_DAYS = 3
+PASSWORD = "synthetic"
+
+Dataset = namedtuple('Dataset', ['suppliers', 'vendors', 'listings', 'orders', 'ratings'])
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk inserts keep the ``auto_now``/``auto_now_add`` values they were given."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def day_weights(days, end):
+    """Relative demand for each of the ``days`` days up to ``end``: season, weekday and trend."""
+    dates = [end - timedelta(days=days - 1 - i) for i in range(days)]
+    weights = np.array([
+        (1 + 0.35 * math.sin(2 * math.pi * day.timetuple().tm_yday / 365.25))
+        * (0.55 if day.weekday() >= 5 else 1.0)
+        * (0.8 + 0.4 * i / max(days - 1, 1))
+        for i, day in enumerate(dates)
+    ])
+    return dates, weights / weights.sum()
+
+
+def _purge(queryset, batch_size):
+    """Delete ``queryset`` with plain DELETEs of ``batch_size`` rows: no cascade, no signals, nothing loaded."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        batch = queryset.model.objects.filter(pk__in=ids)
+        deleted += batch._raw_delete(batch.db)
+
+
+def delete_dataset(prefix, batch_size=5000):
+    """Remove every user created under ``prefix`` with their listings, orders and ratings. Returns rows deleted.
+
+    Orders and listings are deleted directly rather than through the ORM
+    cascade: that would load every row and fire the per-row delete signals,
+    writing a tombstone to the change feed for each fake order.
+    """
+    users = User.objects.filter(username__startswith=f"{prefix}-")
+    listings = SupplierCommodity.objects.filter(supplier__in=users)
+    orders = Order.objects.filter(Q(vendor__in=users) | Q(supplier_commodity__in=listings))
+    # Dependents first, as the database checks foreign keys that the cascade would have handled
+    querysets = [
+        Rating.objects.filter(Q(order__in=orders) | Q(vendor__in=users) | Q(supplier__in=users)),
+        orders,
+        # The stock ledger outlives deleted listings, but synthetic history shouldn't
+        StockMovement.objects.filter(supplier_commodity__in=listings),
+        StockSnapshot.objects.filter(supplier_commodity__in=listings),
+        ForecastResult.objects.filter(supplier_commodity__in=listings),
+        SupplierScore.objects.filter(Q(supplier_commodity__in=listings) | Q(supplier__in=users)),
+        ReplenishmentPlan.objects.filter(Q(supplier_commodity__in=listings) | Q(supplier__in=users)),
+        listings,
+    ]
+    deleted = sum(_purge(queryset, batch_size) for queryset in querysets)
+    # What's left is the users themselves and a rating summary or two
+    deleted += users.delete()[0]
+    fallback_index.invalidate()
+    bump(MARKETPLACE)
+    return deleted
+
+
+def generate_dataset(suppliers=20, skus=50, vendors=200, orders=100000, days=365, rated=0.3,
+                     prefix="synthetic", seed=42, batch_size=5000, log=None):
+    """Create a dataset and return the ``Dataset`` counts.
+
+    ``skus`` is the number of listings per supplier. Orders are spread over
+    the ``days`` days up to today.
+    """
+    rng = np.random.default_rng(seed)
+    log = log or (lambda message: None)
+    password = make_password(PASSWORD)
+
+    supplier_users = User.objects.bulk_create(
+        User(
+            username=f"{prefix}-supplier-{i}", role="supplier", password=password,
+            address=f"{i + 1} Market Road, {CITIES[i % len(CITIES)]}", state="", pincode="", phone_number="",
+        )
+        for i in range(suppliers)
+    )
+    vendor_users = User.objects.bulk_create(
+        (User(
+            username=f"{prefix}-vendor-{i}", role="vendor", password=password,
+            address=CITIES[i % len(CITIES)], state="", pincode="", phone_number="",
+        ) for i in range(vendors)),
+        batch_size=batch_size,
+    )
+    log(f"Created {suppliers} suppliers and {vendors} vendors.")
+
+    names = [f"{grade.title()} {good}" for good in GOODS for grade in GRADES]
+    ListCommodity.objects.bulk_create([ListCommodity(name=name) for name in names], ignore_conflicts=True)
+    commodities = list(ListCommodity.objects.filter(name__in=names))
+
+    listings = []
+    for supplier in supplier_users:
+        for index in rng.choice(len(commodities), size=min(skus, len(commodities)), replace=False):
+            commodity = commodities[index]
+            listings.append(SupplierCommodity(
+                supplier=supplier, commodity=commodity, unit=UNITS[int(rng.integers(len(UNITS)))],
+                price_per_unit=Decimal(f"{rng.lognormal(3.5, 0.8):.2f}"),
+                manufactured_company=f"{commodity.name.split()[-1].title()} Works {int(rng.integers(1, 40))}",
+                available_units=Decimal(int(rng.integers(0, 5000))),
+                search_document=build_search_document(commodity.name, supplier.username, supplier.address),
+            ))
+            normalize(listings[-1])
+    listings = SupplierCommodity.objects.bulk_create(listings, batch_size=batch_size)
+    StockMovement.objects.bulk_create(
+        (StockMovement(supplier_commodity=listing, kind=StockMovement.RECEIPT, quantity=listing.available_units)
+         for listing in listings if listing.available_units),
+        batch_size=batch_size,
+    )
+    log(f"Created {len(listings)} listings.")
+
+    # A few listings take most orders (Zipf-like); each supplier rates around its own mean
+    popularity = 1 / np.arange(1, len(listings) + 1) ** 0.9
+    popularity = rng.permutation(popularity / popularity.sum())
+    supplier_quality = {supplier.id: rng.uniform(2.5, 4.8) for supplier in supplier_users}
+    dates, weights = day_weights(days, timezone.localdate())
+    midnights = [datetime.combine(day, time()) for day in dates]
+    if settings.USE_TZ:
+        midnights = [timezone.make_aware(midnight) for midnight in midnights]
+    now = timezone.now()
+
+    created_orders = created_ratings = 0
+    order_fields = [Order._meta.get_field('ordered_at'), Order._meta.get_field('updated_at')]
+    with explicit_timestamps(*order_fields, Rating._meta.get_field('created_at')):
+        while created_orders < orders:
+            size = min(batch_size, orders - created_orders)
+            day_index = rng.choice(days, size=size, p=weights)
+            seconds = rng.integers(7 * 3600, 20 * 3600, size=size)
+            listing_index = rng.choice(len(listings), size=size, p=popularity)
+            vendor_index = rng.integers(len(vendor_users), size=size)
+            quantities = rng.poisson(4, size=size) + 1
+            settled = rng.random(size)
+
+            batch = []
+            for i in range(size):
+                ordered_at = min(midnights[day_index[i]] + timedelta(seconds=int(seconds[i])), now)
+                if (now - ordered_at).days < PENDING_DAYS:
+                    status = 'pending'
+                else:
+                    status = 'accepted' if settled[i] < ACCEPT_RATE else 'rejected'
+                batch.append(Order(
+                    vendor=vendor_users[vendor_index[i]], supplier_commodity=listings[listing_index[i]],
+                    quantity_requested=int(quantities[i]), status=status,
+                    ordered_at=ordered_at, updated_at=ordered_at,
+                ))
+
+            with transaction.atomic():
+                batch = Order.objects.bulk_create(batch)
+                ratings = []
+                for order in batch:
+                    if order.status == 'accepted' and rng.random() < rated:
+                        supplier_id = order.supplier_commodity.supplier_id
+                        score = int(np.clip(round(rng.normal(supplier_quality[supplier_id], 0.9)), 1, 5))
+                        ratings.append(Rating(
+                            order=order, vendor=order.vendor, supplier_id=supplier_id, rating=score,
+                            created_at=min(order.ordered_at + timedelta(hours=int(rng.integers(1, 72))), now),
+                        ))
+                Rating.objects.bulk_create(ratings)
+            created_orders += size
+            created_ratings += len(ratings)
+            log(f"Created {created_orders}/{orders} orders.")
+
+    # Bulk inserts send no signals
+    rebuild_rating_summaries()
+    fallback_index.invalidate()
+    bump(COMMODITIES)
+    bump(MARKETPLACE)
+    for user in supplier_users:
+        bump(SUPPLIER, user.id)
+    for user in vendor_users:
+        bump(VENDOR, user.id)
+    return Dataset(len(supplier_users), len(vendor_users), len(listings), created_orders, created_ratings)
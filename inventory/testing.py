@@ -0,0 +1,141 @@
+"""Test helpers: seeded marketplace data, per-view query budgets and plans.
+
+A view that loads its object graph properly runs the same number of queries
+whether the supplier has ten orders or ten thousand. ``QueryBudgetMixin``
+seeds the database at each of ``BUDGET_SIZES`` and fails as soon as a view
+goes over its budget, printing the queries it ran. It can also EXPLAIN every
+query a view runs and fail on a full table scan of one of the tables that
+grow with the business (``LARGE_TABLES``).
+"""
+import itertools
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from .models import User, ListCommodity, SupplierCommodity, Order, Rating, ForecastResult, Tombstone
+from .ratings import rebuild_rating_summaries
+from .search import refresh_search_documents
+
+BUDGET_SIZES = (10, 1000, 10000)
+BATCH_SIZE = 500
+LARGE_TABLES = frozenset(
+    model._meta.db_table for model in (SupplierCommodity, Order, Rating, ForecastResult, Tombstone)
+)
+
+
+def explain(sql, params=None):
+    """The plan lines for ``sql``; captured queries come with their parameters already interpolated."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Small test tables make a sequential scan cheapest; ask whether an index *could* serve the query
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def table_scans(plan):
+    """The ``LARGE_TABLES`` that ``plan`` reads in full without an index."""
+    scanned = set()
+    for line in plan:
+        if connection.vendor == 'postgresql':
+            words = line.split()
+            pairs = zip(words, words[1:], words[2:], words[3:])
+            scanned.update(table for seq, scan, on, table in pairs if (seq, scan, on) == ('Seq', 'Scan', 'on'))
+        elif line.startswith('SCAN ') and ' USING ' not in line:
+            scanned.add(line.split()[1])
+    return scanned & LARGE_TABLES
+
+
+def seed_marketplace(rows, vendors=5):
+    """Create one supplier with ``rows`` orders spread over its commodities.
+
+    Every tenth order is pending, the rest are split between accepted and
+    rejected and every other accepted order is rated. Returns the supplier,
+    the first vendor and the counts that were created.
+    """
+    supplier = User.objects.create(username=f"budget-supplier-{rows}", role="supplier")
+    buyers = User.objects.bulk_create(
+        User(username=f"budget-vendor-{rows}-{i}", role="vendor") for i in range(vendors)
+    )
+    commodities = ListCommodity.objects.bulk_create(
+        (ListCommodity(name=f"Budget commodity {rows}-{i}") for i in range(rows // 10 + 1)),
+        batch_size=BATCH_SIZE,
+    )
+    skus = SupplierCommodity.objects.bulk_create(
+        (SupplierCommodity(
+            supplier=supplier, commodity=commodity, unit="kg", price_per_unit=10,
+            manufactured_company="Acme", available_units=1000,
+        ) for commodity in commodities),
+        batch_size=BATCH_SIZE,
+    )
+
+    statuses = itertools.cycle(["pending"] + ["accepted", "rejected"] * 4 + ["accepted"])
+    orders = Order.objects.bulk_create(
+        (Order(
+            vendor=buyers[i % vendors], supplier_commodity=skus[i % len(skus)],
+            quantity_requested=1 + i % 5, status=next(statuses),
+        ) for i in range(rows)),
+        batch_size=BATCH_SIZE,
+    )
+    accepted = [order for order in orders if order.status == "accepted"]
+    ratings = Rating.objects.bulk_create(
+        (Rating(
+            order=order, vendor=order.vendor, supplier=supplier, rating=1 + order.id % 5,
+        ) for order in accepted[::2]),
+        batch_size=BATCH_SIZE,
+    )
+    rebuild_rating_summaries(supplier.id)
+    refresh_search_documents(SupplierCommodity.objects.filter(supplier=supplier))
+    return SimpleNamespace(
+        supplier=supplier, vendor=buyers[0],
+        orders=len(orders), skus=len(skus), ratings=len(ratings),
+    )
+
+
+class QueryBudgetMixin:
+    """Mix into a ``TestCase`` to assert views stay within a fixed query count."""
+
+    @contextmanager
+    def seeded(self, rows):
+        """Seed ``rows`` orders for the duration of the block, then roll them back."""
+        # Seeding bulk-creates rows without signals, so nothing cached may survive it
+        cache.clear()
+        with transaction.atomic():
+            yield seed_marketplace(rows)
+            transaction.set_rollback(True)
+
+    def assertQueryBudget(self, user, url, budget, data=None):
+        """GET ``url`` as ``user`` and fail if it runs more than ``budget`` queries."""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        if len(queries) > budget:
+            self.fail(
+                f"{url} ran {len(queries)} queries, budget is {budget}:\n"
+                + "\n".join(query['sql'] for query in queries.captured_queries)
+            )
+        return response
+
+    def assertNoTableScans(self, user, url, data=None):
+        """GET ``url`` as ``user`` and fail if any query it runs scans a whole large table."""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        failures = []
+        for query in queries.captured_queries:
+            if not query['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(query['sql'])
+            scanned = table_scans(plan)
+            if scanned:
+                failures.append(f"{query['sql']}\n  scans {', '.join(sorted(scanned))}:\n    " + "\n    ".join(plan))
+        if failures:
+            self.fail(f"{url} scans large tables:\n" + "\n".join(failures))
+        return response
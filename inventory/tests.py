@@ -1,3 +1,1426 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import bulk_inventory, cart, events, ledger, ranking, replenishment, reservations, synthetic, units
+from .cache import unshared_cache_warning
+from .charts import ChartCache, chart_cache, draw_forecast
+from . import fulfilment
+from .demand import EMPTY_SERIES, DemandSeries, load_daily_demand
+from .pagination import PAGE_SIZE, encode_cursor, keyset_page, page_query
+from .forecasters import HoltWintersForecaster
+from .forecasting import build_forecast, fit_many, refresh_forecasts
+from .metrics import RequestStats, current_stats, registry
+from .middleware import PerformanceMiddleware
+from .models import (
+    User, ListCommodity, SupplierCommodity, Order, Rating, ForecastResult, SupplierRatingSummary, StockMovement,
+    SupplierScore, ReplenishmentPlan, Tombstone,
+)
+from .ratings import rebuild_rating_summaries
+from .search import InvertedIndex, fallback_index, search_listings
+from .testing import BUDGET_SIZES, QueryBudgetMixin, explain, table_scans
+from .views import DASHBOARD_PENDING_LIMIT
+
+
+FAKE_FORECAST = {
+    'status': 'ok',
+    'points': [{'ds': '2025-01-08T00:00:00', 'yhat': 4.0, 'yhat_lower': 2.0, 'yhat_upper': 6.0}],
+    'series': [{'ds': '2025-01-08T00:00:00', 'yhat': 4.0, 'yhat_lower': 2.0, 'yhat_upper': 6.0}],
+    'history': [{'ds': '2025-01-01T00:00:00', 'y': 3.0}],
+    'insight': "Demand is stable.",
+}
+
+
+def at(*args):
+    """A datetime in the project's time zone mode."""
+    value = datetime(*args)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def daily_series(quantities, start=date(2025, 1, 1)):
+    return DemandSeries.from_days([start + timedelta(days=i) for i in range(len(quantities))], quantities)
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = User.objects.create_user(username="supplier", password="pass", role="supplier")
+        cls.vendor = User.objects.create_user(username="vendor", password="pass", role="vendor")
+        cls.rice = ListCommodity.objects.create(name="Rice")
+        cls.sc = SupplierCommodity.objects.create(
+            supplier=cls.supplier, commodity=cls.rice, unit="kg",
+            price_per_unit=10, manufactured_company="Acme", available_units=100,
+        )
+
+    def place_orders(self, count, status="accepted", quantity=2, sc=None):
+        return [
+            Order.objects.create(
+                vendor=self.vendor, supplier_commodity=sc or self.sc,
+                quantity_requested=quantity, status=status,
+            )
+            for _ in range(count)
+        ]
+
+
+@mock.patch("inventory.forecasting.build_forecast", return_value=FAKE_FORECAST)
+class ForecastRefreshTests(InventoryTestCase):
+    def test_refits_only_when_accepted_orders_change(self, build):
+        self.place_orders(5)
+        self.assertEqual(refresh_forecasts(), 1)
+        self.assertEqual(refresh_forecasts(), 0)
+
+        self.place_orders(1, status="pending")
+        self.assertEqual(refresh_forecasts(), 0)
+
+        self.place_orders(1)
+        self.assertEqual(refresh_forecasts(), 1)
+        self.assertEqual(ForecastResult.objects.get().order_count, 6)
+        self.assertEqual(build.call_count, 2)
+
+    @override_settings(FORECAST_BACKEND="prophet")
+    def test_changing_backend_triggers_refit(self, build):
+        self.place_orders(5)
+        refresh_forecasts()
+
+        SupplierCommodity.objects.filter(id=self.sc.id).update(forecast_backend="holt_winters")
+        self.assertEqual(refresh_forecasts(), 1)
+        self.assertEqual(ForecastResult.objects.get().backend, "holt_winters")
+
+    def test_forecast_page_reads_stored_results(self, build):
+        self.place_orders(5)
+        refresh_forecasts()
+        build.reset_mock()
+
+        self.client.force_login(self.supplier)
+        response = self.client.get(reverse("forecast"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(build.called)
+        self.assertEqual(response.context["predictions"][0]["status"], "ok")
+
+    def test_forecast_page_marks_unfitted_commodities_pending(self, build):
+        self.client.force_login(self.supplier)
+        response = self.client.get(reverse("forecast"))
+        self.assertEqual(response.context["predictions"][0]["status"], "pending")
+
+
+class ForecastChartTests(InventoryTestCase):
+    def setUp(self):
+        patcher = mock.patch("inventory.forecasting.build_forecast", return_value=FAKE_FORECAST)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        chart_cache.clear()
+        self.place_orders(5)
+        refresh_forecasts()
+        self.client.force_login(self.supplier)
+
+    def test_rendered_charts_are_cached_per_forecast_version(self):
+        with mock.patch("inventory.charts.draw_forecast", wraps=draw_forecast) as draw:
+            first = self.client.get(reverse("forecast"))
+            second = self.client.get(reverse("forecast"))
+            self.assertEqual(draw.call_count, 1)
+            self.assertEqual(first.context["predictions"][0]["graph"], second.context["predictions"][0]["graph"])
+
+            self.place_orders(1)
+            refresh_forecasts()
+            self.client.get(reverse("forecast"))
+            self.assertEqual(draw.call_count, 2)
+
+    def test_svg_mode_inlines_markup(self):
+        response = self.client.get(reverse("forecast"), {"chart": "svg"})
+        self.assertTrue(response.context["predictions"][0]["graph"].startswith("<svg"))
+
+    def test_json_mode_skips_server_rendering(self):
+        with mock.patch("inventory.charts.draw_forecast") as draw:
+            response = self.client.get(reverse("forecast"), {"chart": "json"})
+        self.assertFalse(draw.called)
+        self.assertEqual(response.context["predictions"][0]["graph"]["series"][0][1], 4.0)
+        self.assertContains(response, 'id="forecast-series-%d"' % self.sc.id)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = ChartCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+
+class DailyDemandLoadingTests(InventoryTestCase):
+    def add_commodities(self, count):
+        offset = ListCommodity.objects.count()
+        return [
+            SupplierCommodity.objects.create(
+                supplier=self.supplier, commodity=ListCommodity.objects.create(name=f"Item {offset + i}"),
+                price_per_unit=1, manufactured_company="Acme", available_units=10,
+            )
+            for i in range(count)
+        ]
+
+    def backdate(self, orders, when):
+        Order.objects.filter(id__in=[o.id for o in orders]).update(ordered_at=when)
+
+    def test_orders_are_summed_per_day_and_commodity(self):
+        other = self.add_commodities(1)[0]
+        self.backdate(self.place_orders(2, quantity=3), at(2025, 1, 1, 9))
+        self.backdate(self.place_orders(1, quantity=4), at(2025, 1, 3, 9))
+        self.backdate(self.place_orders(1, quantity=5, sc=other), at(2025, 1, 2, 9))
+        self.place_orders(1, status="pending")
+
+        demand = load_daily_demand(supplier_id=self.supplier.id)
+
+        rice = demand[self.sc.id]
+        self.assertEqual(rice.ds.tolist(), [date(2025, 1, 1), date(2025, 1, 3)])
+        self.assertEqual(rice.y.tolist(), [6.0, 4.0])
+        self.assertEqual(rice.order_count, 3)
+        self.assertEqual(demand[other.id].y.tolist(), [5.0])
+
+    @mock.patch("inventory.forecasting.build_forecast", return_value=FAKE_FORECAST)
+    def test_query_count_is_independent_of_commodity_count(self, build):
+        self.place_orders(5)
+        refresh_forecasts(workers=1)
+        self.client.force_login(self.supplier)
+
+        for extra in (3, 30):
+            for sc in self.add_commodities(extra):
+                self.place_orders(5, sc=sc)
+
+            with self.assertNumQueries(1):
+                load_daily_demand(supplier_id=self.supplier.id)
+            # watermark, stored forecasts, history, insert new, update existing
+            with self.assertNumQueries(5):
+                refresh_forecasts(force=True, workers=1)
+            # user, commodities, forecasts (the session comes from the cache)
+            with self.assertNumQueries(3):
+                self.client.get(reverse("forecast"), {"chart": "json"})
+
+
+class OrderFulfilmentTests(InventoryTestCase):
+    def stock(self):
+        self.sc.refresh_from_db()
+        return self.sc.available_units
+
+    def test_accept_decrements_stock_once(self):
+        order = self.place_orders(1, status="pending", quantity=30)[0]
+        self.assertEqual(order.accept_order(), fulfilment.ACCEPTED)
+        self.assertEqual(order.accept_order(), fulfilment.NOT_PENDING)
+        self.assertEqual(self.stock(), 70)
+
+    def test_accept_without_stock_leaves_order_pending(self):
+        order = self.place_orders(1, status="pending", quantity=101)[0]
+        self.assertEqual(order.accept_order(), fulfilment.INSUFFICIENT_STOCK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "pending")
+        self.assertEqual(self.stock(), 100)
+
+    def test_bulk_accept_allocates_oldest_first(self):
+        orders = self.place_orders(3, status="pending", quantity=40)
+        results = fulfilment.bulk_accept_orders(self.supplier, [o.id for o in orders] + [999999])
+
+        self.assertEqual([results[o.id] for o in orders],
+                         [fulfilment.ACCEPTED, fulfilment.ACCEPTED, fulfilment.INSUFFICIENT_STOCK])
+        self.assertEqual(results[999999], fulfilment.NOT_PENDING)
+        self.assertEqual(self.stock(), 20)
+
+    def test_bulk_actions_use_constant_queries(self):
+        # Kept under SQLite's 999 parameters per statement, which would split the ledger insert on its own
+        for count in (5, 150):
+            SupplierCommodity.objects.filter(id=self.sc.id).update(available_units=10000)
+            ids = [o.id for o in self.place_orders(count, status="pending", quantity=1)]
+            # savepoint, lock orders, lock stock, update stock, update orders, ledger, release
+            with self.assertNumQueries(7):
+                fulfilment.bulk_accept_orders(self.supplier, ids)
+            ids = [o.id for o in self.place_orders(count, status="pending", quantity=1)]
+            # savepoint, lock orders, update orders, release
+            with self.assertNumQueries(4):
+                fulfilment.bulk_reject_orders(self.supplier, ids)
+
+    def test_bulk_endpoint_only_touches_own_orders(self):
+        other_supplier = User.objects.create_user(username="other", password="pass", role="supplier")
+        other_sc = SupplierCommodity.objects.create(
+            supplier=other_supplier, commodity=self.rice, price_per_unit=1,
+            manufactured_company="Acme", available_units=100,
+        )
+        mine = self.place_orders(2, status="pending")
+        theirs = self.place_orders(1, status="pending", sc=other_sc)
+
+        self.client.force_login(self.supplier)
+        response = self.client.post(reverse("bulk_process_orders"), {
+            "action": "reject", "order_ids": [o.id for o in mine + theirs],
+        })
+
+        self.assertRedirects(response, reverse("supplier_orders"))
+        self.assertEqual(Order.objects.filter(status="rejected").count(), 2)
+        theirs[0].refresh_from_db()
+        self.assertEqual(theirs[0].status, "pending")
+
+
+class StockReservationTests(InventoryTestCase):
+    def listing(self):
+        self.sc.refresh_from_db()
+        return self.sc.available_units, self.sc.reserved_units
+
+    def test_placing_an_order_holds_stock_until_rejected(self):
+        order = reservations.place_order(self.vendor, self.sc, 70)
+        self.assertIsNotNone(order.hold_expires_at)
+        self.assertEqual(self.listing(), (100, 70))
+        self.assertIsNone(reservations.place_order(self.vendor, self.sc, 31))
+
+        self.assertEqual(fulfilment.reject_order(order), fulfilment.REJECTED)
+        self.assertEqual(self.listing(), (100, 0))
+        self.assertIsNotNone(reservations.place_order(self.vendor, self.sc, 31))
+
+    def test_accepting_consumes_the_hold(self):
+        held = reservations.place_order(self.vendor, self.sc, 60)
+        unheld, = self.place_orders(1, status="pending", quantity=60)
+        # Only 40 units are free, so the order without a hold can't be accepted
+        self.assertEqual(fulfilment.accept_order(unheld), fulfilment.INSUFFICIENT_STOCK)
+        self.assertEqual(fulfilment.accept_order(held), fulfilment.ACCEPTED)
+        self.assertEqual(self.listing(), (40, 0))
+
+    def test_suppliers_cant_set_stock_below_held_units(self):
+        reservations.place_order(self.vendor, self.sc, 70)
+        self.client.force_login(self.supplier)
+        self.client.post(reverse("update_commodity", args=[self.sc.id]), {
+            "available_units": "50", "price_per_unit": "10", "manufactured_company": "Acme", "unit": "kg",
+        })
+        self.assertEqual(self.listing(), (100, 70))
+
+        result = bulk_inventory.import_inventory(self.supplier, [(2, {
+            "id": str(self.sc.id), "commodity": "Rice", "unit": "kg", "price_per_unit": "10",
+            "manufactured_company": "Acme", "available_units": "69.99",
+        })])
+        self.assertEqual((result.updated, result.error_count), (0, 1))
+        self.assertIn("held by pending orders", result.errors[0][1])
+        response = self.client.patch(f"/api/v1/listings/{self.sc.id}/", {"available_units": "10"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.listing(), (100, 70))
+
+        self.client.post(reverse("update_commodity", args=[self.sc.id]), {
+            "available_units": "70", "price_per_unit": "10", "manufactured_company": "Acme", "unit": "kg",
+        })
+        self.assertEqual(self.listing(), (70, 70))
+
+    def test_expired_holds_are_released_in_bulk(self):
+        expired = [reservations.place_order(self.vendor, self.sc, 10) for _ in range(3)]
+        fresh = reservations.place_order(self.vendor, self.sc, 5)
+        Order.objects.filter(id__in=[o.id for o in expired]).update(hold_expires_at=timezone.now())
+
+        self.assertEqual(reservations.expire_holds(batch_size=2), 3)
+        self.assertEqual(self.listing(), (100, 5))
+        self.assertEqual(Order.objects.filter(status="pending", hold_expires_at__isnull=True).count(), 3)
+        fresh.refresh_from_db()
+        self.assertIsNotNone(fresh.hold_expires_at)
+        self.assertEqual(reservations.expire_holds(), 0)
+
+    def test_bulk_actions_consume_and_release_holds(self):
+        held = [reservations.place_order(self.vendor, self.sc, 30) for _ in range(3)]
+        unheld, = self.place_orders(1, status="pending", quantity=10)
+        results = fulfilment.bulk_accept_orders(self.supplier, [held[0].id, unheld.id])
+        self.assertEqual(results, {held[0].id: fulfilment.ACCEPTED, unheld.id: fulfilment.ACCEPTED})
+        self.assertEqual(self.listing(), (60, 60))
+        # Nothing is left for orders without a hold
+        unheld, = self.place_orders(1, status="pending", quantity=1)
+        self.assertEqual(fulfilment.bulk_accept_orders(self.supplier, [unheld.id])[unheld.id],
+                         fulfilment.INSUFFICIENT_STOCK)
+
+        fulfilment.bulk_reject_orders(self.supplier, [o.id for o in held[1:]])
+        self.assertEqual(self.listing(), (60, 0))
+
+
+class StockLedgerTests(InventoryTestCase):
+    def ledger_total(self):
+        total = StockMovement.objects.filter(supplier_commodity=self.sc).aggregate(total=Sum("quantity"))["total"]
+        self.sc.refresh_from_db()
+        self.assertEqual(total, self.sc.available_units)
+        return total
+
+    def test_every_stock_change_is_written_to_the_ledger(self):
+        self.assertEqual(self.ledger_total(), 100)
+        order, = self.place_orders(1, status="pending", quantity=30)
+        fulfilment.accept_order(order)
+        self.assertEqual(self.ledger_total(), 70)
+
+        self.client.force_login(self.supplier)
+        self.client.post(reverse("update_commodity", args=[self.sc.id]), {
+            "available_units": "50", "price_per_unit": "10", "manufactured_company": "Acme", "unit": "kg",
+        })
+        self.assertEqual(self.ledger_total(), 50)
+        self.sc.save()  # nothing changed, nothing recorded
+        bulk_inventory.import_inventory(self.supplier, [(2, {
+            "id": str(self.sc.id), "commodity": "Rice", "unit": "kg", "price_per_unit": "10",
+            "manufactured_company": "Acme", "available_units": "65",
+        })])
+        self.assertEqual(self.ledger_total(), 65)
+        self.assertEqual(
+            list(StockMovement.objects.filter(supplier_commodity=self.sc).order_by("id").values_list("kind", "order")),
+            [("receipt", None), ("sale", order.id), ("adjustment", None), ("adjustment", None)],
+        )
+
+    def test_stock_at_reads_the_latest_snapshot_and_its_tail(self):
+        start = timezone.now() + timedelta(hours=1)
+        for hour, change in enumerate([-10, 25, -5, -40]):
+            ledger.record(self.sc.id, ledger.SALE if change < 0 else ledger.RECEIPT, change,
+                          at=start + timedelta(hours=hour))
+        self.assertEqual(ledger.compact(until=start + timedelta(hours=1, minutes=30)), 1)
+        self.assertEqual(ledger.compact(until=start + timedelta(hours=1, minutes=30)), 0)
+        # Rewriting history behind a snapshot doesn't change what it answers, so it was read
+        StockMovement.objects.filter(created_at=start).update(quantity=-1000)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.stock_at(self.sc.id, start + timedelta(hours=2)), 110)
+        self.assertEqual(ledger.stock_at(self.sc.id, start + timedelta(hours=5)), 70)
+        listing = ledger.with_stock_at(SupplierCommodity.objects.filter(id=self.sc.id),
+                                       start + timedelta(hours=3)).get()
+        self.assertEqual(listing.stock_at, 70)
+
+    def test_turnover_and_stock_api(self):
+        start = timezone.now()
+        for order in self.place_orders(2, status="pending", quantity=20):
+            fulfilment.accept_order(order)
+        ledger.compact(until=timezone.now())
+        self.client.force_login(self.supplier)
+
+        response = self.client.get(f"/api/v1/listings/{self.sc.id}/stock/")
+        self.assertEqual(response.json()["units"], "60.00")
+        results = self.client.get("/api/v1/listings/turnover/", {"start": start.isoformat()}).json()["results"]
+        self.assertEqual([(row["opening"], row["closing"], row["sold"], row["turns"]) for row in results],
+                         [("100.00", "60.00", "40.00", 0.5)])
+        self.assertEqual(self.client.get("/api/v1/listings/turnover/", {"start": "yesterday"}).status_code, 400)
+
+
+class ConcurrentAcceptTests(TransactionTestCase):
+    THREADS = 16
+
+    def test_stock_never_goes_negative(self):
+        supplier = User.objects.create_user(username="supplier", password="pass", role="supplier")
+        vendor = User.objects.create_user(username="vendor", password="pass", role="vendor")
+        sc = SupplierCommodity.objects.create(
+            supplier=supplier, commodity=ListCommodity.objects.create(name="Rice"),
+            price_per_unit=1, manufactured_company="Acme", available_units=50,
+        )
+        orders = [
+            Order.objects.create(vendor=vendor, supplier_commodity=sc, quantity_requested=7)
+            for _ in range(self.THREADS * 2)
+        ]
+        barrier = threading.Barrier(self.THREADS)
+        accepted = []
+
+        def worker(batch):
+            barrier.wait()
+            try:
+                for order in batch:
+                    for _ in range(20):
+                        try:
+                            if fulfilment.accept_order(order) == fulfilment.ACCEPTED:
+                                accepted.append(order.quantity_requested)
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)  # SQLite lock contention; retry
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(orders[i::self.THREADS],)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sc.refresh_from_db()
+        self.assertGreaterEqual(sc.available_units, 0)
+        self.assertEqual(sc.available_units, 50 - sum(accepted))
+        self.assertEqual(Order.objects.filter(status="accepted").count(), len(accepted))
+        self.assertEqual(len(accepted), 50 // 7)
+
+
+class KeysetPaginationTests(InventoryTestCase):
+    def setUp(self):
+        # Orders come in threes sharing a timestamp, so the id tie-breaker matters
+        orders = self.place_orders(60)
+        for day in range(20):
+            Order.objects.filter(id__in=[o.id for o in orders[day * 3:day * 3 + 3]]).update(
+                ordered_at=timezone.now() - timedelta(days=day)
+            )
+        self.newest_first = list(Order.objects.order_by("-ordered_at", "-id"))
+
+    def walk(self, url, params=None):
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(url, {**(params or {}), **({"after": cursor} if cursor else {})})
+            seen.extend(response.context["orders" if "orders" in response.context else "previous_orders"])
+            cursor = response.context["next_cursor"]
+            if not cursor:
+                return seen, response
+
+    def test_vendor_pages_cover_every_order_once(self):
+        self.client.force_login(self.vendor)
+        seen, _ = self.walk(reverse("order_request"))
+        self.assertEqual(seen, self.newest_first)
+
+    def test_previous_cursor_returns_the_newer_page(self):
+        page = keyset_page(Order.objects.all(), page_size=10)
+        second = keyset_page(Order.objects.all(), after=page.next_cursor, page_size=10)
+        back = keyset_page(Order.objects.all(), before=second.previous_cursor, page_size=10)
+        self.assertEqual(back.items, page.items)
+        self.assertIsNone(back.previous_cursor)
+
+    def test_supplier_history_respects_time_filter(self):
+        self.client.force_login(self.supplier)
+        seen, _ = self.walk(reverse("supplier_orders"), {"time_filter": "week"})
+        cutoff = timezone.now().date() - timedelta(days=7)
+        self.assertEqual(seen, [o for o in self.newest_first if o.ordered_at.date() >= cutoff])
+
+    def test_supplier_pending_orders_are_paged_separately(self):
+        Order.objects.filter(id__in=[o.id for o in self.newest_first[:40]]).update(status="pending")
+        self.client.force_login(self.supplier)
+        url, seen, cursor = reverse("supplier_orders"), [], None
+        while True:
+            response = self.client.get(url, {"time_filter": "week", **({"pending_after": cursor} if cursor else {})})
+            self.assertLessEqual(len(response.context["pending_orders"]), PAGE_SIZE)
+            seen.extend(response.context["pending_orders"])
+            cursor = response.context["pending_next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, self.newest_first[:40])
+        self.assertContains(response, "time_filter=week&amp;pending_before=")
+
+    def test_page_links_move_one_list_and_keep_the_other(self):
+        params = QueryDict("time_filter=week&after=abc&pending_before=xyz")
+        self.assertEqual(page_query(params, pending_after="def", pending_before=None),
+                         "time_filter=week&after=abc&pending_after=def")
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        self.client.force_login(self.vendor)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse("order_request"))
+        with CaptureQueriesContext(connection) as later:
+            self.client.get(reverse("order_request"), {"after": encode_cursor(self.newest_first[30])})
+        self.assertEqual(len(first), len(later))
+        self.assertNotIn("OFFSET", later.captured_queries[-1]["sql"].upper())
+
+    def test_malformed_cursor_starts_from_the_top(self):
+        page = keyset_page(Order.objects.all(), after="not-a-cursor", page_size=5)
+        self.assertEqual(page.items, self.newest_first[:5])
+
+
+class FitManyTests(TestCase):
+    def test_failures_are_isolated_per_commodity(self):
+        def build(name, series, min_orders, backend):
+            if name == "Broken":
+                raise ValueError("bad history")
+            return FAKE_FORECAST
+
+        jobs = {1: ("Rice", EMPTY_SERIES, None), 2: ("Broken", EMPTY_SERIES, None)}
+        with mock.patch("inventory.forecasting.build_forecast", side_effect=build):
+            results = fit_many(jobs, workers=1)
+
+        self.assertEqual(results[1], (FAKE_FORECAST, None))
+        self.assertIsNone(results[2][0])
+        self.assertIn("bad history", results[2][1])
+
+    def test_slow_fit_times_out(self):
+        def build(name, series, min_orders, backend):
+            time.sleep(2)
+            return FAKE_FORECAST
+
+        with mock.patch("inventory.forecasting.build_forecast", side_effect=build):
+            results = fit_many({1: ("Rice", EMPTY_SERIES, None)}, workers=1, timeout=0.1)
+
+        self.assertIsNone(results[1][0])
+        self.assertIn("timed out", results[1][1])
+
+
+class HoltWintersForecasterTests(TestCase):
+    def test_batch_forecast_follows_weekly_pattern(self):
+        weekly = daily_series([10 + i % 7 for i in range(35)])
+        short = daily_series([5] * 6)
+
+        results = fit_many({1: ("Rice", weekly, "holt_winters"), 2: ("Salt", short, "holt_winters")})
+
+        fields, error = results[1]
+        self.assertIsNone(error)
+        self.assertEqual(len(fields["points"]), 7)
+        self.assertEqual(set(fields["points"][0]), {"ds", "yhat", "yhat_lower", "yhat_upper"})
+        self.assertEqual(fields["points"][0]["ds"], "2025-02-05T00:00:00")
+        self.assertEqual([round(p["yhat"]) for p in fields["points"]], [10 + i % 7 for i in range(35, 42)])
+        self.assertEqual(results[2][0]["status"], "ok")
+
+    def test_intervals_bracket_prediction(self):
+        series = daily_series([10 + (i * 7919) % 5 for i in range(30)])
+        fields = build_forecast("Rice", series, backend=HoltWintersForecaster.name)
+
+        for point in fields["points"]:
+            self.assertLessEqual(point["yhat_lower"], point["yhat"])
+            self.assertLessEqual(point["yhat"], point["yhat_upper"])
+
+
+class LazyAnalyticsImportTests(TestCase):
+    def test_url_conf_does_not_load_analytics_stack(self):
+        probe = (
+            "import sys, vsm.wsgi; from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print(','.join(m for m in ('pandas', 'matplotlib', 'prophet') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", probe], cwd=settings.BASE_DIR, env=os.environ.copy(),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        self.assertEqual(output, "")
+
+
+class SupplierRatingSummaryTests(InventoryTestCase):
+    def rate(self, order, stars):
+        self.client.force_login(self.vendor)
+        return self.client.post(reverse("rate_order", args=[order.id]), {"rating": stars})
+
+    def test_rating_an_order_updates_the_summary(self):
+        first, second, third = self.place_orders(3)
+        self.rate(first, 5)
+        self.rate(second, 4)
+        self.rate(third, 4)
+
+        summary = SupplierRatingSummary.objects.get(supplier=self.supplier)
+        self.assertEqual((summary.rating_count, summary.rating_sum), (3, 13))
+        self.assertAlmostEqual(summary.average_rating, 13 / 3)
+        self.assertEqual(summary.histogram, [(5, 1), (4, 2), (3, 0), (2, 0), (1, 0)])
+
+    def test_invalid_rating_leaves_summary_untouched(self):
+        order, = self.place_orders(1)
+        self.rate(order, 9)
+        self.assertFalse(SupplierRatingSummary.objects.exists())
+
+    def test_rebuild_matches_incremental_updates(self):
+        orders = self.place_orders(4)
+        for order, stars in zip(orders, [1, 3, 3, 5]):
+            self.rate(order, stars)
+        incremental = SupplierRatingSummary.objects.values().get(supplier=self.supplier)
+
+        SupplierRatingSummary.objects.all().delete()
+        self.assertEqual(rebuild_rating_summaries(), 1)
+        self.assertEqual(SupplierRatingSummary.objects.values().get(supplier=self.supplier), incremental)
+
+        Rating.objects.all().delete()
+        self.assertEqual(rebuild_rating_summaries(self.supplier.id), 0)
+        self.assertFalse(SupplierRatingSummary.objects.exists())
+
+    def test_marketplace_reads_ratings_from_summary(self):
+        order, = self.place_orders(1)
+        self.rate(order, 4)
+        response = self.client.get(reverse("vendor_dashboard"))
+        item, = response.context["supplier_commodities"]
+        self.assertEqual((item.supplier_avg_rating, item.supplier_rating_count), (4.0, 1))
+
+        SupplierRatingSummary.objects.all().delete()
+        item, = self.client.get(reverse("vendor_dashboard")).context["supplier_commodities"]
+        self.assertEqual((item.supplier_avg_rating, item.supplier_rating_count), (None, 0))
+
+
+class UnitConversionTests(InventoryTestCase):
+    def test_conversions_stay_within_a_dimension(self):
+        self.assertEqual(units.convert(2, "t", "kg"), 2000)
+        self.assertEqual(units.convert(12, "in", "ft"), 1)
+        self.assertEqual(units.convert(250, "ml", "l"), Decimal("0.25"))
+        with self.assertRaises(ValueError):
+            units.convert(1, "kg", "l")
+        self.assertEqual(units.normalized_price(Decimal("2500"), "q"), 25)
+
+    def test_marketplace_filters_and_sorts_by_price_per_base_unit(self):
+        listings = {
+            unit: SupplierCommodity.objects.create(
+                supplier=self.supplier, commodity=self.rice, unit=unit, price_per_unit=price,
+                manufactured_company="Acme", available_units=5,
+            )
+            for unit, price in [("g", "0.02"), ("q", "1500"), ("t", "9000"), ("l", "1")]
+        }
+        self.assertEqual((listings["g"].base_unit, listings["g"].normalized_price), ("kg", 20))
+        # Bulk imports keep the columns current too
+        bulk_inventory.import_inventory(self.supplier, [(2, {
+            "id": str(listings["t"].id), "commodity": "Rice", "unit": "t", "price_per_unit": "30000",
+            "manufactured_company": "Acme", "available_units": "5",
+        })])
+
+        self.client.force_login(self.vendor)
+        page = self.client.get(reverse("vendor_dashboard"), {"sort": "price", "base_unit": "kg"}).context
+        self.assertEqual([item.id for item in page["supplier_commodities"]],
+                         [self.sc.id, listings["q"].id, listings["g"].id, listings["t"].id])
+        self.assertIn("base_unit=kg", page["filter_query"])
+        page = self.client.get(reverse("vendor_dashboard"), {"base_unit": "kg", "max_price": "14.99"}).context
+        self.assertEqual({item.id for item in page["supplier_commodities"]}, {self.sc.id})
+        # A zero limit is kept for the next pages; unusable ones are ignored rather than failing
+        page = self.client.get(reverse("vendor_dashboard"), {"max_price": "0"}).context
+        self.assertIn("max_price=0", page["filter_query"])
+        for value in ("NaN", "Infinity", "sNaN", "-5"):
+            response = self.client.get(reverse("vendor_dashboard"), {"max_price": value})
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.context["max_price"])
+
+        self.client.force_login(self.supplier)
+        results = self.client.get("/api/v1/listings/", {"base_unit": "kg", "sort": "price"}).json()["results"]
+        self.assertEqual([row["normalized_price"] for row in results],
+                         ["10.000000", "15.000000", "20.000000", "30.000000"])
+
+
+class SupplierRankingTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rival = User.objects.create_user(username="rival", password="pass", role="supplier")
+        self.rival_sc = SupplierCommodity.objects.create(
+            supplier=self.rival, commodity=self.rice, unit="q", price_per_unit=800,
+            manufactured_company="Rival", available_units=3,
+        )
+
+    def rate(self, sc, stars):
+        order = self.place_orders(1, sc=sc)[0]
+        Rating.objects.create(order=order, vendor=self.vendor, supplier=sc.supplier, rating=stars)
+        rebuild_rating_summaries(sc.supplier_id)
+
+    def age(self, hours=2):
+        """Make everything so far look older than the last refresh."""
+        past = timezone.now() - timedelta(hours=hours)
+        SupplierScore.objects.update(computed_at=past + timedelta(hours=1))
+        SupplierCommodity.objects.update(updated_at=past)
+        Order.objects.update(updated_at=past)
+        Rating.objects.update(created_at=past)
+
+    def test_scores_combine_price_stock_rating_and_fulfilment(self):
+        self.place_orders(3, sc=self.sc)
+        self.place_orders(1, status="rejected", sc=self.sc)
+        for _ in range(5):
+            self.rate(self.rival_sc, 5)
+        self.assertEqual(ranking.refresh_scores(), 1)
+
+        ours, theirs = self.sc.score, self.rival_sc.score
+        # 8 per kg beats 10 per kg, 100 units beat 3
+        self.assertAlmostEqual(ours.price_score, 0.8)
+        self.assertEqual(theirs.price_score, 1)
+        self.assertEqual(ours.stock_score, 1)
+        self.assertLess(theirs.stock_score, 0.5)
+        self.assertEqual(ours.fulfilment_rate, 0.75)
+        self.assertEqual(theirs.fulfilment_rate, 1)
+        # Five ratings weigh as much as the neutral prior
+        self.assertAlmostEqual(theirs.rating_score, 0.8)
+        self.assertAlmostEqual(ours.rating_score, 0.6)
+        weights = ranking.get_weights()
+        self.assertAlmostEqual(theirs.score, sum(
+            weights[name] * getattr(theirs, f"{name}_score") for name in ranking.COMPONENTS
+        ))
+        self.assertEqual([score.supplier_commodity_id for score in ranking.top_suppliers(self.rice.id)],
+                         [self.rival_sc.id, self.sc.id])
+
+    def test_refresh_only_recomputes_changed_commodities(self):
+        wheat = ListCommodity.objects.create(name="Wheat")
+        wheat_sc = SupplierCommodity.objects.create(
+            supplier=self.supplier, commodity=wheat, unit="kg", price_per_unit=4,
+            manufactured_company="Acme", available_units=10,
+        )
+        lentils = ListCommodity.objects.create(name="Lentils")
+        SupplierCommodity.objects.create(
+            supplier=self.rival, commodity=lentils, unit="kg", price_per_unit=9,
+            manufactured_company="Rival", available_units=10,
+        )
+        self.assertEqual(ranking.refresh_scores(), 3)
+        self.age()
+        self.assertEqual(ranking.refresh_scores(), 0)
+
+        # A decided order moves its supplier in every commodity it sells
+        order = self.place_orders(1, status="pending", sc=wheat_sc)[0]
+        self.assertEqual(ranking.refresh_scores(), 0)
+        fulfilment.reject_order(order)
+        self.assertEqual(ranking.changed_commodities(timezone.now() - timedelta(minutes=30)), {self.rice.id, wheat.id})
+        ranking.refresh_scores()
+        self.assertEqual(SupplierScore.objects.get(supplier_commodity=wheat_sc).fulfilment_rate, 0)
+
+        # Sold out listings drop out of the ranking
+        self.age()
+        SupplierCommodity.objects.filter(pk=self.rival_sc.pk).update(available_units=0, updated_at=timezone.now())
+        self.assertEqual(ranking.refresh_scores(), 1)
+        self.assertFalse(SupplierScore.objects.filter(supplier_commodity=self.rival_sc).exists())
+        self.assertEqual(SupplierScore.objects.count(), 3)
+
+    def test_top_suppliers_endpoint(self):
+        ranking.refresh_scores()
+        self.client.force_login(self.vendor)
+        url = f"/api/v1/commodities/{self.rice.id}/top-suppliers/"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"k": 1})
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        # Neither supplier has a record yet, so stock outweighs the rival's lower price
+        self.assertEqual([row["supplier_commodity"] for row in body["results"]], [self.sc.id])
+        self.assertEqual(body["results"][0]["normalized_price"], "10.000000")
+        # Session and user, then the commodity and one read of its ranking
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual(self.client.get(url, {"k": 500}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/commodities/999999/top-suppliers/").status_code, 404)
+
+        page = self.client.get(reverse("vendor_dashboard"), {"sort": "score"}).context
+        self.assertEqual([item.id for item in page["supplier_commodities"]], [self.sc.id, self.rival_sc.id])
+
+
+@override_settings(REPLENISHMENT_WINDOW_DAYS=4, REPLENISHMENT_LEAD_TIME_DAYS=2, REPLENISHMENT_REVIEW_DAYS=3,
+                   REPLENISHMENT_SERVICE_LEVEL=0.5)
+class ReplenishmentTests(InventoryTestCase):
+    today = date(2025, 3, 10)
+
+    def series(self, *days):
+        return DemandSeries.from_days([self.today - timedelta(days=ago) for ago, _ in days], [y for _, y in days])
+
+    def test_plans_from_demand_rate_and_variance(self):
+        rows = [
+            (1, 7, Decimal("3"), self.today - timedelta(days=30)),
+            (2, 7, Decimal("50"), None),
+            (3, 7, Decimal("0"), self.today - timedelta(days=30)),
+            (4, 7, Decimal("20"), self.today - timedelta(days=1)),
+        ]
+        # Four days of 0, 2, 0, 6 units; the order before the window is ignored
+        demand = {1: self.series((9, 100), (3, 2), (1, 6)), 3: self.series((0, 1)), 4: self.series((1, 6))}
+        plans = {plan.supplier_commodity_id: plan for plan in replenishment.build_plans(rows, demand, self.today)}
+
+        plan = plans[1]
+        self.assertEqual((plan.daily_demand, plan.demand_std), (2, 6 ** 0.5))
+        # A 50% service level needs no safety stock: reorder at two days of demand
+        self.assertEqual((plan.safety_stock, plan.reorder_point), (0, 4))
+        self.assertEqual((plan.status, plan.suggested_quantity), ("reorder", 7))
+        self.assertEqual((plan.days_of_cover, plan.stockout_date), (1.5, date(2025, 3, 11)))
+        self.assertEqual((plans[2].status, plans[2].days_of_cover), ("no_demand", None))
+        self.assertEqual((plans[3].status, plans[3].days_of_cover), ("stockout", 0))
+        # First ordered yesterday: two days observed, not four
+        self.assertEqual((plans[4].status, plans[4].daily_demand), ("ok", 3))
+
+        with self.settings(REPLENISHMENT_SERVICE_LEVEL=0.95):
+            plan = replenishment.build_plans(rows, demand, self.today)[0]
+        self.assertEqual(plan.safety_stock, Decimal("5.70"))  # 1.645 * sqrt(6) * sqrt(2)
+
+    def test_slow_movers_with_deep_stock_have_no_stockout_date(self):
+        # One unit in the window against 100,000 in stock: hundreds of thousands of days of cover
+        rows = [(1, 7, Decimal("100000"), self.today - timedelta(days=30))]
+        plan, = replenishment.build_plans(rows, {1: self.series((2, 1))}, self.today)
+        self.assertEqual((plan.status, plan.days_of_cover, plan.stockout_date), ("ok", 400000, None))
+
+    def test_dashboard_alerts_come_from_stored_plans(self):
+        self.place_orders(4, quantity=10)
+        SupplierCommodity.objects.filter(pk=self.sc.pk).update(available_units=15)
+        self.assertEqual(replenishment.refresh_plans(), 1)
+        plan = ReplenishmentPlan.objects.get(supplier_commodity=self.sc)
+        # 40 units accepted today, the only day observed
+        self.assertEqual((plan.daily_demand, plan.status, plan.stock), (40, "reorder", 15))
+
+        self.client.force_login(self.supplier)
+        alerts = self.client.get(reverse("supplier_dashboard")).context["restock_alerts"]
+        self.assertEqual([alert.supplier_commodity_id for alert in alerts], [self.sc.id])
+        self.assertContains(self.client.get(reverse("supplier_dashboard")), "Restock Soon")
+
+        SupplierCommodity.objects.filter(pk=self.sc.pk).update(available_units=1000)
+        replenishment.refresh_plans(supplier_id=self.supplier.id)
+        self.assertEqual(ReplenishmentPlan.objects.get(supplier_commodity=self.sc).status, "ok")
+        self.assertFalse(self.client.get(reverse("supplier_dashboard")).context["restock_alerts"])
+
+
+class ListingSearchTests(InventoryTestCase):
+    def add_listing(self, name, supplier=None, units=50):
+        return SupplierCommodity.objects.create(
+            supplier=supplier or self.supplier, commodity=ListCommodity.objects.create(name=name),
+            unit="kg", price_per_unit=5, manufactured_company="Acme", available_units=units,
+        )
+
+    def test_search_document_follows_related_rows(self):
+        self.assertEqual(SupplierCommodity.objects.get(id=self.sc.id).search_document, "rice supplier")
+
+        self.rice.name = "Basmati Rice"
+        self.rice.save()
+        self.supplier.address = "12 Market Road, Pune"
+        self.supplier.save()
+        self.assertEqual(
+            SupplierCommodity.objects.get(id=self.sc.id).search_document,
+            "basmati rice supplier 12 market road pune",
+        )
+
+    def test_inverted_index_matches_prefixes_of_every_term(self):
+        index = InvertedIndex([(1, "basmati rice pune"), (2, "rice bran delhi"), (3, "ricotta pune")])
+        self.assertCountEqual([doc_id for doc_id, _ in index.search(["ric", "pune"])], [1, 3])
+        # A whole-word match ranks above a match inside a longer word
+        self.assertEqual([doc_id for doc_id, _ in index.search(["rice"])], [1, 2])
+        self.assertEqual(index.search(["rice", "mumbai"]), [])
+
+    def test_search_keeps_queryset_filters_and_ranks_results(self):
+        self.add_listing("Rice Bran")
+        self.add_listing("Rice Flour", units=0)
+        self.add_listing("Wheat")
+        results = search_listings(SupplierCommodity.objects.filter(available_units__gt=0), "rice")
+        self.assertEqual([listing.commodity.name for listing in results[0:10]], ["Rice", "Rice Bran"])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_marketplace_search_is_paginated(self):
+        for i in range(25):
+            self.add_listing(f"Sugar {i}")
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse("vendor_dashboard"), {"search": "sug", "page": 2})
+        page = response.context["supplier_commodities"]
+        self.assertEqual((page.paginator.count, len(page.object_list)), (25, 5))
+
+
+class DashboardCacheTests(InventoryTestCase):
+    def test_workers_warn_when_their_invalidations_stay_in_process(self):
+        stderr = io.StringIO()
+        with mock.patch("inventory.management.commands.expire_stock_holds.time.sleep", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("expire_stock_holds", loop=True, stdout=io.StringIO(), stderr=stderr)
+        self.assertIn("Set REDIS_URL", stderr.getvalue())
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}):
+            self.assertIsNone(unshared_cache_warning())
+
+    def test_repeat_dashboard_loads_skip_the_database(self):
+        orders = self.place_orders(DASHBOARD_PENDING_LIMIT + 2, status="pending")
+        self.client.force_login(self.supplier)
+        self.client.get(reverse("supplier_dashboard"))
+        # Only the authenticated user is loaded; the page itself, pending orders included, comes from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("supplier_dashboard"))
+        self.assertEqual([item.id for item in response.context["inventory"]], [self.sc.id])
+        newest = sorted(orders, key=lambda order: (order.ordered_at, order.id), reverse=True)
+        self.assertEqual(response.context["pending_orders"], newest[:DASHBOARD_PENDING_LIMIT])
+        self.assertTrue(response.context["more_pending_orders"])
+
+        fulfilment.bulk_accept_orders(self.supplier, [order.id for order in orders])
+        response = self.client.get(reverse("supplier_dashboard"))
+        self.assertEqual(response.context["pending_orders"], [])
+
+    def test_listing_change_invalidates_supplier_and_marketplace(self):
+        self.client.force_login(self.vendor)
+        self.client.get(reverse("vendor_dashboard"))
+        self.sc.price_per_unit = 12
+        self.sc.save()
+        item, = self.client.get(reverse("vendor_dashboard")).context["supplier_commodities"]
+        self.assertEqual(item.price_per_unit, 12)
+
+    def test_accepting_an_order_refreshes_cached_stock(self):
+        order, = self.place_orders(1, status="pending", quantity=30)
+        self.client.force_login(self.vendor)
+        self.client.get(reverse("vendor_dashboard"))
+        self.client.get(reverse("order_request"))
+
+        fulfilment.bulk_accept_orders(self.supplier, [order.id])
+        item, = self.client.get(reverse("vendor_dashboard")).context["supplier_commodities"]
+        self.assertEqual(item.available_units, 70)
+        self.assertEqual(self.client.get(reverse("order_request")).context["orders"][0].status, "accepted")
+
+    def test_cache_is_per_supplier(self):
+        other = User.objects.create_user(username="other", password="pass", role="supplier")
+        self.client.force_login(self.supplier)
+        self.client.get(reverse("supplier_dashboard"))
+        self.client.force_login(other)
+        self.assertEqual(list(self.client.get(reverse("supplier_dashboard")).context["inventory"]), [])
+
+
+class BulkInventoryTests(InventoryTestCase):
+    def upload(self, content, name="inventory.csv"):
+        self.client.force_login(self.supplier)
+        return self.client.post(
+            reverse("bulk_import_inventory"), {"file": SimpleUploadedFile(name, content.encode())}, follow=True
+        )
+
+    def csv_rows(self, count, commodity="rice"):
+        lines = ["commodity,unit,price_per_unit,manufactured_company,available_units"]
+        lines += [f"{commodity},kg,{10 + i}.50,Maker {i},{i}" for i in range(count)]
+        return "\n".join(lines) + "\n"
+
+    def test_csv_upload_creates_updates_and_reports_bad_rows(self):
+        other = SupplierCommodity.objects.create(
+            supplier=User.objects.create_user(username="other", password="pass", role="supplier"),
+            commodity=self.rice, unit="kg", price_per_unit=1, manufactured_company="X", available_units=1,
+        )
+        response = self.upload(
+            "id,commodity,unit,price_per_unit,manufactured_company,available_units\n"
+            f"{self.sc.id},Rice,kg,11.00,Acme,80\n"
+            ",RICE,q,2500,Farm Co,4\n"
+            ",Gold,kg,1,Mine,1\n"
+            ",Rice,barrel,1,Acme,1\n"
+            ",Rice,kg,-3,Acme,1\n"
+            f"{other.id},Rice,kg,1,Acme,1\n"
+        )
+        self.sc.refresh_from_db()
+        self.assertEqual((self.sc.price_per_unit, self.sc.available_units), (11, 80))
+        added = SupplierCommodity.objects.get(supplier=self.supplier, unit="q")
+        self.assertEqual((added.commodity, added.search_document), (self.rice, "rice supplier"))
+        self.assertEqual(SupplierCommodity.objects.get(id=other.id).manufactured_company, "X")
+
+        text = [str(message) for message in response.context["messages"]]
+        self.assertIn("Import finished: 1 added, 1 updated.", text)
+        self.assertTrue(any(
+            "4 row(s) skipped" in message and "line 4: unknown commodity 'Gold'" in message
+            and f"line 7: no listing {other.id} in your inventory" in message
+            for message in text
+        ))
+
+    def test_names_differing_only_in_case_need_an_exact_match(self):
+        lower = ListCommodity.objects.create(name="rice")
+        self.upload(
+            "commodity,unit,price_per_unit,manufactured_company,available_units\n"
+            "rice,kg,1,Lower,1\n"
+            "Rice,kg,1,Upper,1\n"
+        )
+        self.assertEqual(SupplierCommodity.objects.get(manufactured_company="Lower").commodity, lower)
+        self.assertEqual(SupplierCommodity.objects.get(manufactured_company="Upper").commodity, self.rice)
+        result = bulk_inventory.import_inventory(self.supplier, [(2, {
+            "commodity": "RICE", "unit": "kg", "price_per_unit": "1", "manufactured_company": "X",
+            "available_units": "1",
+        })])
+        self.assertEqual(result.errors, [(2, "commodity 'RICE' matches 2 commodities that differ only in case")])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        rows = lambda count: bulk_inventory.read_rows(io.BytesIO(self.csv_rows(count).encode()), "csv")
+        with CaptureQueriesContext(connection) as small:
+            bulk_inventory.import_inventory(self.supplier, rows(10), batch_size=500)
+        # As many rows as one insert takes (SQLite caps parameters per statement, splitting bigger inserts)
+        fields = [field for field in SupplierCommodity._meta.concrete_fields if not field.primary_key]
+        count = connection.ops.bulk_batch_size(fields, [None] * 100)
+        with CaptureQueriesContext(connection) as large:
+            result = bulk_inventory.import_inventory(self.supplier, rows(count), batch_size=500)
+        self.assertEqual(result.created, count)
+        self.assertEqual(len(small), len(large))
+
+        result = bulk_inventory.import_inventory(self.supplier, rows(45), batch_size=20)
+        self.assertEqual((result.created, result.error_count), (45, 0))
+
+    def test_export_streams_rows_that_import_back_unchanged(self):
+        self.upload(self.csv_rows(3))
+        for fmt in bulk_inventory.FORMATS:
+            response = self.client.get(reverse("export_inventory"), {"format": fmt})
+            self.assertTrue(response.streaming)
+            content = b"".join(response.streaming_content).decode()
+            before = list(SupplierCommodity.objects.order_by("id").values())
+
+            result = bulk_inventory.import_inventory(
+                self.supplier, bulk_inventory.read_rows(io.BytesIO(content.encode()), fmt)
+            )
+            self.assertEqual((result.created, result.updated, result.error_count), (0, 4, 0))
+            self.assertEqual(list(SupplierCommodity.objects.order_by("id").values()), before)
+
+    def test_management_command_imports_jsonl(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "stock.jsonl")
+        with open(path, "w") as f:
+            f.write('{"commodity": "Rice", "unit": "t", "price_per_unit": "900", '
+                    '"manufactured_company": "Mill", "available_units": "3"}\n\nnot json\n')
+        out = io.StringIO()
+        call_command("import_inventory", "supplier", path, stdout=out, stderr=io.StringIO())
+        self.assertEqual(out.getvalue().strip(), "Added 1, updated 0, skipped 1.")
+        self.assertTrue(SupplierCommodity.objects.filter(supplier=self.supplier, unit="t").exists())
+
+
+class CartOrderTests(InventoryTestCase):
+    def post_json(self, lines):
+        self.client.force_login(self.vendor)
+        return self.client.post(reverse("place_cart_order"), {"lines": lines}, content_type="application/json")
+
+    def test_json_cart_returns_a_result_per_line(self):
+        wheat = SupplierCommodity.objects.create(
+            supplier=self.supplier, commodity=ListCommodity.objects.create(name="Wheat"),
+            unit="kg", price_per_unit=5, manufactured_company="Acme", available_units=10,
+        )
+        response = self.post_json([
+            {"commodity_id": self.sc.id, "quantity": 60},
+            {"commodity_id": self.sc.id, "quantity": 60},   # 40 left after the first line
+            {"commodity_id": wheat.id, "quantity": 10},
+            {"commodity_id": 9999, "quantity": 1},
+            {"commodity_id": wheat.id, "quantity": "lots"},
+        ])
+        results = response.json()["results"]
+        self.assertEqual([line["status"] for line in results], [
+            cart.PLACED, cart.INSUFFICIENT_STOCK, cart.PLACED, cart.UNKNOWN_ITEM, cart.INVALID_QUANTITY,
+        ])
+        orders = Order.objects.filter(vendor=self.vendor, status="pending")
+        self.assertEqual(
+            sorted(orders.values_list("id", "quantity_requested")),
+            [(results[0]["order_id"], 60), (results[2]["order_id"], 10)],
+        )
+
+    def test_fractional_and_boolean_quantities_are_rejected(self):
+        response = self.post_json([
+            {"commodity_id": self.sc.id, "quantity": 2.5},
+            {"commodity_id": self.sc.id, "quantity": 0.9},
+            {"commodity_id": self.sc.id, "quantity": True},
+            {"commodity_id": self.sc.id, "quantity": " 3 "},
+        ])
+        self.assertEqual([line["status"] for line in response.json()["results"]], [
+            cart.INVALID_QUANTITY, cart.INVALID_QUANTITY, cart.INVALID_QUANTITY, cart.PLACED,
+        ])
+        self.assertEqual(Order.objects.get(vendor=self.vendor).quantity_requested, 3)
+
+    def test_cart_uses_one_stock_query_and_one_insert(self):
+        listings = [
+            SupplierCommodity.objects.create(
+                supplier=self.supplier, commodity=ListCommodity.objects.create(name=f"Item {i}"),
+                unit="kg", price_per_unit=5, manufactured_company="Acme", available_units=10,
+            )
+            for i in range(30)
+        ]
+        with self.assertNumQueries(5):  # savepoint, stock, insert, holds, release
+            results = cart.place_cart(self.vendor, [(listing.id, 2) for listing in listings])
+        self.assertTrue(all(line.status == cart.PLACED for line in results))
+
+    def test_dashboard_cart_form_and_bad_json(self):
+        self.client.force_login(self.vendor)
+        response = self.client.post(
+            reverse("place_cart_order"), {f"cart_{self.sc.id}": "5", "cart_77": "", "other": "x"}, follow=True
+        )
+        self.assertIn("1 order(s) placed successfully.", [str(m) for m in response.context["messages"]])
+        self.assertEqual(Order.objects.get(vendor=self.vendor).quantity_requested, 5)
+
+        self.assertEqual(self.post_json("not a list").status_code, 400)
+        self.assertEqual(self.post_json([{"commodity_id": self.sc.id, "quantity": 1}] * 501).status_code, 400)
+
+
+class JsonApiTests(InventoryTestCase):
+    def api(self, user=None):
+        self.client.force_login(user or self.vendor)
+        return self.client
+
+    def test_jwt_token_authenticates(self):
+        token = self.client.post("/api/v1/token/", {"username": "vendor", "password": "pass"}).json()["access"]
+        response = self.client.get("/api/v1/listings/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual([item["commodity_name"] for item in response.json()["results"]], ["Rice"])
+        self.assertEqual(self.client.get("/api/v1/listings/").status_code, 401)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        orders = self.place_orders(5, status="pending")
+        client = self.api()
+        seen, url = [], "/api/v1/orders/?page_size=2&fields=id,status"
+        while url:
+            page = client.get(url).json()
+            seen += page["results"]
+            url = page["next"]
+        self.assertEqual(seen, [{"id": order.id, "status": "pending"} for order in reversed(orders)])
+
+    def test_conditional_get_skips_the_work_until_data_changes(self):
+        client = self.api()
+        first = client.get("/api/v1/listings/")
+        with self.assertNumQueries(1):  # the authenticated user only
+            cached = client.get("/api/v1/listings/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        self.sc.price_per_unit = 11
+        self.sc.save()
+        changed = client.get("/api/v1/listings/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_vendor_orders_and_supplier_accepts(self):
+        client = self.api()
+        response = client.post("/api/v1/orders/", {"supplier_commodity": self.sc.id, "quantity_requested": 500})
+        self.assertEqual(response.status_code, 400)
+        order_id = client.post("/api/v1/orders/", {"supplier_commodity": self.sc.id, "quantity_requested": 40}).json()["id"]
+        self.assertEqual(client.post(f"/api/v1/orders/{order_id}/accept/").status_code, 403)
+
+        client = self.api(self.supplier)
+        self.assertEqual(client.post(f"/api/v1/orders/{order_id}/accept/").json(), {"id": order_id, "status": "accepted"})
+        self.assertEqual(client.post(f"/api/v1/orders/{order_id}/accept/").status_code, 409)
+        self.assertEqual(client.get(f"/api/v1/listings/{self.sc.id}/").json()["available_units"], "60.00")
+
+    def test_ratings_and_forecasts_respect_roles(self):
+        order, = self.place_orders(1)
+        client = self.api()
+        self.assertEqual(client.post("/api/v1/ratings/", {"order": order.id, "rating": 4}).status_code, 201)
+        self.assertEqual(client.post("/api/v1/ratings/", {"order": order.id, "rating": 5}).status_code, 400)
+        self.assertEqual(SupplierRatingSummary.objects.get(supplier=self.supplier).rating_count, 1)
+        self.assertEqual(client.get("/api/v1/forecasts/").status_code, 403)
+
+        ForecastResult.objects.create(supplier_commodity=self.sc, **FAKE_FORECAST)
+        client = self.api(self.supplier)
+        self.assertEqual(client.get("/api/v1/ratings/").json()["results"][0]["rating"], 4)
+        forecast = client.get(f"/api/v1/forecasts/{self.sc.id}/?fields=status,insight").json()
+        self.assertEqual(forecast, {"status": "ok", "insight": "Demand is stable."})
+
+    def test_forecast_pages_follow_the_next_link(self):
+        listings = [self.sc] + [
+            SupplierCommodity.objects.create(
+                supplier=self.supplier, commodity=self.rice, unit="kg", price_per_unit=10,
+                manufactured_company=f"Maker {i}", available_units=1,
+            )
+            for i in range(2)
+        ]
+        for sc in listings:
+            ForecastResult.objects.create(supplier_commodity=sc, **FAKE_FORECAST)
+        client = self.api(self.supplier)
+        seen, url = [], "/api/v1/forecasts/?page_size=1&fields=supplier_commodity"
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [item["supplier_commodity"] for item in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(seen, [sc.id for sc in listings])
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(InventoryTestCase):
+    def feed(self, url, user):
+        self.client.force_login(user)
+        return self.client.get(url).json()
+
+    def test_pages_through_changes_then_returns_only_new_ones(self):
+        orders = self.place_orders(3, status="pending")
+        first = self.feed("/api/v1/orders/changes/?limit=2", self.supplier)
+        self.assertEqual([item["id"] for item in first["results"]], [orders[0].id, orders[1].id])
+        self.assertTrue(first["has_more"])
+        second = self.feed(f"/api/v1/orders/changes/?since={first['cursor']}", self.supplier)
+        self.assertEqual([item["id"] for item in second["results"]], [orders[2].id])
+        self.assertFalse(second["has_more"])
+
+        idle = self.feed(f"/api/v1/orders/changes/?since={second['cursor']}", self.supplier)
+        self.assertEqual((idle["results"], idle["deleted"], idle["cursor"]), ([], [], second["cursor"]))
+
+        fulfilment.accept_order(orders[0])
+        changed = self.feed(f"/api/v1/orders/changes/?since={second['cursor']}", self.vendor)
+        self.assertEqual([(item["id"], item["status"]) for item in changed["results"]], [(orders[0].id, "accepted")])
+        listings = self.feed("/api/v1/listings/changes/", self.vendor)
+        self.assertEqual([item["available_units"] for item in listings["results"]], ["98.00"])
+
+    def test_deletes_are_reported_as_tombstones(self):
+        order, = self.place_orders(1, status="pending")
+        cursor = self.feed("/api/v1/listings/changes/", self.supplier)["cursor"]
+        self.client.get(reverse("delete_commodity", args=[self.sc.id]))
+
+        listings = self.feed(f"/api/v1/listings/changes/?since={cursor}", self.supplier)
+        self.assertEqual((listings["results"], listings["deleted"]), ([], [self.sc.id]))
+        self.assertEqual(self.feed("/api/v1/orders/changes/", self.vendor)["deleted"], [order.id])
+        other_vendor = User.objects.create_user(username="other-vendor", password="pass", role="vendor")
+        self.assertEqual(self.feed("/api/v1/orders/changes/", other_vendor)["deleted"], [])
+
+    def test_rejects_malformed_cursor(self):
+        self.client.force_login(self.vendor)
+        self.assertEqual(self.client.get("/api/v1/orders/changes/?since=nonsense").status_code, 400)
+
+
+@override_settings(ORDER_EVENTS_POLL_SECONDS=0.01, ORDER_EVENTS_LONG_POLL_SECONDS=0.5)
+class OrderEventTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.supplier)
+        self.async_client.cookies = self.client.cookies
+
+    async def place_order_soon(self):
+        await asyncio.sleep(0.05)
+        return await sync_to_async(self.place_orders)(1, status="pending")
+
+    async def test_stream_catches_up_from_last_event_id_then_pushes_new_orders(self):
+        earlier, = await sync_to_async(self.place_orders)(1, status="pending")
+        stream = events.stream_orders(self.supplier.id, last_id=0)
+        try:
+            self.assertEqual(await anext(stream), "retry: 5000\n\n")
+            self.assertIn(f"id: {earlier.id}\nevent: order\n", await anext(stream))
+            (later,), chunk = await asyncio.gather(self.place_order_soon(), asyncio.wait_for(anext(stream), 2))
+            self.assertTrue(chunk.startswith(f"id: {later.id}\n"))
+            self.assertIn('"commodity": "Rice"', chunk)
+        finally:
+            await stream.aclose()
+        self.assertEqual(events.get_hub().connection_count, 0)
+
+    async def test_long_poll_waits_for_the_next_order(self):
+        url = reverse("supplier_order_poll")
+        (order,), response = await asyncio.gather(self.place_order_soon(), self.async_client.get(url, {"after": 0}))
+        self.assertEqual([event["id"] for event in response.json()["orders"]], [order.id])
+        response = await self.async_client.get(url, {"after": order.id})
+        self.assertEqual(response.json(), {"orders": [], "last_id": order.id})
+
+    async def test_only_suppliers_can_subscribe(self):
+        await sync_to_async(self.client.force_login)(self.vendor)
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse("supplier_order_events"))
+        self.assertEqual(response.status_code, 403)
+
+
+class PerformanceMetricsTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.staff = User.objects.create_user(username="ops", password="pass", role="supplier", is_staff=True)
+
+    def test_records_per_view_timings_for_metrics(self):
+        self.client.force_login(self.supplier)
+        self.client.get(reverse("supplier_dashboard"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        self.client.force_login(self.staff)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('vsm_view_duration_seconds_count{view="supplier_dashboard"} 1', body)
+        self.assertIn('vsm_view_queries_bucket{view="supplier_dashboard",le="+Inf"} 1', body)
+        template_sum = float(body.split('vsm_view_template_seconds_sum{view="supplier_dashboard"} ')[1].split()[0])
+        self.assertGreater(template_sum, 0)
+        self.assertIn('vsm_view_responses_total{view="supplier_dashboard",status="2xx"} 1', body)
+        self.assertIn('vsm_view_recent_duration_seconds{view="supplier_dashboard",quantile="0.95"}', body)
+
+    def test_counts_repeated_queries(self):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            for _ in range(3):
+                list(SupplierCommodity.objects.filter(id=self.sc.id))
+        finally:
+            current_stats.reset(token)
+        self.assertEqual((stats.query_count, stats.duplicate_count), (3, 2))
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_scrapers_authenticate_with_the_token(self):
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    def test_profile_header_is_for_staff_only(self):
+        self.client.force_login(self.supplier)
+        response = self.client.get(reverse("supplier_dashboard"), HTTP_X_PROFILE="cprofile")
+        self.assertContains(response, "Inventory")
+        self.assertNotIn("X-Profiled-Status", response)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("supplier_dashboard"), HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response["X-Profiled-Status"], "200")
+        self.assertContains(response, "function calls")
+
+    async def test_profiles_under_asgi(self):
+        # The async client runs the middleware in async mode, as uvicorn does
+        await sync_to_async(self.async_client.force_login)(self.supplier)
+        response = await self.async_client.get(reverse("supplier_dashboard"), headers={"X-Profile": "cprofile"})
+        self.assertNotIn("X-Profiled-Status", response)
+
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        response = await self.async_client.get(reverse("supplier_dashboard"), headers={"X-Profile": "cprofile"})
+        self.assertEqual(response["X-Profiled-Status"], "200")
+        # The sync view ran in a worker thread and is still in the profile
+        self.assertContains(response, "(supplier_dashboard)")
+
+    async def test_async_middleware_checks_staff_on_a_lazy_user(self):
+        def view(request):
+            return HttpResponse("page")
+
+        async def get_response(request):
+            # What the handler does once the URL resolves
+            return await middleware.process_view(request, view, (), {}) or view(request)
+
+        middleware = PerformanceMiddleware(get_response)
+        self.assertTrue(middleware.async_mode)
+        for user, profiled in [(self.supplier, False), (self.staff, True)]:
+            # Only AuthenticationMiddleware's lazy user, no auser() (added in Django 5.0)
+            request = RequestFactory().get("/", headers={"X-Profile": "cprofile"})
+            request.user = SimpleLazyObject(lambda user=user: User.objects.get(pk=user.pk))
+            response = await middleware(request)
+            self.assertEqual("X-Profiled-Status" in response, profiled)
+            self.assertEqual(b"function calls" in response.content, profiled)
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_generates_dated_orders_and_ratings(self):
+        dataset = synthetic.generate_dataset(
+            suppliers=2, skus=5, vendors=3, orders=500, days=60, prefix="synth", batch_size=200
+        )
+        self.assertEqual(dataset[:4], (2, 3, 10, 500))
+        orders = Order.objects.filter(vendor__username__startswith="synth-")
+        self.assertEqual(orders.count(), 500)
+        self.assertGreater(orders.dates("ordered_at", "day").count(), 30)
+        self.assertFalse(orders.filter(status="pending", ordered_at__lt=timezone.now() - timedelta(days=4)).exists())
+        self.assertEqual(Rating.objects.filter(vendor__username__startswith="synth-").count(), dataset.ratings)
+        self.assertEqual(
+            sum(SupplierRatingSummary.objects.values_list("rating_count", flat=True)), dataset.ratings
+        )
+
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "bench.json")
+        call_command("bench_views", requests=1, warmup=0, output=path, stdout=io.StringIO())
+        with open(path) as f:
+            results = {result["name"]: result for result in json.load(f)["results"]}
+        self.assertEqual(results["supplier_dashboard"]["statuses"], [200])
+        self.assertIn("p99_ms", results["vendor_dashboard"])
+
+        # Deleted in batches, without a query (or a change feed tombstone) per order
+        tombstones = Tombstone.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            synthetic.delete_dataset("synth", batch_size=200)
+        self.assertLess(len(queries), 60)
+        self.assertEqual(Tombstone.objects.count(), tombstones)
+        self.assertFalse(User.objects.filter(username__startswith="synth-").exists())
+        self.assertFalse(Order.objects.filter(supplier_commodity__supplier__username__startswith="synth-").exists())
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Dashboard views run a fixed number of queries however much data there is."""
+
+    def test_dashboards_stay_within_query_budget(self):
+        for rows in BUDGET_SIZES:
+            with self.subTest(rows=rows), self.seeded(rows) as data:
+                # The newest pending orders are one bounded query, cached with the rest of the page
+                self.assertQueryBudget(data.supplier, reverse("supplier_dashboard"), 6)
+                self.assertQueryBudget(data.supplier, reverse("supplier_orders"), 4)
+                self.assertQueryBudget(data.supplier, reverse("supplier_ratings"), 5)
+                self.assertQueryBudget(data.vendor, reverse("order_request"), 3)
+                self.assertQueryBudget(data.vendor, reverse("vendor_dashboard"), 4)
+                # One more query the first time: the SQLite fallback search index is rebuilt after seeding
+                self.assertQueryBudget(data.vendor, reverse("vendor_dashboard"), 5, {"search": "budget", "page": 2})
+                self.assertQueryBudget(data.vendor, reverse("vendor_dashboard"), 4, {"search": "budget", "page": 2})
+
+    def test_views_use_indexes_on_large_tables(self):
+        with self.seeded(1000) as data:
+            ForecastResult.objects.bulk_create(
+                ForecastResult(supplier_commodity=sc, **FAKE_FORECAST)
+                for sc in SupplierCommodity.objects.filter(supplier=data.supplier)
+            )
+            for url, params in [
+                (reverse("supplier_dashboard"), None),
+                (reverse("supplier_orders"), None),
+                (reverse("supplier_orders"), {"time_filter": "week"}),
+                (reverse("supplier_ratings"), None),
+                (reverse("forecast"), None),
+                ("/api/v1/orders/", None),
+                ("/api/v1/orders/changes/", None),
+                ("/api/v1/ratings/", None),
+                ("/api/v1/listings/changes/", None),
+            ]:
+                with self.subTest(url=url, params=params):
+                    self.assertNoTableScans(data.supplier, url, params)
+            # Without PostgreSQL, search reads every listing once to build its in-process index
+            fallback_index.get()
+            for url, params in [
+                (reverse("vendor_dashboard"), None),
+                (reverse("vendor_dashboard"), {"search": "budget"}),
+                (reverse("order_request"), None),
+                ("/api/v1/listings/", None),
+                ("/api/v1/orders/", {"status": "accepted"}),
+                ("/api/v1/orders/changes/", None),
+            ]:
+                with self.subTest(url=url, params=params):
+                    self.assertNoTableScans(data.vendor, url, params)
+
+    def test_table_scans_are_detected(self):
+        unindexed = Order.objects.filter(quantity_requested=3)
+        indexed = Order.objects.filter(vendor_id=1, status="accepted")
+        self.assertEqual(table_scans(explain(*unindexed.query.sql_with_params())), {"inventory_order"})
+        self.assertEqual(table_scans(explain(*indexed.query.sql_with_params())), set())
+
+    def test_budget_failure_lists_the_queries(self):
+        with self.seeded(10) as data:
+            with self.assertRaisesRegex(AssertionError, r"ran \d+ queries, budget is 1:\nSELECT"):
+                self.assertQueryBudget(data.supplier, reverse("supplier_orders"), 1)
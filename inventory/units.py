@@ -0,0 +1,84 @@
+"""Units of measure and conversions between them.
+
+Every unit a listing can be sold in belongs to one dimension with a base
+unit: mass (kg), length (m), volume (l) or count (unit). All conversion
+factors between units of the same dimension are computed once, at import,
+into ``CONVERSIONS``, so converting is a dictionary lookup and a multiply.
+
+Listings store their price per base unit (``normalized_price``) next to
+``base_unit``, kept current by ``inventory.signals`` and the bulk write
+paths. Prices from suppliers selling in grams, quintals and tonnes can
+then be filtered and sorted together in SQL.
+"""
+from decimal import Decimal
+
+# code: (label, base unit, size in base units)
+UNITS = {
+    'kg': ('Kilogram', 'kg', Decimal('1')),
+    'g': ('Gram', 'kg', Decimal('0.001')),
+    'q': ('Quintal', 'kg', Decimal('100')),
+    't': ('Ton', 'kg', Decimal('1000')),
+    'm': ('Metre', 'm', Decimal('1')),
+    'cm': ('Centimetre', 'm', Decimal('0.01')),
+    'in': ('Inch', 'm', Decimal('0.0254')),
+    'ft': ('Foot', 'm', Decimal('0.3048')),
+    'unit': ('Unit', 'unit', Decimal('1')),
+    'l': ('Litre', 'l', Decimal('1')),
+    'ml': ('Millilitre', 'l', Decimal('0.001')),
+}
+
+CHOICES = [(code, label) for code, (label, _, _) in UNITS.items()]
+LABELS = {code: label for code, (label, _, _) in UNITS.items()}
+BASE_UNITS = {code: base for code, (_, base, _) in UNITS.items()}
+
+# (from, to): how many ``to`` make one ``from``, for every pair within a dimension
+CONVERSIONS = {
+    (source, target): source_size / target_size
+    for source, (_, source_base, source_size) in UNITS.items()
+    for target, (_, target_base, target_size) in UNITS.items()
+    if source_base == target_base
+}
+
+# Matches SupplierCommodity.normalized_price
+PRICE_PLACES = Decimal('0.000001')
+
+
+def label(code):
+    return LABELS.get(code, code)
+
+
+def base_unit(code):
+    """The base unit of ``code``'s dimension; raises ``ValueError`` for an unknown unit."""
+    try:
+        return BASE_UNITS[code]
+    except KeyError:
+        raise ValueError(f"unknown unit {code!r}") from None
+
+
+def convert(quantity, source, target):
+    """``quantity`` in ``source`` units expressed in ``target`` units.
+
+    Raises ``ValueError`` for unknown units or units of different dimensions.
+    """
+    try:
+        return Decimal(quantity) * CONVERSIONS[source, target]
+    except KeyError:
+        raise ValueError(f"can't convert {source!r} to {target!r}") from None
+
+
+def normalized_price(price, code):
+    """``price`` per ``code`` as a price per base unit, rounded like the stored column."""
+    return (Decimal(price) / CONVERSIONS[code, base_unit(code)]).quantize(PRICE_PLACES)
+
+
+def normalize(listing):
+    """Set ``base_unit`` and ``normalized_price`` on a ``SupplierCommodity`` from its unit and price.
+
+    A unit this module doesn't know is treated as its own base unit.
+    """
+    if listing.unit in UNITS:
+        listing.base_unit = base_unit(listing.unit)
+        listing.normalized_price = normalized_price(listing.price_per_unit, listing.unit)
+    else:
+        listing.base_unit = listing.unit
+        listing.normalized_price = Decimal(listing.price_per_unit).quantize(PRICE_PLACES)
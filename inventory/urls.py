@@ -3,7 +3,9 @@ from .views import (
     signup, supplier_dashboard, vendor_dashboard, 
     add_commodity, update_commodity, delete_commodity, 
     login_view, logout_view, place_order, accept_order, reject_order,supplier_orders,home,
-    order_request, forecast_supplier_demands, supplier_ratings, rate_order
+    order_request, forecast_supplier_demands, supplier_ratings, rate_order,
+    bulk_process_orders, bulk_import_inventory, export_inventory, place_cart_order,
+    supplier_order_events, supplier_order_poll, metrics,
 )
 
 
@@ -17,13 +19,19 @@ urlpatterns = [
     path("dashboard/supplier/add/", add_commodity, name="add_commodity"),
     path("dashboard/supplier/update/<int:commodity_id>/", update_commodity, name="update_commodity"),
     path("dashboard/supplier/delete/<int:commodity_id>/", delete_commodity, name="delete_commodity"),
+    path("dashboard/supplier/import/", bulk_import_inventory, name="bulk_import_inventory"),
+    path("dashboard/supplier/export/", export_inventory, name="export_inventory"),
     path("supplier/orders/", supplier_orders, name="supplier_orders"),
+    path("supplier/orders/events/", supplier_order_events, name="supplier_order_events"),
+    path("supplier/orders/poll/", supplier_order_poll, name="supplier_order_poll"),
 
     path("dashboard/vendor/", vendor_dashboard, name="vendor_dashboard"),
     path("dashboard/vendor/place_order/<int:commodity_id>/", place_order, name="place_order"),
+    path("dashboard/vendor/cart/", place_cart_order, name="place_cart_order"),
 
     path("dashboard/supplier/accept_order/<int:order_id>/", accept_order, name="accept_order"),
     path("dashboard/supplier/reject_order/<int:order_id>/", reject_order, name="reject_order"),
+    path("dashboard/supplier/orders/bulk/", bulk_process_orders, name="bulk_process_orders"),
     
 
     path("dashboard/vendor/order_request",order_request,name="order_request"),
@@ -32,4 +40,6 @@ urlpatterns = [
     path('dashboard/supplier/ratings/', supplier_ratings, name='supplier_ratings'),
     path('dashboard/vendor/rate_order/<int:order_id>/', rate_order, name='rate_order'),
 
+    path('metrics', metrics, name='metrics'),
+
 ]
@@ -1,21 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import SupplierCommodity, ListCommodity, Order, Rating
+from .models import SupplierCommodity, ListCommodity, Order, Rating, ForecastResult, SupplierRatingSummary
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
-from prophet import Prophet
-import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
-from django.db.models import Avg, Count
-import matplotlib
-matplotlib.use('Agg')  
-import matplotlib.dates as mdates
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from datetime import datetime
-import io
-import base64
+from .charts import get_chart_mode, render_forecast_chart
+from . import bulk_inventory, cart, events, fulfilment, replenishment, reservations
+from .ratings import record_rating
+from .search import search_listings
+from .cache import COMMODITIES, MARKETPLACE, SUPPLIER, VENDOR, cache_key, cached_page, get_or_build
+from .pagination import keyset_page, page_query
+from .units import BASE_UNITS, label
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from .metrics import registry
+
+DASHBOARD_PAGE_SIZE = 20
+# Restock alerts shown on the supplier dashboard, soonest to run out first
+RESTOCK_ALERT_LIMIT = 10
+# Newest pending orders shown on the supplier dashboard; the orders page pages through the rest
+DASHBOARD_PENDING_LIMIT = 10
+BASE_UNIT_CHOICES = {code: label(code) for code in sorted(set(BASE_UNITS.values()))}
+
+
+def paginate(request, queryset, per_page=DASHBOARD_PAGE_SIZE):
+    """Return the ``?page=`` page of ``queryset`` (out-of-range pages fall back to the last one)."""
+    return Paginator(queryset, per_page).get_page(request.GET.get('page'))
 
 @login_required
 def add_commodity(request):
@@ -45,14 +65,64 @@ def update_commodity(request, commodity_id):
     commodity = get_object_or_404(SupplierCommodity, id=commodity_id, supplier=request.user)
 
     if request.method == "POST":
-        commodity.available_units = request.POST["available_units"]
-        commodity.price_per_unit = request.POST["price_per_unit"]
-        commodity.manufactured_company = request.POST["manufactured_company"]
-        commodity.unit = request.POST["unit"]  # Update the unit field
-        commodity.save()
+        try:
+            available_units = Decimal(request.POST["available_units"])
+        except InvalidOperation:
+            messages.error(request, "Available units must be a number.")
+            return redirect("supplier_dashboard")
+        with transaction.atomic():
+            # Locked so a pending order can't take a hold between the check and the save
+            commodity = SupplierCommodity.objects.select_for_update().get(pk=commodity.pk)
+            if available_units < commodity.reserved_units:
+                messages.error(request, f"Pending orders hold {commodity.reserved_units} "
+                                        f"{commodity.get_unit_display()}; available units can't be set below that.")
+                return redirect("supplier_dashboard")
+            commodity.available_units = available_units
+            commodity.price_per_unit = request.POST["price_per_unit"]
+            commodity.manufactured_company = request.POST["manufactured_company"]
+            commodity.unit = request.POST["unit"]  # Update the unit field
+            commodity.save()
         messages.success(request, "Commodity updated successfully!")
         return redirect("supplier_dashboard")
     
+@login_required
+def bulk_import_inventory(request):
+    """Create or update many inventory items from an uploaded CSV or JSON Lines file."""
+    if request.user.role != "supplier":
+        messages.error(request, "Access denied.")
+        return redirect("login")
+
+    upload = request.FILES.get("file")
+    if request.method != "POST" or upload is None:
+        messages.error(request, "Choose a CSV or JSON Lines file to import.")
+        return redirect("supplier_dashboard")
+
+    fmt = bulk_inventory.detect_format(upload.name, request.POST.get("format"))
+    result = bulk_inventory.import_inventory(request.user, bulk_inventory.read_rows(upload.file, fmt))
+
+    messages.success(request, f"Import finished: {result.created} added, {result.updated} updated.")
+    if result.error_count:
+        shown = "; ".join(f"line {line}: {message}" for line, message in result.errors[:5])
+        messages.error(request, f"{result.error_count} row(s) skipped ({shown}).")
+    return redirect("supplier_dashboard")
+
+@login_required
+def export_inventory(request):
+    """Stream the supplier's whole inventory as CSV or JSON Lines."""
+    if request.user.role != "supplier":
+        messages.error(request, "Access denied.")
+        return redirect("login")
+
+    fmt = request.GET.get("format", "csv")
+    if fmt not in bulk_inventory.FORMATS:
+        fmt = "csv"
+    response = StreamingHttpResponse(
+        bulk_inventory.export_rows(request.user, fmt),
+        content_type="text/csv" if fmt == "csv" else "application/x-ndjson",
+    )
+    response["Content-Disposition"] = f'attachment; filename="inventory.{fmt}"'
+    return response
+
 @login_required
 def delete_commodity(request, commodity_id):
     """Allows suppliers to delete a commodity from their inventory."""
@@ -108,7 +178,6 @@ def logout_view(request):
     return redirect("login")
 
 
-from .forecast_utils import forecast_demand  # Make sure this is your utility function
 
 @login_required
 def supplier_dashboard(request):
@@ -117,27 +186,48 @@ def supplier_dashboard(request):
         messages.error(request, "Access denied.")
         return redirect("login")
 
-    inventory = SupplierCommodity.objects.filter(supplier=request.user)
-    pending_orders = Order.objects.filter(supplier_commodity__supplier=request.user, status="pending")
-    commodities = ListCommodity.objects.all()
-
-
+    # Served from the cache until one of this supplier's listings, orders or ratings changes
+    page_number = request.GET.get('page')
+    inventory = cached_page(
+        cache_key(SUPPLIER, request.user.id, 'inventory', page_number),
+        SupplierCommodity.objects.filter(
+            supplier=request.user
+        ).select_related('commodity').order_by('commodity__name', 'id'),
+        page_number, DASHBOARD_PAGE_SIZE,
+    )
+    # One extra row tells whether to link to the rest; Order signals bump the supplier's version
+    pending_orders = get_or_build(
+        cache_key(SUPPLIER, request.user.id, 'pending'),
+        lambda: list(
+            Order.objects.filter(supplier_commodity__supplier=request.user, status="pending")
+            .select_related('vendor', 'supplier_commodity__commodity')
+            .order_by('-ordered_at', '-id')[:DASHBOARD_PENDING_LIMIT + 1]
+        ),
+    )
+    commodities = get_or_build(
+        cache_key(COMMODITIES, None, 'all'), lambda: list(ListCommodity.objects.order_by('name'))
+    )
+    # Precomputed by the refresh_replenishment_plans worker, which bumps the supplier's version when they change
+    restock_alerts = get_or_build(
+        cache_key(SUPPLIER, request.user.id, 'restock_alerts'),
+        lambda: list(replenishment.alerts(request.user.id)[:RESTOCK_ALERT_LIMIT]),
+    )
 
     return render(
         request,
         "inventory/supplier_dashboard.html",
         {
             "inventory": inventory,
-            "pending_orders": pending_orders,
+            "pending_orders": pending_orders[:DASHBOARD_PENDING_LIMIT],
+            "more_pending_orders": len(pending_orders) > DASHBOARD_PENDING_LIMIT,
             "commodities": commodities,
-            
+            "restock_alerts": restock_alerts,
         }
     )
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
 from .models import SupplierCommodity, ListCommodity, Order, User
 @login_required
 def vendor_dashboard(request):
@@ -147,21 +237,51 @@ def vendor_dashboard(request):
         return redirect("login")
 
     query = request.GET.get("search", "")
-    
-    # Get commodities with annotated supplier ratings
+    sort = request.GET.get("sort") if request.GET.get("sort") in ("price", "score") else ""
+    base_unit = request.GET.get("base_unit", "")
+    if base_unit not in BASE_UNIT_CHOICES:
+        base_unit = ""
+    try:
+        max_price = Decimal(request.GET.get("max_price", "")) if request.GET.get("max_price") else None
+    except InvalidOperation:
+        max_price = None
+    # NaN and Infinity parse as Decimals but can't be compared in SQL
+    if max_price is not None and (not max_price.is_finite() or max_price < 0):
+        max_price = None
+
+    # Supplier ratings come from the precomputed summary, a single LEFT JOIN
     supplier_commodities = SupplierCommodity.objects.select_related(
         'commodity', 'supplier'
     ).annotate(
-        supplier_avg_rating=Avg('supplier__supplier_ratings__rating'),  # Changed to supplier_ratings
-        supplier_rating_count=Count('supplier__supplier_ratings')      # Changed to supplier_ratings
+        supplier_avg_rating=F('supplier__rating_summary__average_rating'),
+        supplier_rating_count=Coalesce('supplier__rating_summary__rating_count', 0),
     ).filter(available_units__gt=0)
 
+    # Prices per base unit (see inventory.units) compare across suppliers' units, on an index
+    if base_unit:
+        supplier_commodities = supplier_commodities.filter(base_unit=base_unit)
+    if max_price is not None:
+        supplier_commodities = supplier_commodities.filter(normalized_price__lte=max_price)
+
+    # Search matches commodity name, supplier name and address, best match first
     if query:
-        supplier_commodities = supplier_commodities.filter(
-            Q(commodity__name__icontains=query) |
-            Q(supplier__username__icontains=query) |
-            Q(supplier__address__icontains=query)
+        supplier_commodities = search_listings(supplier_commodities, query)
+    elif sort == "price":
+        supplier_commodities = supplier_commodities.order_by('base_unit', 'normalized_price', 'id')
+    elif sort == "score":
+        # Best ranked suppliers first within each commodity (see inventory.ranking)
+        supplier_commodities = supplier_commodities.annotate(supplier_score=F('score__score')).order_by(
+            'commodity__name', F('supplier_score').desc(nulls_last=True), 'id'
         )
+    else:
+        supplier_commodities = supplier_commodities.order_by('commodity__name', 'id')
+    # The marketplace is the same for every vendor, so its pages are cached once for all of them
+    page_number = request.GET.get('page')
+    supplier_commodities = cached_page(
+        cache_key(MARKETPLACE, None, 'listings', query, sort, base_unit, max_price, page_number),
+        supplier_commodities, page_number, DASHBOARD_PAGE_SIZE,
+    )
+    filters = {"search": query, "sort": sort, "base_unit": base_unit, "max_price": max_price}
 
     return render(
         request,
@@ -169,6 +289,12 @@ def vendor_dashboard(request):
         {
             "supplier_commodities": supplier_commodities,
             "query": query,
+            "sort": sort,
+            "base_unit": base_unit,
+            "max_price": max_price,
+            "base_unit_choices": BASE_UNIT_CHOICES.items(),
+            # Carried over by the page links
+            "filter_query": urlencode({name: value for name, value in filters.items() if value not in ("", None)}),
         }
     )
 
@@ -189,19 +315,51 @@ def place_order(request, commodity_id):
             messages.error(request, "Invalid quantity.")
             return redirect("vendor_dashboard")
 
-        if quantity > supplier_commodity.available_units:
+        # Holds the stock until the supplier answers or the hold expires
+        if reservations.place_order(request.user, supplier_commodity, quantity) is None:
             messages.error(request, "Insufficient stock.")
             return redirect("vendor_dashboard")
 
-        Order.objects.create(
-            vendor=request.user,
-            supplier_commodity=supplier_commodity,
-            quantity_requested=quantity,
-            status="pending"
-        )
-
         messages.success(request, "Order placed successfully.")
         return redirect("vendor_dashboard")
+
+
+@login_required
+def place_cart_order(request):
+    """Place orders for several supplier commodities in one request.
+
+    Accepts the dashboard's ``cart_<id>`` quantity fields, or a JSON body
+    ``{"lines": [{"commodity_id": ..., "quantity": ...}]}`` which is answered
+    with per-line results as JSON.
+    """
+    if request.user.role != "vendor":
+        messages.error(request, "Access denied.")
+        return redirect("login")
+    if request.method != "POST":
+        return redirect("vendor_dashboard")
+
+    wants_json = request.content_type == "application/json"
+    try:
+        lines = cart.lines_from_json(request.body) if wants_json else cart.lines_from_form(request.POST)
+        results = cart.place_cart(request.user, lines)
+    except ValueError as exc:
+        if wants_json:
+            return JsonResponse({"error": str(exc)}, status=400)
+        messages.error(request, str(exc))
+        return redirect("vendor_dashboard")
+
+    if wants_json:
+        return JsonResponse({"results": [line._asdict() for line in results]})
+
+    placed = sum(1 for line in results if line.status == cart.PLACED)
+    if placed:
+        messages.success(request, f"{placed} order(s) placed successfully.")
+    failed = len(results) - placed
+    if failed:
+        messages.error(request, f"{failed} cart line(s) could not be ordered (invalid quantity or insufficient stock).")
+    if not results:
+        messages.error(request, "Your cart is empty.")
+    return redirect("vendor_dashboard")
 def home(request):
     return render(request, "inventory/home.html")
 
@@ -216,17 +374,20 @@ def supplier_orders(request):
         messages.error(request, "Access denied.")
         return redirect("login")
 
-    # Pending orders (unchanged)
+    # Pending orders, paged with their own cursor so a backlog doesn't load all at once
     pending_orders = Order.objects.filter(
         supplier_commodity__supplier=request.user,
         status="pending"
-    ).order_by('-ordered_at')
+    ).select_related('vendor', 'supplier_commodity__commodity')
+    pending_page = keyset_page(
+        pending_orders, after=request.GET.get('pending_after'), before=request.GET.get('pending_before')
+    )
 
     # Previous orders with time filtering
     time_filter = request.GET.get('time_filter', 'all')
     previous_orders = Order.objects.filter(
         supplier_commodity__supplier=request.user
-    ).exclude(status="pending")
+    ).exclude(status="pending").select_related('vendor', 'supplier_commodity__commodity')
 
     # Apply time filters
     today = timezone.now().date()
@@ -244,13 +405,50 @@ def supplier_orders(request):
         previous_orders = previous_orders.filter(ordered_at__gte=start_date)
     # 'all' shows everything
 
-    previous_orders = previous_orders.order_by('-ordered_at')
+    # Keyset pagination keeps deep history pages as cheap as the first one
+    page = keyset_page(previous_orders, after=request.GET.get('after'), before=request.GET.get('before'))
 
     return render(request, "inventory/orders.html", {
-        "pending_orders": pending_orders,
-        "previous_orders": previous_orders,
+        "pending_orders": pending_page.items,
+        "pending_next_cursor": pending_page.next_cursor,
+        "pending_previous_cursor": pending_page.previous_cursor,
+        "pending_older_query": page_query(request.GET, pending_after=pending_page.next_cursor, pending_before=None),
+        "pending_newer_query": page_query(request.GET, pending_before=pending_page.previous_cursor, pending_after=None),
+        "previous_orders": page.items,
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+        "older_query": page_query(request.GET, after=page.next_cursor, before=None),
+        "newer_query": page_query(request.GET, before=page.previous_cursor, after=None),
         "current_filter": time_filter  # Pass current filter to template if needed
     })
+
+
+async def supplier_order_events(request):
+    """Server-sent events: one message per new order for the signed-in supplier."""
+    user = await events.request_user(request)
+    if user is None or user.role != "supplier":
+        return HttpResponseForbidden("Access denied.")
+    last_id = request.headers.get("Last-Event-ID", "")
+    response = StreamingHttpResponse(
+        events.stream_orders(user.id, int(last_id) if last_id.isdigit() else None),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def supplier_order_poll(request):
+    """Long poll for clients without EventSource: orders after ``?after=<order id>``."""
+    user = await events.request_user(request)
+    if user is None or user.role != "supplier":
+        return JsonResponse({"error": "Access denied."}, status=403)
+    after = request.GET.get("after", "")
+    if not after.isdigit():
+        return JsonResponse({"error": "after must be an order id."}, status=400)
+    found = await events.wait_for_orders(user.id, int(after))
+    return JsonResponse({"orders": found, "last_id": found[-1]["id"] if found else int(after)})
 @login_required
 def accept_order(request, order_id):
     """Supplier accepts an order, reducing stock."""
@@ -261,11 +459,13 @@ def accept_order(request, order_id):
         status='pending'  # Only pending orders can be accepted
     )
 
-    if order.quantity_requested > order.supplier_commodity.available_units:
+    outcome = fulfilment.accept_order(order)
+    if outcome == fulfilment.ACCEPTED:
+        messages.success(request, "Order accepted.")
+    elif outcome == fulfilment.INSUFFICIENT_STOCK:
         messages.error(request, "Not enough stock.")
     else:
-        order.accept_order()
-        messages.success(request, "Order accepted.")
+        messages.error(request, "This order has already been processed.")
 
     return redirect("supplier_orders")  # Redirect back to orders list
 
@@ -278,10 +478,50 @@ def reject_order(request, order_id):
         supplier_commodity__supplier=request.user,  # Critical security check
         status='pending'  # Only pending orders can be rejected
     )
-    order.reject_order()
-    messages.success(request, "Order rejected.")
+    if fulfilment.reject_order(order) == fulfilment.REJECTED:
+        messages.success(request, "Order rejected.")
+    else:
+        messages.error(request, "This order has already been processed.")
     return redirect("supplier_orders")  # Redirect back to orders list
 
+@login_required
+def bulk_process_orders(request):
+    """Supplier accepts or rejects many pending orders at once."""
+    if request.user.role != "supplier":
+        messages.error(request, "Access denied.")
+        return redirect("login")
+
+    if request.method != "POST":
+        return redirect("supplier_orders")
+
+    action = request.POST.get("action")
+    try:
+        order_ids = [int(order_id) for order_id in request.POST.getlist("order_ids")]
+    except ValueError:
+        messages.error(request, "Invalid order selection.")
+        return redirect("supplier_orders")
+
+    if not order_ids:
+        messages.error(request, "No orders selected.")
+        return redirect("supplier_orders")
+
+    if action == "accept":
+        results = fulfilment.bulk_accept_orders(request.user, order_ids)
+    elif action == "reject":
+        results = fulfilment.bulk_reject_orders(request.user, order_ids)
+    else:
+        messages.error(request, "Invalid action.")
+        return redirect("supplier_orders")
+
+    outcomes = list(results.values())
+    done = outcomes.count(fulfilment.ACCEPTED) + outcomes.count(fulfilment.REJECTED)
+    messages.success(request, f"{done} order(s) {action}ed.")
+    if outcomes.count(fulfilment.INSUFFICIENT_STOCK):
+        messages.error(request, f"{outcomes.count(fulfilment.INSUFFICIENT_STOCK)} order(s) left pending: not enough stock.")
+    if outcomes.count(fulfilment.NOT_PENDING):
+        messages.error(request, f"{outcomes.count(fulfilment.NOT_PENDING)} order(s) were already processed.")
+    return redirect("supplier_orders")
+
 @login_required
 def order_request(request):
     """Display all orders (pending, accepted, rejected) for the logged-in vendor."""
@@ -289,10 +529,20 @@ def order_request(request):
         messages.error(request, "Access denied.")
         return redirect("login")
 
-    # Fetch orders placed by the logged-in vendor
-    orders = Order.objects.filter(vendor=request.user).order_by('-ordered_at')
-
-    return render(request, "inventory/order_request.html", {"orders": orders})
+    # Fetch one page of orders placed by the logged-in vendor
+    after, before = request.GET.get('after'), request.GET.get('before')
+    page = get_or_build(cache_key(VENDOR, request.user.id, 'orders', after, before), lambda: keyset_page(
+        Order.objects.filter(vendor=request.user).select_related(
+            'supplier_commodity__supplier', 'supplier_commodity__commodity', 'rating'
+        ),
+        after=after, before=before,
+    ))
+
+    return render(request, "inventory/order_request.html", {
+        "orders": page.items,
+        "next_cursor": page.next_cursor,
+        "previous_cursor": page.previous_cursor,
+    })
 
 
 
@@ -318,13 +568,15 @@ def rate_order(request, order_id):
         comment = request.POST.get("comment", "")
 
         if 1 <= rating_value <= 5:
-            Rating.objects.create(
-                order=order,
-                vendor=request.user,
-                supplier=order.supplier_commodity.supplier,
-                rating=rating_value,
-                comment=comment
-            )
+            with transaction.atomic():
+                rating = Rating.objects.create(
+                    order=order,
+                    vendor=request.user,
+                    supplier=order.supplier_commodity.supplier,
+                    rating=rating_value,
+                    comment=comment
+                )
+                record_rating(rating)
             messages.success(request, "Thank you for your rating!")
             return redirect("order_request")
         else:
@@ -339,145 +591,101 @@ def supplier_ratings(request):
         messages.error(request, "Access denied.")
         return redirect("login")
 
-    ratings = Rating.objects.filter(supplier=request.user).order_by('-created_at')
-
-
-    rating_stats = ratings.aggregate(
-        avg_rating=Avg('rating'),
-        total_ratings=Count('id')
-    )
+    ratings = Rating.objects.filter(supplier=request.user).order_by('-created_at', '-id')
+    summary = SupplierRatingSummary.objects.filter(supplier=request.user).first()
 
     return render(request, "inventory/supplier_ratings.html", {
-        "ratings": ratings,
-        "avg_rating": rating_stats['avg_rating'],
-        "total_ratings_given": rating_stats['total_ratings'],
+        "ratings": paginate(request, ratings.select_related('vendor', 'order__supplier_commodity__commodity')),
+        "rating_summary": summary,
+        "avg_rating": summary.average_rating if summary else None,
+        "total_ratings_given": summary.rating_count if summary else 0,
     })
 
 
-def generate_trend_insight(commodity_name, weekly_demand):
-    if len(weekly_demand) < 2:
-        return f"Not enough data to identify a demand trend for {commodity_name}."
-
-    current_week = weekly_demand.iloc[-1]['y']
-    previous_week = weekly_demand.iloc[-2]['y']
-
-    if previous_week == 0:
-        return f"No prior demand history for {commodity_name} to compare trends."
-
-    change_pct = ((current_week - previous_week) / previous_week) * 100
-    abs_change = abs(change_pct)
-
-    std_dev = weekly_demand['y'].std()
-    volatility_flag = std_dev > 0.3 * weekly_demand['y'].mean() if weekly_demand['y'].mean() != 0 else False
-
-    if abs_change < 5:
-        trend_desc = "remained stable"
-    elif abs_change < 15:
-        trend_desc = "changed slightly"
-    elif abs_change < 30:
-        trend_desc = "changed moderately"
-    else:
-        trend_desc = "changed significantly"
-
-    direction = "increased" if change_pct > 0 else "decreased"
-    base_insight = (
-        f"Demand for {commodity_name} {direction} by {abs_change:.1f}% this week "
-        f"compared to the previous week. This is considered a {trend_desc} trend."
-    )
-
-    if volatility_flag:
-        base_insight += " Note: demand has shown high volatility recently."
-
-    return base_insight
-
+@login_required
 def forecast_supplier_demands(request):
-    user = request.user
-    supplier_id = user.id
-    supplier_commodities = SupplierCommodity.objects.filter(supplier_id=supplier_id)
+    """Show the precomputed demand forecasts for the supplier's commodities.
+
+    Forecasts are fitted by the ``refresh_forecasts`` worker; commodities it
+    has not reached yet are shown as pending. ``?chart=png|svg|json`` picks
+    how charts are delivered (default ``FORECAST_CHART_MODE``).
+    """
+    chart_mode = get_chart_mode(request.GET.get('chart'))
+    supplier_commodities = SupplierCommodity.objects.filter(
+        supplier=request.user
+    ).select_related('commodity')
+    forecasts = {
+        f.supplier_commodity_id: f
+        for f in ForecastResult.objects.filter(supplier_commodity__supplier=request.user)
+    }
 
     prediction_list = []
 
     for sc in supplier_commodities:
-        orders = Order.objects.filter(
-            supplier_commodity_id=sc.id, status='accepted'
-        ).order_by('ordered_at')
+        forecast = forecasts.get(sc.id)
 
-        if orders.count() < 5:
+        if forecast is None:
+            prediction_list.append({
+                'commodity': sc.commodity.name,
+                'commodity_id': sc.commodity.id,
+                'status': 'pending',
+                'data': None,
+                'graph': None,
+                'insight': f"The forecast for {sc.commodity.name} is being prepared."
+            })
+            continue
+
+        if forecast.status != 'ok':
             prediction_list.append({
                 'commodity': sc.commodity.name,
                 'commodity_id': sc.commodity.id,
                 'status': 'insufficient',
                 'data': None,
                 'graph': None,
-                'insight': f"Not enough data to forecast or analyze trends for {sc.commodity.name}."
+                'insight': forecast.insight
             })
             continue
 
-        df = pd.DataFrame(list(orders.values('ordered_at', 'quantity_requested')))
-        df['ds'] = pd.to_datetime(df['ordered_at']).dt.tz_localize(None)
-        df = df.groupby('ds')['quantity_requested'].sum().reset_index()
-        df.rename(columns={'quantity_requested': 'y'}, inplace=True)
-
-        # Weekly demand for trend insight
-        df['week'] = df['ds'].dt.isocalendar().week
-        df['year'] = df['ds'].dt.isocalendar().year
-        weekly_demand = df.groupby(['year', 'week'])['y'].sum().reset_index()
-        insight = generate_trend_insight(sc.commodity.name, weekly_demand)
-
-        # Forecast using Prophet
-        model = Prophet()
-        model.fit(df)
-
-        future = model.make_future_dataframe(periods=7)
-        forecast = model.predict(future)
-
-        result = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(7)
-        result['yhat'] = result['yhat'].apply(lambda x: max(0, x))
-        result['yhat_lower'] = result['yhat_lower'].apply(lambda x: max(0, x))
-        result['yhat_upper'] = result['yhat_upper'].apply(lambda x: max(0, x))
-
-        # Generate plot
-        plt.figure(figsize=(10, 5))
-        plt.plot(df['ds'], df['y'], 'k.', label='Historical Data')
-        plt.plot(forecast['ds'], forecast['yhat'], ls='-', color='#0072B2', label='Forecast')
-        plt.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'],
-                         color='#0072B2', alpha=0.2, label='Uncertainty Interval')
-
-        forecast_start = forecast['ds'].max() - pd.Timedelta(days=6)
-        plt.axvline(x=forecast_start, color='gray', linestyle='--', alpha=0.5)
-        plt.text(forecast_start, plt.ylim()[1]*0.9, ' Forecast', color='gray')
-
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
-        plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=max(1, len(df)//5)))
-        plt.xticks(rotation=45)
-        plt.grid(alpha=0.3)
-        plt.legend()
-        plt.tight_layout()
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
-        buf.seek(0)
-        graph = base64.b64encode(buf.read()).decode('utf-8')
-        buf.close()
+        data = [
+            {**point, 'ds': datetime.fromisoformat(point['ds'])}
+            for point in forecast.points
+        ]
 
         prediction_list.append({
             'commodity': sc.commodity.name,
             'commodity_id': sc.commodity.id,
             'status': 'ok',
-            'data': result.to_dict(orient='records'),
-            'graph': graph,
-            'insight': insight
+            'data': data,
+            'graph': render_forecast_chart(forecast, chart_mode),
+            'chart_id': f"forecast-series-{sc.id}",
+            'insight': forecast.insight
         })
 
     prediction_list.sort(key=lambda x: 0 if x['status'] == 'ok' else 1)
 
     return render(request, 'inventory/forecast.html', {
         'predictions': prediction_list,
+        'chart_mode': chart_mode,
         'now': datetime.now().strftime("%Y-%m-%d")
     })
 
 
+def metrics(request):
+    """Prometheus scrape endpoint for this worker's request metrics.
+
+    Scrapers send ``Authorization: Bearer <METRICS_TOKEN>``; without a token
+    configured, only staff sessions may read it.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden("Access denied.")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 
 
 
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Per-view timings for /metrics and staff X-Profile dumps; needs request.user
+    'inventory.middleware.PerformanceMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +59,8 @@ ROOT_URLCONF = 'vsm.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to inventory.metrics
+        'BACKEND': 'inventory.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -130,3 +134,125 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Demand forecasting
+
+# Default forecasting backend: 'prophet', or 'holt_winters' for the
+# lightweight NumPy model. Commodities can override it individually.
+FORECAST_BACKEND = 'prophet'
+
+# Worker processes used to fit forecasts in parallel (None uses every CPU)
+FORECAST_WORKERS = None
+
+# Seconds a single commodity's forecast fit may run before it is abandoned
+FORECAST_FIT_TIMEOUT = 120
+
+# How forecast charts reach the browser: 'png' or 'svg' rendered on the
+# server (and cached), or 'json' to send the series and draw client-side
+FORECAST_CHART_MODE = 'png'
+
+# Rendered forecast charts kept in each process's LRU cache
+FORECAST_CHART_CACHE_SIZE = 256
+
+# Caching
+
+# Local memory by default. Each process gets its own cache, so deployments
+# running several workers should set REDIS_URL to share one cache (and its
+# invalidations) between them. The background workers in render.yaml
+# invalidate pages the web service caches, so they need it too.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Sessions are read through the cache so cached pages don't hit the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Seconds a cached dashboard page lives before it is rebuilt anyway
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Bulk inventory import
+
+# Rows written per bulk_create/bulk_update batch (and per transaction)
+INVENTORY_IMPORT_BATCH_SIZE = 500
+
+# JSON API (/api/v1/)
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.ApiCursorPagination',
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
+}
+
+# Change feeds (/api/v1/listings/changes/, /api/v1/orders/changes/)
+
+# Rows newer than this many seconds are held back until concurrent transactions
+# that stamped an earlier updated_at have committed, so a cursor never skips them
+CHANGE_FEED_SETTLE_SECONDS = 2
+CHANGE_FEED_PAGE_SIZE = 200
+
+# Live order events (/supplier/orders/events/, served under ASGI)
+
+# How often each worker's single poller looks for new orders
+ORDER_EVENTS_POLL_SECONDS = 1
+# Orders committed up to this long after their timestamp are still delivered
+ORDER_EVENTS_LOOKBACK_SECONDS = 10
+ORDER_EVENTS_HEARTBEAT_SECONDS = 15
+ORDER_EVENTS_LONG_POLL_SECONDS = 25
+
+# Stock reservations (inventory.reservations)
+
+# How long a pending order holds its stock; expire_stock_holds releases older holds
+STOCK_HOLD_SECONDS = 24 * 3600
+
+# Stock ledger (inventory.ledger)
+
+# compact_stock_ledger --loop snapshots this often; stock-at-T reads at most this much history
+STOCK_SNAPSHOT_INTERVAL_SECONDS = 3600
+# Snapshots are taken this far in the past so movements still committing are included
+STOCK_SNAPSHOT_SETTLE_SECONDS = 60
+
+# Supplier ranking (inventory.ranking)
+
+# Weight of each score component; they are scaled to add up to 1
+RANKING_WEIGHTS = {'price': 0.4, 'stock': 0.2, 'rating': 0.25, 'fulfilment': 0.15}
+# Ratings and decided orders a supplier needs before its own record outweighs the neutral prior
+RANKING_PRIOR_WEIGHT = 5
+# Commodities scored per query and transaction by refresh_supplier_scores
+RANKING_BATCH_SIZE = 500
+
+# Replenishment plans (inventory.replenishment)
+
+# Days of accepted-order history behind each listing's demand rate and variance
+REPLENISHMENT_WINDOW_DAYS = 56
+# Days a restock takes to arrive, and days until stock is next reviewed
+REPLENISHMENT_LEAD_TIME_DAYS = 7
+REPLENISHMENT_REVIEW_DAYS = 7
+# Chance of not running out while a restock is on its way; sets the safety stock
+REPLENISHMENT_SERVICE_LEVEL = 0.95
+# Listings planned per batch by refresh_replenishment_plans
+REPLENISHMENT_BATCH_SIZE = 2000
+
+# Request metrics (/metrics) and profiling
+
+# Bearer token Prometheus sends to /metrics; without one only staff can read it
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Record each request's Python allocation peak (tracemalloc slows every request down)
+PERFORMANCE_TRACE_ALLOCATIONS = False
+# Where X-Profile requests also save their raw profile (None: only return it)
+PERFORMANCE_PROFILE_DIR = None
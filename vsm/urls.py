@@ -1,10 +1,11 @@
 
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.urls import include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    re_path(r'^api/(?P<version>v1)/', include('inventory.api_urls')),
   
     path('', include('inventory.urls')),
-]
\ No newline at end of file
+]